@@ -6,13 +6,72 @@ GRAVEYARD = "graveyard"
 KING = "king"
 
 import copy
+from collections import namedtuple
 from .pieces import *
 from .pieces.flags import *
 from .utilities import *
 from .states import STATES
+from .bitboards import *
+from .zobrist import *
+from .evaluation import MIDDLEGAME, ENDGAME, PHASES
 
-__all__ = ["Board"]
+__all__ = ["Board", "Move", "Outcome", "CHECKMATE", "STALEMATE", "FIFTYMOVES", "REPETITION"]
 
+# Piece types tracked by the bitboards
+PIECETYPES = (King, Queen, Rook, Bishop, Knight, Pawn)
+
+# Promotion symbols in the order they are generated
+PROMOTIONS = ("Q", "R", "B", "N")
+
+# Piece types by their letter in FEN, uppercase for white
+FENPIECES = {"K": King, "Q": Queen, "R": Rook, "B": Bishop, "N": Knight, "P": Pawn}
+FENLETTERS = {pieceType: letter for letter, pieceType in FENPIECES.items()}
+
+# Castling rights by their letter in FEN, with the rank and
+# the starting file of the rook
+FENCASTLING = {
+    "K": (WHITE_KINGSIDE, 0, 7),
+    "Q": (WHITE_QUEENSIDE, 0, 0),
+    "k": (BLACK_KINGSIDE, 7, 7),
+    "q": (BLACK_QUEENSIDE, 7, 0)
+}
+
+# A move, equal to and interchangeable with a plain
+# (current, target, promotion) tuple
+Move = namedtuple("Move", ("current", "target", "promotion"))
+
+# Every move without promotion, indexed by current square * 64 + target
+# square. Move generation looks moves up here instead of building them.
+MOVES = [Move(toPosition(current), toPosition(target), None)
+         for current in range(64) for target in range(64)]
+
+# Tuples of a pawn move to the last rank with each promotion symbol,
+# indexed like MOVES
+PROMOTIONMOVES = {
+    current * 64 + target: tuple(Move(toPosition(current), toPosition(target), promotion)
+                                 for promotion in PROMOTIONS)
+    for current in range(64) for target in range(64)
+    if (current // 8, target // 8) in ((6, 7), (1, 0))
+}
+
+# Ways a game can end
+CHECKMATE = "checkmate"
+STALEMATE = "stalemate"
+FIFTYMOVES = "fifty moves"
+REPETITION = "threefold repetition"
+
+# End of a game
+# termination: CHECKMATE, STALEMATE, FIFTYMOVES or REPETITION
+# winner: WHITE or BLACK, or None for a draw
+Outcome = namedtuple("Outcome", ("termination", "winner"))
+
+# Record of an executed move, holding what is needed to undo it
+# move: the (current, target, promotion) move
+# moveData: the captured piece, the previous hasMoved attribute and the
+#     other data needed by _revert
+# passantData: the pawn whose passant attribute was reset by _endTurn,
+#     and its previous passantPos
+Undo = namedtuple("Undo", ("move", "moveData", "passantData"))
 
 
 class Board():
@@ -40,6 +99,47 @@ class Board():
         the passant attribute of the pawn at the stored position is reset
         to False, and the passantPos for that color set to None.
 
+    bitboards: dict indexed by WHITE/BLACK containing a dict mapping each
+        piece type to a bitboard (64-bit int) of the squares occupied by
+        pieces of that type and color. Kept in sync with boardstate by
+        __setitem__.
+
+    occupancy: dict indexed by WHITE/BLACK containing a bitboard of all
+        squares occupied by pieces of that color.
+
+    zobrist: 64-bit Zobrist hash of the position, covering the pieces,
+        the player to move, the castling rights and the en passant file.
+        Pieces are hashed in and out by __setitem__, the en passant file
+        by the DOUBLE flag, and the castling rights and player to move
+        as moves are executed. Equal to zobristHash() at all times.
+
+    passantKey: the en passant key currently hashed into zobrist, or 0.
+
+    middlegameScore, endgameScore: sums of the material and piece-square
+        scores of all pieces in the middlegame and the endgame, positive
+        for white. Pieces are added and subtracted by __setitem__, like
+        the zobrist hash. Equal to pieceSquareScores() at all times.
+
+    phase: sum of the phase weights of the pieces on the board, used
+        to blend the middlegame and endgame scores.
+
+    halfmoveClock: number of moves since the last capture or pawn move.
+
+    fullmoveNumber: number of the current full move, starting at 1 and
+        increased after each move by black.
+
+    moveStack: list of the Undo records of the moves executed by move,
+        push and executeMoves, the last move at the end. Popped by pop
+        to take moves back.
+
+    repetitions: dict mapping the Zobrist hash of each position reached
+        in the game, including the current one, to the number of times
+        it has been reached. Counted by move, push and executeMoves, and
+        uncounted by pop, but not by the internal _make and _unmake.
+
+    frozen: True if the board has been frozen by freeze, and moves can
+        no longer be made.
+
     """
 
     def __init__(self, gamestate=STATES["default"], moves=None):
@@ -52,7 +152,22 @@ class Board():
         are attempted executed.  When both a gamestate and list of moves are given,
         the state is written, and the moves are then attempted executed.
         """
+        self._reset()
+
+        # Populate board with given state
+        self._populate(gamestate)
+
+        # Validate board
+        stateValidity = self.validateState(gamestate, True)
+        if not stateValidity[0]:
+            # Invalid gamestate with reason stateValidity[1]
+            raise StateError(stateValidity[1])
+
+        if moves is not None:
+            self.executeMoves(moves)
 
+    def _reset(self):
+        """Set all attributes to an empty board"""
         self.boardstate = None
         self.toMove = None
         self.pieces = {
@@ -63,15 +178,24 @@ class Board():
             WHITE: None,
             BLACK: None
         }
-
-        # Populate board with given state
-        self._populate(gamestate)
-
-        # Validate board
-        stateValidity = self.validateState(gamestate, True)
-        if not stateValidity[0]:
-            # Invalid gamestate with reason stateValidity[1]
-            raise StateError(stateValidity[1])
+        self.bitboards = {
+            WHITE: dict.fromkeys(PIECETYPES, BB_EMPTY),
+            BLACK: dict.fromkeys(PIECETYPES, BB_EMPTY)
+        }
+        self.occupancy = {
+            WHITE: BB_EMPTY,
+            BLACK: BB_EMPTY
+        }
+        self.zobrist = 0
+        self.passantKey = 0
+        self.middlegameScore = 0
+        self.endgameScore = 0
+        self.phase = 0
+        self.halfmoveClock = 0
+        self.fullmoveNumber = 1
+        self.moveStack = []
+        self.repetitions = {}
+        self.frozen = False
 
     def __str__(self):
         return self.draw(WHITE)
@@ -99,25 +223,261 @@ class Board():
         return render
 
 
-    def _populate(self, gamestate):
-        """Sets internal gamestate to given state"""
+    def _populate(self, gamestate, copy=True):
+        """
+        Sets internal gamestate to given state
+
+        The pieces are copied, unless copy is False in which case the
+        board takes ownership of the given pieces.
+        """
         self.boardstate = []
         # Add to living lists
         for r, rank in enumerate(gamestate[0]):
             newRank = []
             for f, square in enumerate(rank):
                 # Add piece to boardstate and piece-list
-                pieceCopy = eval(repr(square))
+                if square is None or not copy:
+                    pieceCopy = square
+                else:
+                    pieceCopy = square.copy()
                 newRank.append(pieceCopy)
                 if pieceCopy is not None:
                     self.pieces[square.color][LIVING].append(pieceCopy)
 
+                    # Add to bitboards
+                    bit = BB_SQUARES[r * 8 + f]
+                    self.bitboards[square.color][type(pieceCopy)] |= bit
+                    self.occupancy[square.color] |= bit
+
                 # Store reference to King piece
                 if type(pieceCopy) is King:
                     self.pieces[square.color][KING] = pieceCopy
             self.boardstate.append(newRank)
 
         self.toMove = gamestate[1]
+        self.zobrist = self.zobristHash()
+        self.middlegameScore, self.endgameScore, self.phase = self.pieceSquareScores()
+        self.repetitions = {self.zobrist: 1}
+
+    @classmethod
+    def fromFEN(cls, fen):
+        """
+        Return a new board set up from the position given in
+        Forsyth-Edwards Notation.
+
+        The halfmove clock and fullmove number may be left out, in which
+        case they are set to 0 and 1. Raises NotationError if the notation
+        is malformed, and StateError if the position is invalid.
+        """
+        fields = fen.split()
+        if len(fields) == 4:
+            fields += ["0", "1"]
+        if len(fields) != 6:
+            raise NotationError(fen, "FEN must have 6 fields")
+        placement, toMove, castling, passant, halfmove, fullmove = fields
+
+        # Piece placement, from rank 8 down to rank 1
+        rows = placement.split("/")
+        if len(rows) != 8:
+            raise NotationError(fen, "Piece placement must have 8 ranks")
+        boardstate = []
+        for r, row in enumerate(reversed(rows)):
+            rank = []
+            for letter in row:
+                if letter in "12345678":
+                    rank.extend([None] * int(letter))
+                    continue
+
+                pieceType = FENPIECES.get(letter.upper())
+                if pieceType is None:
+                    raise NotationError(fen, "Unknown piece '{}'".format(letter))
+                color = WHITE if letter.isupper() else BLACK
+                position = (r, len(rank))
+                if pieceType is Pawn:
+                    piece = Pawn(color, position, hasMoved=r != (1 if color is WHITE else 6))
+                elif pieceType is King or pieceType is Rook:
+                    # Unmoved kings and rooks are given by the castling rights
+                    piece = pieceType(color, position, hasMoved=True)
+                else:
+                    piece = pieceType(color, position)
+                rank.append(piece)
+
+            if len(rank) != 8:
+                raise NotationError(fen, "Rank {} does not have 8 files".format(r + 1))
+            boardstate.append(rank)
+
+        if toMove == "w":
+            toMove = WHITE
+        elif toMove == "b":
+            toMove = BLACK
+        else:
+            raise NotationError(fen, "Player to move must be 'w' or 'b'")
+
+        if castling != "-":
+            for letter in castling:
+                if letter not in FENCASTLING:
+                    raise NotationError(fen, "Unknown castling right '{}'".format(letter))
+                right, rank, rookFile = FENCASTLING[letter]
+                color = WHITE if rank == 0 else BLACK
+                king = boardstate[rank][4]
+                rook = boardstate[rank][rookFile]
+                if (type(king) is not King or king.color is not color or
+                        type(rook) is not Rook or rook.color is not color):
+                    raise NotationError(fen, "No king and rook for castling right '{}'".format(letter))
+                king.hasMoved = False
+                rook.hasMoved = False
+
+        passantPos = None
+        if passant != "-":
+            if (len(passant) != 2 or passant[0] not in "abcdefgh" or
+                    passant[1] != ("6" if toMove is WHITE else "3")):
+                raise NotationError(fen, "Invalid en passant square '{}'".format(passant))
+            # The pawn has passed the en passant square
+            passantPos = (int(passant[1]) - 1 - toMove, ord(passant[0]) - 97)
+            pawn = boardstate[passantPos[0]][passantPos[1]]
+            if type(pawn) is not Pawn or pawn.color is toMove:
+                raise NotationError(fen, "No pawn to capture en passant on '{}'".format(passant))
+            pawn.passant = True
+
+        try:
+            halfmove = int(halfmove)
+            fullmove = int(fullmove)
+        except ValueError:
+            raise NotationError(fen, "Move counters must be integers")
+        if halfmove < 0 or fullmove < 1:
+            raise NotationError(fen, "Move counters out of range")
+
+        return cls._fromState(boardstate, toMove, passantPos, halfmove, fullmove)
+
+    @classmethod
+    def _fromState(cls, boardstate, toMove, passantPos=None, halfmove=0, fullmove=1,
+                   validate=True):
+        """
+        Return a new board taking ownership of the pieces of the given
+        boardstate, with the hasMoved and passant attributes of the
+        pieces already set. passantPos is the position of the pawn that
+        can be captured en passant, or None.
+
+        Raises StateError if validate is True and the position is invalid.
+        """
+        board = cls.__new__(cls)
+        board._reset()
+        board._populate((boardstate, toMove), copy=False)
+        board.halfmoveClock = halfmove
+        board.fullmoveNumber = fullmove
+        if passantPos is not None:
+            board.passantPos[-toMove] = passantPos
+            board.passantKey = board.passantHashKey(passantPos, -toMove)
+            board.zobrist ^= board.passantKey
+            board.repetitions = {board.zobrist: 1}
+
+        if validate:
+            stateValidity = board.validateState((boardstate, toMove), True)
+            if not stateValidity[0]:
+                # Invalid gamestate with reason stateValidity[1]
+                raise StateError(stateValidity[1])
+
+        return board
+
+    def toFEN(self):
+        """Return the position in Forsyth-Edwards Notation"""
+        rows = []
+        for rank in reversed(self.boardstate):
+            row = ""
+            empty = 0
+            for square in rank:
+                if square is None:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                letter = FENLETTERS[type(square)]
+                row += letter if square.color is WHITE else letter.lower()
+            if empty:
+                row += str(empty)
+            rows.append(row)
+
+        rights = self.castlingRights()
+        castling = "".join(letter for letter, (right, rank, rookFile) in FENCASTLING.items()
+                           if rights & right)
+
+        passant = "-"
+        passantPos = self.passantPawn()
+        if passantPos is not None:
+            # The square passed by the pawn
+            passant = chr(passantPos[1] + 97) + str(passantPos[0] + self.toMove + 1)
+
+        return "{} {} {} {} {} {}".format(
+            "/".join(rows), "w" if self.toMove is WHITE else "b", castling or "-",
+            passant, self.halfmoveClock, self.fullmoveNumber)
+
+    def copy(self, stack=True):
+        """
+        Return an independent copy of the board.
+
+        The pieces are copied directly along with the bitboards, hash
+        and counters, without populating or validating the board again.
+        When stack is False the move stack is left empty, which is
+        cheaper for long games, but the moves can't be taken back.
+
+        The copy is never frozen.
+        """
+        board = type(self).__new__(type(self))
+
+        # Copies of the pieces by the id of the original, for the
+        # references in the boardstate and the move stack
+        memo = {}
+        board.pieces = {}
+        for color, pieces in self.pieces.items():
+            living = []
+            for piece in pieces[LIVING]:
+                memo[id(piece)] = pieceCopy = piece.copy()
+                living.append(pieceCopy)
+            graveyard = []
+            for piece in pieces[GRAVEYARD]:
+                memo[id(piece)] = pieceCopy = piece.copy()
+                graveyard.append(pieceCopy)
+            board.pieces[color] = {LIVING: living, GRAVEYARD: graveyard,
+                                   KING: memo[id(pieces[KING])]}
+
+        board.boardstate = [[None if piece is None else memo[id(piece)] for piece in rank]
+                            for rank in self.boardstate]
+        board.toMove = self.toMove
+        board.passantPos = self.passantPos.copy()
+        board.bitboards = {color: bitboards.copy() for color, bitboards in self.bitboards.items()}
+        board.occupancy = self.occupancy.copy()
+        board.zobrist = self.zobrist
+        board.passantKey = self.passantKey
+        board.middlegameScore = self.middlegameScore
+        board.endgameScore = self.endgameScore
+        board.phase = self.phase
+        board.halfmoveClock = self.halfmoveClock
+        board.fullmoveNumber = self.fullmoveNumber
+        board.repetitions = self.repetitions.copy()
+        board.frozen = False
+
+        if stack and self.moveStack:
+            # The flags are shared, everything else refers to the copies
+            for flag in (CAPTURE, DOUBLE, MOVE, PROMOTE, RELOCATE):
+                memo[id(flag)] = flag
+            board.moveStack = copy.deepcopy(self.moveStack, memo)
+        else:
+            board.moveStack = []
+        return board
+
+    def freeze(self):
+        """
+        Freeze the board, so it can be shared by many readers without
+        copying, and return it.
+
+        A frozen board is never changed. The move, push, pop and
+        executeMoves methods raise MoveError, except for move with
+        validate set, which checks the move on a copy. Readers that need
+        to make moves, such as a search, work on a copy.
+        """
+        self.frozen = True
+        return self
 
     def __getitem__(self, key):
         """
@@ -130,10 +490,13 @@ class Board():
         of the valid range, IndexError is raised. This is
         done by the 'validateKey' method.
         """
-        # Validate key
-        keyValidity = self.validateKey(key)
-        if not keyValidity[0]:
+        # Validate key. Checked inline as this is on the hot path,
+        # validateKey is only consulted for the reason.
+        if not (type(key) is tuple and len(key) == 2 and
+                type(key[0]) is int and type(key[1]) is int and
+                0 <= key[0] < 8 and 0 <= key[1] < 8):
             # Invalid key with reason keyValidity[1]
+            keyValidity = self.validateKey(key)
             raise IndexError(keyValidity[1], key)
 
         return self.boardstate[key[0]][key[1]]
@@ -151,18 +514,44 @@ class Board():
 
         If the given value is neither None or an instance
         of Piece, TypeError is raised.
+
+        The bitboards are updated to reflect the change.
         """
-        # Validate key
-        keyValidity = self.validateKey(key)
-        if not keyValidity[0]:
+        # Validate key. Checked inline as this is on the hot path,
+        # validateKey is only consulted for the reason.
+        if not (type(key) is tuple and len(key) == 2 and
+                type(key[0]) is int and type(key[1]) is int and
+                0 <= key[0] < 8 and 0 <= key[1] < 8):
             # Invalid key with reason keyValidity[1]
+            keyValidity = self.validateKey(key)
             raise IndexError(keyValidity[1], key)
+        rank, _file = key
 
         # Validate new value
         if value is not None and not isinstance(value, Piece):
             raise TypeError("Given value must be either None, or an instance of Piece")
 
-        self.boardstate[key[0]][key[1]] = value
+        square = rank * 8 + _file
+        bit = BB_SQUARES[square]
+        old = self.boardstate[rank][_file]
+        if old is not None:
+            color, pieceType = old.color, type(old)
+            self.bitboards[color][pieceType] ^= bit
+            self.occupancy[color] ^= bit
+            self.zobrist ^= PIECEKEYS[color][pieceType][square]
+            self.middlegameScore -= MIDDLEGAME[color][pieceType][square]
+            self.endgameScore -= ENDGAME[color][pieceType][square]
+            self.phase -= PHASES[pieceType]
+        if value is not None:
+            color, pieceType = value.color, type(value)
+            self.bitboards[color][pieceType] |= bit
+            self.occupancy[color] |= bit
+            self.zobrist ^= PIECEKEYS[color][pieceType][square]
+            self.middlegameScore += MIDDLEGAME[color][pieceType][square]
+            self.endgameScore += ENDGAME[color][pieceType][square]
+            self.phase += PHASES[pieceType]
+
+        self.boardstate[rank][_file] = value
 
 
     @staticmethod
@@ -236,38 +625,125 @@ class Board():
 
     def isContested(self, player, position):
         """Return True if given position is contested by the given player."""
-        attacking = self.pieces[player][LIVING]
-
         target = self[position]
         if target is not None:
             if target.color is player:
                 return False
 
-        dummy = Piece(-player)
-        self[position] = dummy
+        return self.isAttacked(player, toSquare(position))
 
-        for attacker in attacking:
-            valid, consequences = attacker.validateMove(self, position)
-            if valid:
-                break
+    def isAttacked(self, player, square):
+        """
+        Return True if the given player attacks the given square index.
 
-        # Reset position
-        self[position] = target
+        Looks up attacks from the square using the attack tables, and
+        tests whether they hit a piece of the corresponding type.
+        """
+        bitboards = self.bitboards[player]
+        if KNIGHT_ATTACKS[square] & bitboards[Knight]:
+            return True
+        if KING_ATTACKS[square] & bitboards[King]:
+            return True
+        # A pawn attacks the square if a pawn of the opposite color on
+        # the square would attack the pawn
+        if PAWN_ATTACKS[-player][square] & bitboards[Pawn]:
+            return True
 
-        return valid
+        occupied = self.occupancy[WHITE] | self.occupancy[BLACK]
+        queens = bitboards[Queen]
+        if bishopAttacks(square, occupied) & (bitboards[Bishop] | queens):
+            return True
+        if rookAttacks(square, occupied) & (bitboards[Rook] | queens):
+            return True
+
+        return False
 
     def inCheck(self, player):
         """Return True if given player is currently in check."""
-        kingPos = self.pieces[player][KING].position
-        return self.isContested(-player, kingPos)
+        king = self.bitboards[player][King]
+        return self.isAttacked(-player, king.bit_length() - 1)
+
+    def attackers(self, player, position):
+        """
+        Return a list of the positions of the pieces of the given player
+        attacking the given position.
+
+        Like isAttacked, the attackers are found by looking up attacks
+        from the position, so no moves are validated.
+        """
+        occupied = self.occupancy[WHITE] | self.occupancy[BLACK]
+        attackers = self._attackersTo(player, toSquare(position), occupied)
+        return [toPosition(square) for square in iterBits(attackers)]
+
+    def checkers(self):
+        """Return a list of the positions of the pieces giving check to the player to move"""
+        king = self.bitboards[self.toMove][King]
+        return self.attackers(-self.toMove, toPosition(king.bit_length() - 1))
+
+    def hasLegalMoves(self):
+        """
+        Return True if the player to move has a legal move.
+
+        Stops at the first legal move generated, which is usually a
+        king move, so this is much cheaper than listing every move.
+        """
+        for move in self.legalMoves():
+            return True
+        return False
+
+    def isCheckmate(self):
+        """Return True if the player to move is checkmated"""
+        return self.inCheck(self.toMove) and not self.hasLegalMoves()
+
+    def isStalemate(self):
+        """Return True if the player to move is stalemated"""
+        return not self.inCheck(self.toMove) and not self.hasLegalMoves()
+
+    def isFiftyMoves(self):
+        """Return True if a draw can be claimed by the fifty move rule"""
+        return self.halfmoveClock >= 100
+
+    def isRepetition(self, count=3):
+        """
+        Return True if the current position has been reached at least
+        count times in the game.
+
+        Positions are compared by their Zobrist hash, which covers the
+        player to move, the castling rights and the en passant file.
+        """
+        return self.repetitions.get(self.zobrist, 0) >= count
+
+    def outcome(self):
+        """
+        Return the Outcome of the game if it has ended, or None.
+
+        Checkmate and stalemate are tested first, so a checkmate on the
+        fiftieth move still ends the game with a win. Draws by the fifty
+        move rule and threefold repetition are returned as soon as they
+        can be claimed.
+        """
+        if not self.hasLegalMoves():
+            if self.inCheck(self.toMove):
+                return Outcome(CHECKMATE, -self.toMove)
+            return Outcome(STALEMATE, None)
+        if self.isFiftyMoves():
+            return Outcome(FIFTYMOVES, None)
+        if self.isRepetition():
+            return Outcome(REPETITION, None)
+        return None
 
     def move(self, current, target, promotion=None, validate=False):
         """
         Execute given move if valid, otherwise raise MoveError.
         
         When validate is True, simply return whether the move is
-        valid.
+        valid. A frozen board is never changed: validation is done on a
+        copy, and executing a move raises MoveError.
         """
+        if self.frozen:
+            if not validate:
+                raise MoveError("Board is frozen, no moves can be made!")
+            return self.copy(stack=False).move(current, target, promotion, validate=True)
         piece = self[current]
         if piece is None:
             if validate:
@@ -292,10 +768,116 @@ class Board():
             else:
                 raise MoveError("Piece cannot move there!")
 
-        # Execute consequences
-        undodict = {}
-        for flag in consequences:
-            undodict[flag] = flag.execute(board=self, data=consequences[flag])
+        undo = self._execute(current, target, consequences)
+
+        if self.inCheck(self.toMove):
+            # Moving player is in check -> invalid move
+            self._revert(undo)
+
+            if validate:
+                return False
+            else:
+                raise MoveError("Move leaves king in check!")
+        elif validate:
+            self._revert(undo)
+            return True
+
+        self.moveStack.append(Undo((current, target, promotion), undo, self._endTurn()))
+        self._countPosition()
+
+    def push(self, move):
+        """
+        Execute a (current, target, promotion) move known to be legal,
+        such as one from legalMoves, and put it on the move stack.
+
+        Unlike the move method, the move is not validated.
+        """
+        if self.frozen:
+            raise MoveError("Board is frozen, no moves can be made!")
+        self.moveStack.append(self._make(*move))
+        self._countPosition()
+
+    def pop(self):
+        """
+        Take back the last move on the move stack, and return it as a
+        (current, target, promotion) tuple.
+
+        Raises IndexError if there are no moves to take back.
+        """
+        if self.frozen:
+            raise MoveError("Board is frozen, no moves can be taken back!")
+        if not self.moveStack:
+            raise IndexError("No moves to take back")
+        undo = self.moveStack.pop()
+        self._uncountPosition()
+        self._unmake(undo)
+        return undo.move
+
+    def executeMoves(self, moves):
+        """
+        Execute the given moves in algebraic notation in order.
+
+        Each move is matched against the legal moves, and then executed
+        directly without the trial execution done by the move method.
+
+        If a move is invalid, MoveError is raised with the index of the
+        move in its ply attribute. The board is then left in the
+        position before that move.
+        """
+        # Imported here, as the interpreter depends on this module
+        from .interpreter import interpretMove
+
+        if self.frozen:
+            raise MoveError("Board is frozen, no moves can be made!")
+
+        for ply, mvStr in enumerate(moves):
+            try:
+                current, target, promotion = interpretMove(self, mvStr)
+            except MoveError as e:
+                error = MoveError(mvStr, "Ply {}: {}".format(ply + 1, e.reason))
+                error.ply = ply
+                raise error from e
+            self.moveStack.append(self._make(current, target, promotion))
+            self._countPosition()
+
+    def _countPosition(self):
+        """Count the current position in the repetitions"""
+        repetitions = self.repetitions
+        repetitions[self.zobrist] = repetitions.get(self.zobrist, 0) + 1
+
+    def _uncountPosition(self):
+        """Remove the current position from the repetitions, before it is taken back"""
+        repetitions = self.repetitions
+        count = repetitions[self.zobrist] - 1
+        if count:
+            repetitions[self.zobrist] = count
+        else:
+            del repetitions[self.zobrist]
+
+    def _execute(self, current, target, consequences):
+        """
+        Execute the consequences of a move and move the piece, without
+        validation and without passing the turn.
+
+        Returns the data needed by _revert to undo the move.
+        """
+        rights = self.castlingRights()
+
+        # Reset the halfmove clock on pawn moves and captures
+        halfmoveClock = self.halfmoveClock
+        if CAPTURE in consequences or type(self[current]) is Pawn:
+            self.halfmoveClock = 0
+        else:
+            self.halfmoveClock += 1
+
+        # The en passant file is only hashed for a single turn
+        passantKey = self.passantKey
+        self.zobrist ^= passantKey
+        self.passantKey = 0
+
+        # Execute consequences, keeping the revert data of each flag
+        flags = tuple((flag, flag.execute(board=self, data=data))
+                      for flag, data in consequences.items())
         # Update reference to piece in case of promotion
         piece = self[current]
 
@@ -304,47 +886,387 @@ class Board():
         piece.position = target
 
         # Set hasMoved property if present
-        setMoved = False
-        try:
-            hadMoved = piece.hasMoved
-        except AttributeError:
-            pass
-        else:
-            setMoved = True
+        hadMoved = getattr(piece, "hasMoved", None)
+        if hadMoved is not None:
             piece.hasMoved = True
 
-        if self.inCheck(self.toMove):
-            # Moving player is in check -> invalid move
-            # Undo move (swap back)
-            self[current], self[target] = self[target], self[current]
-            piece.position = current
-            if setMoved:
-                piece.hasMoved = hadMoved
-            # Undo from undodict
-            for flag in undodict:
-                flag.revert(board=self, revData=undodict[flag])
+        # Castling rights are lost by moving or capturing kings and rooks
+        self.zobrist ^= CASTLINGKEYS[rights ^ self.castlingRights()]
 
-            if validate:
-                return False
-            else:
-                raise MoveError("Move leaves king in check!")
-        elif validate:
-            # Undo move (swap back)
-            self[current], self[target] = self[target], self[current]
-            piece.position = current
-            if setMoved:
-                piece.hasMoved = hadMoved
-            # Undo from undodict
-            for flag in undodict:
-                flag.revert(board=self, revData=undodict[flag])
-            return True
+        return current, target, flags, hadMoved, passantKey, halfmoveClock
 
+    def _revert(self, undo):
+        """Undo a move executed by _execute"""
+        current, target, flags, hadMoved, passantKey, halfmoveClock = undo
+        rights = self.castlingRights()
+
+        # Undo move (swap back)
+        piece = self[target]
+        self[current], self[target] = self[target], self[current]
+        piece.position = current
+        if hadMoved is not None:
+            piece.hasMoved = hadMoved
+
+        # Revert the flags, in reverse order of execution
+        for flag, revData in reversed(flags):
+            flag.revert(board=self, revData=revData)
+
+        self.zobrist ^= CASTLINGKEYS[rights ^ self.castlingRights()]
+        self.zobrist ^= passantKey
+        self.passantKey = passantKey
+        self.halfmoveClock = halfmoveClock
+
+    def _endTurn(self):
+        """
+        Pass the turn to the other player, and reset the passant
+        attribute of their pawn that moved two squares last turn.
+
+        Returns the data needed by _resumeTurn to undo this.
+        """
         self.toMove = -self.toMove
+        self.zobrist ^= TURNKEY
+        if self.toMove is WHITE:
+            self.fullmoveNumber += 1
 
-        passantSquare = self.passantPos[self.toMove] 
+        passantSquare = self.passantPos[self.toMove]
+        passantPawn = None
+        wasPassant = False
         if passantSquare is not None:
-            if self[passantSquare] is not None:
-                # Piece was not captured last move
-                self[passantSquare].passant = False
-                self.passantPos[self.toMove] = None
+            piece = self[passantSquare]
+            if type(piece) is Pawn:
+                # Pawn was not captured last move
+                passantPawn, wasPassant = piece, piece.passant
+                piece.passant = False
+            self.passantPos[self.toMove] = None
+
+        return passantSquare, passantPawn, wasPassant
+
+    def _resumeTurn(self, passantData):
+        """Undo a call to _endTurn"""
+        passantSquare, passantPawn, wasPassant = passantData
+        self.passantPos[self.toMove] = passantSquare
+        if passantPawn is not None:
+            passantPawn.passant = wasPassant
+
+        if self.toMove is WHITE:
+            self.fullmoveNumber -= 1
+        self.toMove = -self.toMove
+        self.zobrist ^= TURNKEY
+
+    def _make(self, current, target, promotion=None):
+        """
+        Execute a move known to be legal, such as one from legalMoves,
+        skipping the check test done by the move method.
+
+        Returns the Undo record needed by _unmake to undo the move.
+        """
+        piece = self.boardstate[current[0]][current[1]]
+        if type(piece) is Pawn:
+            moveValid, consequences = piece.validateMove(board=self, target=target, promotion=promotion)
+        else:
+            moveValid, consequences = piece.validateMove(board=self, target=target)
+
+        moveData = self._execute(current, target, consequences)
+        return Undo((current, target, promotion), moveData, self._endTurn())
+
+    def _unmake(self, undo):
+        """Undo a move executed by _make, given its Undo record"""
+        self._resumeTurn(undo.passantData)
+        self._revert(undo.moveData)
+
+    def perft(self, depth):
+        """
+        Return the number of leaf nodes in the tree of legal moves
+        of the given depth from the current position.
+
+        Moves are made with the same validateMove consequences as the
+        move method, so the counts check both move generation and
+        execution against known values.
+        """
+        if depth < 1:
+            return 1
+
+        # Generate all moves up front, as the generator reads the
+        # bitboards lazily
+        moves = list(self.legalMoves())
+        if depth == 1:
+            return len(moves)
+
+        nodes = 0
+        for move in moves:
+            undo = self._make(*move)
+            nodes += self.perft(depth - 1)
+            self._unmake(undo)
+        return nodes
+
+    def divide(self, depth):
+        """
+        Return a dict mapping every legal move to the perft of the
+        given depth below it. Useful to find the move whose subtree
+        differs from a reference.
+        """
+        result = {}
+        for move in list(self.legalMoves()):
+            undo = self._make(*move)
+            result[move] = self.perft(depth - 1)
+            self._unmake(undo)
+        return result
+
+    def castlingRights(self):
+        """
+        Return the castling rights as a mask of the WHITE_KINGSIDE,
+        WHITE_QUEENSIDE, BLACK_KINGSIDE and BLACK_QUEENSIDE bits.
+
+        A right is held while the king and the rook on that side are
+        unmoved on their starting squares.
+        """
+        rights = 0
+        for rank, color, kingside, queenside in ((0, WHITE, WHITE_KINGSIDE, WHITE_QUEENSIDE),
+                                                 (7, BLACK, BLACK_KINGSIDE, BLACK_QUEENSIDE)):
+            squares = self.boardstate[rank]
+            king = squares[4]
+            if type(king) is not King or king.color is not color or king.hasMoved:
+                continue
+            rook = squares[7]
+            if type(rook) is Rook and rook.color is color and not rook.hasMoved:
+                rights |= kingside
+            rook = squares[0]
+            if type(rook) is Rook and rook.color is color and not rook.hasMoved:
+                rights |= queenside
+        return rights
+
+    def passantPawn(self):
+        """
+        Return the position of the opposing pawn that can be captured
+        en passant by the player to move, or None.
+        """
+        passantPos = self.passantPos[-self.toMove]
+        if passantPos is None:
+            return None
+        pawn = self.boardstate[passantPos[0]][passantPos[1]]
+        if type(pawn) is Pawn and pawn.passant and pawn.color is not self.toMove:
+            return passantPos
+        return None
+
+    def passantHashKey(self, position, player):
+        """
+        Return the key hashing in the en passant file for a pawn of the
+        given player that has moved two squares to the given position.
+
+        The key is 0 unless an opposing pawn is ready to capture it.
+        """
+        passed = toSquare(position) - 8 * player
+        if PAWN_ATTACKS[player][passed] & self.bitboards[-player][Pawn]:
+            return PASSANTKEYS[position[1]]
+        return 0
+
+    def zobristHash(self):
+        """
+        Compute the Zobrist hash of the position from scratch.
+
+        The zobrist attribute holds the same value, kept up to date
+        incrementally.
+        """
+        key = 0
+        for color in (WHITE, BLACK):
+            for pieceType, bb in self.bitboards[color].items():
+                keys = PIECEKEYS[color][pieceType]
+                for square in iterBits(bb):
+                    key ^= keys[square]
+
+        key ^= CASTLINGKEYS[self.castlingRights()]
+
+        passantPos = self.passantPawn()
+        if passantPos is not None:
+            key ^= self.passantHashKey(passantPos, -self.toMove)
+
+        if self.toMove is WHITE:
+            key ^= TURNKEY
+        return key
+
+    def pieceSquareScores(self):
+        """
+        Compute the middlegame and endgame material and piece-square
+        scores and the phase from scratch, returned as a tuple.
+
+        The middlegameScore, endgameScore and phase attributes hold the
+        same values, kept up to date incrementally.
+        """
+        middlegame = endgame = phase = 0
+        for color in (WHITE, BLACK):
+            for pieceType, bb in self.bitboards[color].items():
+                for square in iterBits(bb):
+                    middlegame += MIDDLEGAME[color][pieceType][square]
+                    endgame += ENDGAME[color][pieceType][square]
+                    phase += PHASES[pieceType]
+        return middlegame, endgame, phase
+
+    def _attackersTo(self, player, square, occupied):
+        """
+        Return a bitboard of the pieces of the given player attacking
+        the given square index, with sliders blocked by occupied.
+        """
+        bitboards = self.bitboards[player]
+        queens = bitboards[Queen]
+        return ((KNIGHT_ATTACKS[square] & bitboards[Knight]) |
+                (KING_ATTACKS[square] & bitboards[King]) |
+                (PAWN_ATTACKS[-player][square] & bitboards[Pawn]) |
+                (bishopAttacks(square, occupied) & (bitboards[Bishop] | queens)) |
+                (rookAttacks(square, occupied) & (bitboards[Rook] | queens)))
+
+    def legalMoves(self):
+        """
+        Yield every legal move for the player to move.
+
+        Moves are given as Move tuples of (current, target, promotion),
+        which can be passed directly to the move method. Pawn moves to the
+        last rank are yielded once for each promotion symbol.
+
+        Legality is determined directly from the bitboards: pieces pinned
+        to the king are restricted to the line of the pin, and when in
+        check only captures of and interpositions against the checking
+        piece are generated. Only the king may move in double check.
+        """
+        player = self.toMove
+        opponent = -player
+        ours = self.bitboards[player]
+        theirs = self.bitboards[opponent]
+        own = self.occupancy[player]
+        occupied = own | self.occupancy[opponent]
+
+        king = ours[King]
+        kingSquare = king.bit_length() - 1
+        kingPos = toPosition(kingSquare)
+
+        # King moves, with the king lifted off the board so it can't
+        # block sliders attacking the squares behind it
+        withoutKing = occupied ^ king
+        for target in iterBits(KING_ATTACKS[kingSquare] & ~own):
+            if not self._attackersTo(opponent, target, withoutKing):
+                yield MOVES[kingSquare * 64 + target]
+
+        checkers = self._attackersTo(opponent, kingSquare, occupied)
+        if checkers & (checkers - 1):
+            # Double check, only the king can move
+            return
+
+        if checkers:
+            # Capture the checker or interpose
+            checker = checkers.bit_length() - 1
+            evasions = checkers | BETWEEN[kingSquare][checker]
+        else:
+            evasions = ~0
+            yield from self._castlingMoves(player, kingPos)
+
+        # Find pieces pinned to the king. Each pinned piece may only
+        # move along the line between the king and the pinning piece
+        pinned = BB_EMPTY
+        snipers = ((rookAttacks(kingSquare, BB_EMPTY) & (theirs[Rook] | theirs[Queen])) |
+                   (bishopAttacks(kingSquare, BB_EMPTY) & (theirs[Bishop] | theirs[Queen])))
+        for sniper in iterBits(snipers):
+            blockers = BETWEEN[kingSquare][sniper] & occupied
+            if blockers & own and not blockers & (blockers - 1):
+                pinned |= blockers
+
+        targets = ~own & evasions
+
+        # Knights can never move along a pin
+        for square in iterBits(ours[Knight] & ~pinned):
+            index = square * 64
+            for target in iterBits(KNIGHT_ATTACKS[square] & targets):
+                yield MOVES[index + target]
+
+        for pieceType, attacks in ((Bishop, bishopAttacks),
+                                   (Rook, rookAttacks),
+                                   (Queen, queenAttacks)):
+            for square in iterBits(ours[pieceType]):
+                moves = attacks(square, occupied) & targets
+                if pinned & BB_SQUARES[square]:
+                    moves &= LINE[kingSquare][square]
+                index = square * 64
+                for target in iterBits(moves):
+                    yield MOVES[index + target]
+
+        yield from self._pawnMoves(player, kingSquare, pinned, evasions)
+
+    def _pawnMoves(self, player, kingSquare, pinned, evasions):
+        """Yield legal pawn moves for the legalMoves method"""
+        opponent = -player
+        occupied = self.occupancy[WHITE] | self.occupancy[BLACK]
+        enemy = self.occupancy[opponent]
+        # Pawns moving to the last rank start on this rank
+        promotionRank = 6 if player is WHITE else 1
+
+        for square in iterBits(self.bitboards[player][Pawn]):
+            rank, _file = toPosition(square)
+            pawn = self.boardstate[rank][_file]
+
+            # Captures, and pushes to empty squares
+            moves = PAWN_ATTACKS[player][square] & enemy
+            push = square + 8 * player
+            if not occupied & BB_SQUARES[push]:
+                moves |= BB_SQUARES[push]
+                double = push + 8 * player
+                if not pawn.hasMoved and 0 <= double < 64 and not occupied & BB_SQUARES[double]:
+                    moves |= BB_SQUARES[double]
+
+            moves &= evasions
+            if pinned & BB_SQUARES[square]:
+                moves &= LINE[kingSquare][square]
+
+            index = square * 64
+            if rank == promotionRank:
+                for target in iterBits(moves):
+                    yield from PROMOTIONMOVES[index + target]
+            else:
+                for target in iterBits(moves):
+                    yield MOVES[index + target]
+
+        # En passant
+        passantPos = self.passantPawn()
+        if passantPos is None:
+            return
+        captured = toSquare(passantPos)
+        target = captured + 8 * player
+        for square in iterBits(PAWN_ATTACKS[opponent][target] & self.bitboards[player][Pawn]):
+            # Test for check after removing both pawns from their squares.
+            # This also covers the pawns being pinned along a rank
+            after = occupied ^ BB_SQUARES[square] ^ BB_SQUARES[captured] | BB_SQUARES[target]
+            attackers = self._attackersTo(opponent, kingSquare, after) & ~BB_SQUARES[captured]
+            if not attackers:
+                yield MOVES[square * 64 + target]
+
+    def _castlingMoves(self, player, kingPos):
+        """
+        Yield legal castling moves for the legalMoves method.
+
+        Mirrors the rules of King.validateMove, and assumes the king
+        is not in check.
+        """
+        king = self.boardstate[kingPos[0]][kingPos[1]]
+        if king.hasMoved or kingPos[0] != (0 if player is WHITE else 7):
+            return
+
+        rank, kingFile = kingPos
+        for dirFile in (1, -1):
+            if not 0 <= kingFile + 2 * dirFile < 8:
+                continue
+
+            # Scan for rook
+            _file = kingFile + dirFile
+            while 0 <= _file < 8 and self.boardstate[rank][_file] is None:
+                _file += dirFile
+            if not 0 <= _file < 8:
+                continue
+            rook = self.boardstate[rank][_file]
+            if (type(rook) is not Rook or rook.color is not player or
+                    rook.hasMoved or abs(_file - kingFile) < 3):
+                continue
+
+            # Can't pass through or land on an attacked square
+            passing = rank * 8 + kingFile + dirFile
+            if self.isAttacked(-player, passing) or self.isAttacked(-player, passing + dirFile):
+                continue
 
+            kingSquare = rank * 8 + kingFile
+            yield MOVES[kingSquare * 64 + kingSquare + 2 * dirFile]
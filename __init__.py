@@ -2,3 +2,5 @@
 
 __all__ = ["pieces", "Board", "utilities"]
 
+# Import the board first, as the piece modules import it while loading
+from . import Board
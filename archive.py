@@ -0,0 +1,493 @@
+#! /usr/bin/env python3
+
+"""
+Compact binary storage of positions and games
+
+A position is packed into 27 bytes: the occupied squares as a 64-bit
+bitboard, a 4-bit code for each occupied square in order, and the move
+counters. Castling rights, the en passant pawn and the player to move
+take no room of their own, as they are folded into the piece codes.
+
+A game is stored as the index of each move among the legal moves of
+its position, sorted by square, so a move takes a single byte. Games
+are written one after the other to an archive file, and the offset of
+each game to an index file next to it, so game N is found in constant
+time however large the archive is.
+
+Archives are read through memory maps. Reading a game gives views of
+the mapped file instead of copies, so scanning an archive touches
+nothing but the pages of the games read.
+
+Run as a module to pack the games of a PGN file, or show a game:
+
+    python -m chess.archive pack games.pgn games.bin
+    python -m chess.archive show games.bin 12345
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from collections import namedtuple
+
+from .Board import Board
+from .pieces import *
+from .bitboards import *
+from .zobrist import *
+from .interpreter import interpretMove, movesToSAN
+from .utilities import ChessError, MoveError, StateError
+
+__all__ = ["POSITIONSIZE", "StoredGame", "encodePosition", "decodePosition",
+           "encodeMoves", "decodeMoves", "GameWriter", "GameArchive"]
+
+
+# Occupied squares, piece codes, halfmove clock and fullmove number
+POSITION = struct.Struct("<Q16sBH")
+POSITIONSIZE = POSITION.size
+
+# Flags and number of plies at the start of each game
+GAMEHEADER = struct.Struct("<BH")
+OFFSET = struct.Struct("<Q")
+
+MAGIC = b"chessgm\x01"
+INDEXSUFFIX = ".idx"
+
+# Results by the two lowest bits of the flags of a game
+RESULTS = ("*", "1-0", "0-1", "1/2-1/2")
+# Flag set when the game starts from a stored position instead of the
+# standard starting position
+CUSTOMSTART = 4
+
+# Piece codes 0-11 by color and type. The remaining codes mark pieces
+# that carry part of the state of the position
+PIECETYPES = (Pawn, Knight, Bishop, Rook, Queen, King)
+CODES = {color: {pieceType: index + offset for index, pieceType in enumerate(PIECETYPES)}
+         for color, offset in ((WHITE, 0), (BLACK, 6))}
+PIECES = [(WHITE, pieceType) for pieceType in PIECETYPES] + \
+    [(BLACK, pieceType) for pieceType in PIECETYPES]
+# A pawn that can be captured en passant, white on rank 4 or black on rank 5
+PASSANTPAWN = 12
+# A rook that can still castle, and a black king with black to move
+CASTLINGROOK = {WHITE: 13, BLACK: 14}
+BLACKKINGTOMOVE = 15
+
+# Squares of the rooks of each castling right
+CASTLINGSQUARES = ((WHITE_KINGSIDE, 7), (WHITE_QUEENSIDE, 0),
+                   (BLACK_KINGSIDE, 63), (BLACK_QUEENSIDE, 56))
+
+PROMOTIONORDER = {None: 0, "N": 1, "B": 2, "R": 3, "Q": 4}
+
+# Game read from an archive
+# result: the result of the game, "1-0", "0-1", "1/2-1/2" or "*"
+# start: view of the packed starting position, or None for the
+#     standard starting position
+# moves: view of the move indices, one byte per ply
+StoredGame = namedtuple("StoredGame", ("result", "start", "moves"))
+
+
+def encodePosition(board):
+    """
+    Return the position on the board packed into POSITIONSIZE bytes.
+
+    Raises StateError if the position doesn't fit, that is more than
+    32 pieces, a halfmove clock above 255 or a fullmove number above
+    65535.
+    """
+    if board.halfmoveClock > 0xFF or board.fullmoveNumber > 0xFFFF:
+        raise StateError(board.toFEN(), "Move counters too large to store")
+    occupied = board.occupancy[WHITE] | board.occupancy[BLACK]
+    if popCount(occupied) > 32:
+        raise StateError(board.toFEN(), "More than 32 pieces to store")
+    rights = board.castlingRights()
+    rooks = {square for right, square in CASTLINGSQUARES if rights & right}
+    passantPos = board.passantPawn()
+    passant = None if passantPos is None else toSquare(passantPos)
+    blackToMove = board.toMove is BLACK
+
+    boardstate = board.boardstate
+    codes = bytearray(16)
+    for index, square in enumerate(iterBits(occupied)):
+        piece = boardstate[square >> 3][square & 7]
+        if square in rooks:
+            code = CASTLINGROOK[piece.color]
+        elif square == passant:
+            code = PASSANTPAWN
+        elif blackToMove and type(piece) is King and piece.color is BLACK:
+            code = BLACKKINGTOMOVE
+        else:
+            code = CODES[piece.color][type(piece)]
+        codes[index >> 1] |= code << (index & 1) * 4
+    return POSITION.pack(occupied, bytes(codes), board.halfmoveClock, board.fullmoveNumber)
+
+
+def decodePosition(data, offset=0, validate=True):
+    """
+    Return a new board with the position packed by encodePosition at
+    the given offset of data, which may be any bytes-like object.
+
+    The position is validated like by fromFEN unless validate is False,
+    which is faster for archives known to be good. Raises StateError if
+    the position is invalid.
+    """
+    occupied, codes, halfmove, fullmove = POSITION.unpack_from(data, offset)
+    boardstate = [[None] * 8 for rank in range(8)]
+    toMove = WHITE
+    passantPos = None
+    castling = set()
+
+    for index, square in enumerate(iterBits(occupied)):
+        if index >= 32:
+            raise StateError("{:016x}".format(occupied), "More than 32 pieces")
+        code = codes[index >> 1] >> (index & 1) * 4 & 15
+        position = POSITIONS[square]
+        rank = position[0]
+        if code < PASSANTPAWN:
+            color, pieceType = PIECES[code]
+        elif code == PASSANTPAWN:
+            color, pieceType = (WHITE if rank == 3 else BLACK), Pawn
+            passantPos = position
+        elif code == BLACKKINGTOMOVE:
+            color, pieceType = BLACK, King
+            toMove = BLACK
+        else:
+            color = WHITE if code == CASTLINGROOK[WHITE] else BLACK
+            pieceType = Rook
+            castling.add(color)
+
+        if pieceType is Pawn:
+            piece = Pawn(color, position, hasMoved=rank != (1 if color is WHITE else 6),
+                         passant=position is passantPos)
+        elif pieceType is Rook:
+            piece = Rook(color, position, hasMoved=code < PASSANTPAWN)
+        elif pieceType is King:
+            # Unmoved if one of its rooks can castle, checked below
+            piece = King(color, position, hasMoved=True)
+        else:
+            piece = pieceType(color, position)
+        boardstate[rank][position[1]] = piece
+
+    for color in castling:
+        king = boardstate[0 if color is WHITE else 7][4]
+        if type(king) is not King or king.color is not color:
+            raise StateError("{:016x}".format(occupied),
+                             "Castling rook without a king on its starting square")
+        king.hasMoved = False
+    if passantPos is not None and passantPos[0] != (4 if toMove is WHITE else 3):
+        raise StateError("{:016x}".format(occupied), "En passant pawn on the wrong rank")
+
+    return Board._fromState(boardstate, toMove, passantPos, halfmove, fullmove, validate)
+
+
+def _moveOrder(move):
+    """Sort key of a (current, target, promotion) move in a stored game"""
+    current, target, promotion = move
+    return ((current[0] * 8 + current[1]) * 64 + target[0] * 8 + target[1]) * 5 + \
+        PROMOTIONORDER[promotion]
+
+
+def _sortedMoves(board):
+    """Return the legal moves in the order their indices are stored in"""
+    return sorted(board.legalMoves(), key=_moveOrder)
+
+
+def encodeMoves(board, moves):
+    """
+    Return the given moves, played in order from the position on the
+    board, as bytes of their indices among the sorted legal moves. The
+    board is left in the current position.
+
+    Raises MoveError if a move is not legal, with the index of the move
+    in its ply attribute.
+    """
+    if board.frozen:
+        board = board.copy(stack=False)
+    indices = bytearray()
+    undos = []
+    try:
+        for ply, move in enumerate(moves):
+            legal = _sortedMoves(board)
+            try:
+                indices.append(legal.index(move))
+            except ValueError:
+                error = MoveError(move, "Ply {}: Illegal move!".format(ply + 1))
+                error.ply = ply
+                raise error from None
+            undos.append(board._make(*move))
+    finally:
+        for undo in reversed(undos):
+            board._unmake(undo)
+    return bytes(indices)
+
+
+def decodeMoves(board, indices):
+    """
+    Return a list of the (current, target, promotion) moves stored as
+    indices by encodeMoves, played from the position on the board. The
+    board is left in the current position.
+
+    Raises MoveError if an index is out of range, with the index of the
+    move in its ply attribute.
+    """
+    if board.frozen:
+        board = board.copy(stack=False)
+    moves = []
+    undos = []
+    try:
+        for ply, index in enumerate(indices):
+            legal = _sortedMoves(board)
+            if index >= len(legal):
+                error = MoveError(index, "Ply {}: Only {} legal moves!".format(ply + 1, len(legal)))
+                error.ply = ply
+                raise error
+            move = legal[index]
+            moves.append(move)
+            undos.append(board._make(*move))
+    finally:
+        for undo in reversed(undos):
+            board._unmake(undo)
+    return moves
+
+
+def _checkLength(moves):
+    """Raise StateError if a game has too many plies to store"""
+    if len(moves) > 0xFFFF:
+        raise StateError(len(moves), "Games are stored with up to 65535 plies")
+
+
+class GameWriter():
+    """
+    Properties:
+
+    path: path of the archive file. The index file has the same path
+        followed by .idx.
+
+    games: number of games in the archive, including those written
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._data = open(path, "ab")
+        self._index = open(path + INDEXSUFFIX, "ab")
+        if self._data.tell() == 0:
+            self._data.write(MAGIC)
+        self._offset = self._data.tell()
+        self.games = self._index.tell() // OFFSET.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def close(self):
+        """Flush and close the archive and index files"""
+        self._data.close()
+        self._index.close()
+
+    def write(self, moves, start=None, result="*"):
+        """
+        Append a game given as a list of (current, target, promotion)
+        moves, played from the start board or the standard starting
+        position, and return its number in the archive.
+
+        Raises MoveError if a move is not legal, and StateError if the
+        game is too long to store.
+        """
+        _checkLength(moves)
+        board = Board() if start is None else start
+        return self._writeGame(start, result, encodeMoves(board, moves))
+
+    def writeSAN(self, moves, fen=None, result="*"):
+        """
+        Append a game given as a list of moves in algebraic notation,
+        played from the position given by fen or the standard starting
+        position, and return its number in the archive.
+
+        Raises NotationError if the FEN is malformed, MoveError if a move
+        can't be played, with the index of the move in its ply attribute,
+        and StateError if the game is too long to store.
+        """
+        _checkLength(moves)
+        start = None if fen is None else Board.fromFEN(fen)
+        board = Board() if start is None else start.copy(stack=False)
+        indices = bytearray()
+        for ply, mvStr in enumerate(moves):
+            legal = _sortedMoves(board)
+            try:
+                move = interpretMove(board, mvStr)
+            except MoveError as e:
+                error = MoveError(mvStr, "Ply {}: {}".format(ply + 1, e.reason))
+                error.ply = ply
+                raise error from e
+            indices.append(legal.index(move))
+            board._make(*move)
+        return self._writeGame(start, result, indices)
+
+    def _writeGame(self, start, result, indices):
+        """Append a game given as move indices and return its number"""
+        flags = RESULTS.index(result)
+        record = bytearray(GAMEHEADER.size)
+        if start is not None:
+            flags |= CUSTOMSTART
+            record += encodePosition(start)
+        GAMEHEADER.pack_into(record, 0, flags, len(indices))
+        record += indices
+        self._writeRecord(record)
+        return self.games - 1
+
+    def _writeRecord(self, record):
+        self._index.write(OFFSET.pack(self._offset))
+        self._data.write(record)
+        self._offset += len(record)
+        self.games += 1
+
+
+def _map(path):
+    """Return a read-only map of the file, or empty bytes for an empty file"""
+    with open(path, "rb") as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return b""
+
+
+class GameArchive():
+    """
+    Properties:
+
+    path: path of the archive file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._data = _map(path)
+        if self._data[:len(MAGIC)] != MAGIC:
+            self._data = b""
+            raise StateError(path, "Not a game archive")
+        self._index = _map(path + INDEXSUFFIX)
+        self._view = memoryview(self._data)
+        if sys.byteorder == "little":
+            # The offsets are read in place
+            self._offsets = memoryview(self._index).cast("Q")
+        else:
+            self._offsets = [offset for offset, in OFFSET.iter_unpack(self._index)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Unmap the archive and index files. The views of any StoredGame
+        still held stay valid until released.
+        """
+        for view in (self._offsets, self._view):
+            if isinstance(view, memoryview):
+                view.release()
+        for data in (self._data, self._index):
+            if isinstance(data, mmap.mmap):
+                try:
+                    data.close()
+                except BufferError:
+                    # Views of stored games are still held, the map is
+                    # closed once they are released
+                    pass
+        self._data = self._index = b""
+        self._view = memoryview(b"")
+        self._offsets = []
+
+    def __len__(self):
+        """Return the number of games in the archive"""
+        return len(self._offsets)
+
+    def __getitem__(self, number):
+        """Return game number as a StoredGame, without copying its data"""
+        if number < 0:
+            number += len(self._offsets)
+        offset = self._offsets[number]
+        flags, plies = GAMEHEADER.unpack_from(self._view, offset)
+        offset += GAMEHEADER.size
+        start = None
+        if flags & CUSTOMSTART:
+            start = self._view[offset:offset + POSITIONSIZE]
+            offset += POSITIONSIZE
+        return StoredGame(RESULTS[flags & 3], start, self._view[offset:offset + plies])
+
+    def __iter__(self):
+        for number in range(len(self._offsets)):
+            yield self[number]
+
+    def startingBoard(self, number, validate=True):
+        """Return a new board with the starting position of game number"""
+        start = self[number].start
+        return Board() if start is None else decodePosition(start, validate=validate)
+
+    def moves(self, number):
+        """Return the moves of game number as (current, target, promotion) tuples"""
+        return decodeMoves(self.startingBoard(number), self[number].moves)
+
+    def positions(self, number):
+        """
+        Replay game number, yielding (move, board) after each move.
+
+        Like pgn.Game.positions, the same board instance is yielded
+        every time and updated in place.
+        """
+        game = self[number]
+        board = self.startingBoard(number)
+        for ply, index in enumerate(game.moves):
+            legal = _sortedMoves(board)
+            if index >= len(legal):
+                error = MoveError(index, "Ply {}: Only {} legal moves!".format(ply + 1, len(legal)))
+                error.ply = ply
+                raise error
+            board.push(legal[index])
+            yield legal[index], board
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack games into a binary archive, or read them back.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    pack = commands.add_parser("pack", help="append the games of a PGN file to an archive")
+    pack.add_argument("pgn", help="path to the PGN file")
+    pack.add_argument("archive", help="path to the archive")
+    show = commands.add_parser("show", help="print a game of an archive")
+    show.add_argument("archive", help="path to the archive")
+    show.add_argument("number", type=int, help="number of the game, from 0")
+    args = parser.parse_args(argv)
+
+    if args.command == "pack":
+        from .pgn import readGames
+
+        start = time.perf_counter()
+        games = skipped = 0
+        with GameWriter(args.archive) as writer:
+            for game in readGames(args.pgn):
+                if game.error is None:
+                    try:
+                        writer.writeSAN(game.moves, game.headers.get("FEN"), game.result or "*")
+                        games += 1
+                        continue
+                    except ChessError as e:
+                        game.error = e
+                skipped += 1
+                print("Skipped game: {}".format(game.error))
+        size = os.path.getsize(args.archive) + os.path.getsize(args.archive + INDEXSUFFIX)
+        print("{} games packed, {} skipped, {} bytes with the index, {:.1f}s".format(
+            games, skipped, size, time.perf_counter() - start))
+        return 0 if not skipped else 1
+
+    with GameArchive(args.archive) as archive:
+        board = archive.startingBoard(args.number)
+        print("Result", archive[args.number].result)
+        print("Start", board.toFEN())
+        print(" ".join(movesToSAN(board, archive.moves(args.number))))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
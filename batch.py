@@ -0,0 +1,142 @@
+#! /usr/bin/env python3
+
+"""
+Bulk validation of games
+
+Games are replayed in a pool of worker processes. They are sent to the
+workers in chunks to keep the communication overhead low, and only a
+bounded number of chunks are in flight at a time, so games can be read
+lazily from arbitrarily large sources. Results are returned in the
+order the games were given.
+
+Run as a module to validate the games of a PGN file:
+
+    python -m chess.batch games.pgn --processes 8
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from .Board import Board
+from .pgn import Game, readGames
+from .utilities import ChessError, MoveError
+
+__all__ = ["Verdict", "validateGame", "validateGames"]
+
+
+# Result of validating a game
+# legal: True if all moves were legal
+# fen: the final position, or the position before the failing move
+# ply: index of the failing move, or None
+# error: description of why the game is invalid, or None
+Verdict = namedtuple("Verdict", ("legal", "fen", "ply", "error"))
+
+
+def validateGame(moves, fen=None):
+    """
+    Replay the given list of moves in algebraic notation, from the
+    position given by fen or the default starting position.
+
+    Returns a Verdict.
+    """
+    try:
+        board = Board() if fen is None else Board.fromFEN(fen)
+    except ChessError as e:
+        return Verdict(False, fen, None, str(e))
+
+    try:
+        board.executeMoves(moves)
+    except MoveError as e:
+        return Verdict(False, board.toFEN(), e.ply, str(e))
+
+    return Verdict(True, board.toFEN(), None, None)
+
+
+def _validateTask(task):
+    """Validate a (moves, fen, error) task made by _asTask"""
+    moves, fen, error = task
+    if error is not None:
+        # Game could not be read
+        return Verdict(False, fen, None, error)
+    return validateGame(moves, fen)
+
+
+def _validateChunk(chunk):
+    """Validate a list of tasks in a worker process"""
+    return [_validateTask(task) for task in chunk]
+
+
+def _asTask(game):
+    """Return a picklable (moves, fen, error) task for a game"""
+    if isinstance(game, Game):
+        error = None if game.error is None else str(game.error)
+        return game.moves, game.headers.get("FEN"), error
+    return game, None, None
+
+
+def validateGames(games, processes=None, chunksize=100):
+    """
+    Validate the given games in parallel, yielding a Verdict for each
+    game in the order given.
+
+    games is an iterable where each game is either a list of moves in
+    algebraic notation, or a pgn.Game whose FEN tag is respected and
+    whose reading errors are reported.
+    The games are replayed in processes worker processes, defaulting
+    to the number of CPUs. With a single process the games are
+    validated without starting any workers.
+    """
+    tasks = map(_asTask, games)
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    if processes == 1:
+        for task in tasks:
+            yield _validateTask(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        # Keep a couple of chunks queued per worker so they never idle,
+        # without reading all the games up front
+        pending = deque()
+        while True:
+            while len(pending) < 2 * processes:
+                chunk = list(itertools.islice(tasks, chunksize))
+                if not chunk:
+                    break
+                pending.append(executor.submit(_validateChunk, chunk))
+            if not pending:
+                break
+            yield from pending.popleft().result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate the games of a PGN file.")
+    parser.add_argument("pgn", help="path to the PGN file")
+    parser.add_argument("-p", "--processes", type=int, default=None,
+                        help="number of worker processes (default: number of CPUs)")
+    parser.add_argument("-c", "--chunksize", type=int, default=100,
+                        help="number of games sent to a worker at a time (default: 100)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    games = invalid = 0
+    for index, verdict in enumerate(validateGames(readGames(args.pgn),
+                                                  args.processes, args.chunksize)):
+        games += 1
+        if not verdict.legal:
+            invalid += 1
+            print("Game {}: {}".format(index + 1, verdict.error))
+    elapsed = time.perf_counter() - start
+
+    print("{} games, {} invalid, {:.1f} games/s".format(games, invalid, games / max(elapsed, 1e-9)))
+    return 0 if invalid == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+#! /usr/bin/env python3
+
+"""
+Bitboard representation of the board
+
+A bitboard is a 64-bit integer where each bit represents a square.
+Square indices are calculated from positions as rank * 8 + file,
+so A1 is bit 0, H1 is bit 7 and H8 is bit 63.
+
+Attack tables for the leaping pieces (knight, king and pawn) are
+precomputed for every square. Sliding pieces use precomputed rays
+in each of the eight directions, which are cut off at the first
+blocking piece when looking up attacks.
+"""
+
+from .pieces import WHITE, BLACK
+
+__all__ = [
+    "toSquare", "toPosition", "iterBits", "popCount",
+    "BB_EMPTY", "BB_SQUARES", "POSITIONS",
+    "KNIGHT_ATTACKS", "KING_ATTACKS", "PAWN_ATTACKS",
+    "ROOK_DIRECTIONS", "BISHOP_DIRECTIONS", "RAYS", "BETWEEN", "LINE",
+    "rookAttacks", "bishopAttacks", "queenAttacks"
+]
+
+
+def toSquare(position):
+    """Convert a position tuple (rank, file) to a square index 0-63"""
+    return position[0] * 8 + position[1]
+
+
+def toPosition(square):
+    """Convert a square index 0-63 to a position tuple (rank, file)"""
+    return POSITIONS[square]
+
+
+def iterBits(bb):
+    """Yield the square index of every set bit in bb, lowest first"""
+    while bb:
+        lowest = bb & -bb
+        yield lowest.bit_length() - 1
+        bb ^= lowest
+
+
+def popCount(bb):
+    """Return the number of set bits in bb"""
+    return bin(bb).count("1")
+
+
+BB_EMPTY = 0
+BB_SQUARES = [1 << square for square in range(64)]
+
+# Position tuples by square index, shared rather than built on every lookup
+POSITIONS = [(square >> 3, square & 7) for square in range(64)]
+
+
+def _leaperAttacks(offsets):
+    """Return a table of attacked squares for a piece moving by fixed offsets"""
+    table = []
+    for square in range(64):
+        rank, _file = toPosition(square)
+        bb = BB_EMPTY
+        for dRank, dFile in offsets:
+            r, f = rank + dRank, _file + dFile
+            if 0 <= r < 8 and 0 <= f < 8:
+                bb |= BB_SQUARES[r * 8 + f]
+        table.append(bb)
+    return table
+
+
+KNIGHT_ATTACKS = _leaperAttacks([
+    (2, 1), (1, 2), (-1, 2), (-2, 1), (-2, -1), (-1, -2), (1, -2), (2, -1)
+])
+KING_ATTACKS = _leaperAttacks([
+    (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)
+])
+# Squares attacked by a pawn of the given color standing on a square
+PAWN_ATTACKS = {
+    WHITE: _leaperAttacks([(1, -1), (1, 1)]),
+    BLACK: _leaperAttacks([(-1, -1), (-1, 1)])
+}
+
+
+# Directions as (rank, file) steps. Directions where the square index
+# increases along the ray are positive, and the nearest blocker is
+# then the lowest set bit. For negative directions it is the highest.
+ROOK_DIRECTIONS = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+BISHOP_DIRECTIONS = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+
+def _rays(direction):
+    """Return a table of rays from every square in the given direction"""
+    dRank, dFile = direction
+    table = []
+    for square in range(64):
+        rank, _file = toPosition(square)
+        bb = BB_EMPTY
+        r, f = rank + dRank, _file + dFile
+        while 0 <= r < 8 and 0 <= f < 8:
+            bb |= BB_SQUARES[r * 8 + f]
+            r += dRank
+            f += dFile
+        table.append(bb)
+    return table
+
+
+RAYS = {direction: _rays(direction) for direction in ROOK_DIRECTIONS + BISHOP_DIRECTIONS}
+
+
+def _betweenAndLine():
+    """
+    Return tables indexed by two squares holding the squares strictly
+    between them, and the full line through them. Both are empty for
+    squares not on a common rank, file or diagonal.
+    """
+    between = [[BB_EMPTY] * 64 for square in range(64)]
+    line = [[BB_EMPTY] * 64 for square in range(64)]
+    for dRank, dFile in ROOK_DIRECTIONS + BISHOP_DIRECTIONS:
+        for square in range(64):
+            full = (RAYS[(dRank, dFile)][square] | RAYS[(-dRank, -dFile)][square] |
+                    BB_SQUARES[square])
+            rank, _file = toPosition(square)
+            passed = BB_EMPTY
+            r, f = rank + dRank, _file + dFile
+            while 0 <= r < 8 and 0 <= f < 8:
+                other = r * 8 + f
+                between[square][other] = passed
+                line[square][other] = full
+                passed |= BB_SQUARES[other]
+                r += dRank
+                f += dFile
+    return between, line
+
+
+BETWEEN, LINE = _betweenAndLine()
+
+# (rays, positive) pairs used by the slider lookups
+_ROOK_RAYS = [(RAYS[d], d[0] * 8 + d[1] > 0) for d in ROOK_DIRECTIONS]
+_BISHOP_RAYS = [(RAYS[d], d[0] * 8 + d[1] > 0) for d in BISHOP_DIRECTIONS]
+
+
+def _slidingAttacks(square, occupied, rays):
+    attacks = BB_EMPTY
+    for table, positive in rays:
+        ray = table[square]
+        blockers = ray & occupied
+        if blockers:
+            if positive:
+                blocker = (blockers & -blockers).bit_length() - 1
+            else:
+                blocker = blockers.bit_length() - 1
+            # Cut the ray off behind the first blocker
+            ray ^= table[blocker]
+        attacks |= ray
+    return attacks
+
+
+def rookAttacks(square, occupied):
+    """Return the squares attacked by a rook on square given the occupancy"""
+    return _slidingAttacks(square, occupied, _ROOK_RAYS)
+
+
+def bishopAttacks(square, occupied):
+    """Return the squares attacked by a bishop on square given the occupancy"""
+    return _slidingAttacks(square, occupied, _BISHOP_RAYS)
+
+
+def queenAttacks(square, occupied):
+    """Return the squares attacked by a queen on square given the occupancy"""
+    return (_slidingAttacks(square, occupied, _ROOK_RAYS) |
+            _slidingAttacks(square, occupied, _BISHOP_RAYS))
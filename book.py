@@ -0,0 +1,191 @@
+#! /usr/bin/env python3
+
+"""
+Polyglot opening books
+
+A Polyglot book is a file of 16-byte entries sorted by the Zobrist hash
+of the position. Each entry holds, in big-endian order, the 64-bit key,
+a 16-bit move, a 16-bit weight and a 32-bit learn value. The zobrist
+hash of Board uses the Polyglot keys, so positions are looked up by
+board.zobrist directly.
+
+The book file is memory mapped rather than read, and the entries of a
+position are found by a binary search over the keys. Opening a book
+costs nothing however large it is, lookups touch only a few pages, and
+processes opening the same book share it in the page cache.
+
+Run as a module to list the book moves of a position given in FEN:
+
+    python -m chess.book book.bin "<fen>"
+"""
+
+import argparse
+import mmap
+import random
+import struct
+import sys
+from collections import namedtuple
+
+from .Board import Board
+from .pieces import *
+from .interpreter import toCoordinates
+
+__all__ = ["BookEntry", "OpeningBook"]
+
+
+ENTRYSIZE = 16
+ENTRY = struct.Struct(">QHHI")
+KEY = struct.Struct(">Q")
+
+# Promotion symbols by their index in a Polyglot move, 0 for none
+PROMOTIONS = (None, "N", "B", "R", "Q")
+
+# Castling is stored as the king capturing its own rook. Maps those
+# moves to the king moving two squares
+CASTLING = {
+    ((0, 4), (0, 7)): ((0, 4), (0, 6)),
+    ((0, 4), (0, 0)): ((0, 4), (0, 2)),
+    ((7, 4), (7, 7)): ((7, 4), (7, 6)),
+    ((7, 4), (7, 0)): ((7, 4), (7, 2))
+}
+
+# Book move of a position
+# move: the (current, target, promotion) move, legal on the board
+# weight: weight of the move, relative to the other moves of the position
+# learn: learning data, usually 0
+BookEntry = namedtuple("BookEntry", ("move", "weight", "learn"))
+
+
+class OpeningBook():
+    """
+    Properties:
+
+    path: path of the book file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            try:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # An empty file can't be mapped
+                self._data = b""
+        self._entries = len(self._data) // ENTRYSIZE
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def close(self):
+        """Unmap the book file"""
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._data = b""
+        self._entries = 0
+
+    def __len__(self):
+        """Return the number of entries in the book"""
+        return self._entries
+
+    def _bisect(self, key):
+        """Return the index of the first entry with a key not less than key"""
+        data = self._data
+        low, high = 0, self._entries
+        while low < high:
+            middle = (low + high) // 2
+            if KEY.unpack_from(data, middle * ENTRYSIZE)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def entries(self, board):
+        """
+        Yield a BookEntry for each book move of the position on the
+        board, in the order of the book.
+
+        Moves that are not legal on the board, which can happen when
+        two positions share a key, are left out.
+        """
+        key = board.zobrist
+        index = self._bisect(key)
+        legal = None
+        while index < self._entries:
+            entryKey, packed, weight, learn = ENTRY.unpack_from(self._data, index * ENTRYSIZE)
+            if entryKey != key:
+                break
+            index += 1
+
+            current = (packed >> 9 & 7, packed >> 6 & 7)
+            target = (packed >> 3 & 7, packed & 7)
+            promotion = PROMOTIONS[packed >> 12 & 7]
+            if (current, target) in CASTLING and type(board[current]) is King:
+                current, target = CASTLING[current, target]
+
+            if legal is None:
+                legal = {move: move for move in board.legalMoves()}
+            move = legal.get((current, target, promotion))
+            if move is not None:
+                yield BookEntry(move, weight, learn)
+
+    def moves(self, board):
+        """Return a list of the book moves of the position on the board"""
+        return [entry.move for entry in self.entries(board)]
+
+    def choice(self, board, minimumWeight=1, rng=random):
+        """
+        Return a book move of the position on the board chosen at random
+        with probability proportional to its weight, or None if the
+        position is not in the book.
+
+        Moves with a weight below minimumWeight are never chosen. A
+        random.Random instance may be given as rng for repeatable
+        choices.
+        """
+        entries = [entry for entry in self.entries(board) if entry.weight >= minimumWeight]
+        if not entries:
+            return None
+        total = sum(entry.weight for entry in entries)
+        if not total:
+            return rng.choice(entries).move
+
+        pick = rng.randrange(total)
+        for entry in entries:
+            pick -= entry.weight
+            if pick < 0:
+                return entry.move
+
+    def bestMove(self, board):
+        """Return the book move of the position with the highest weight, or None"""
+        best = None
+        for entry in self.entries(board):
+            if best is None or entry.weight > best.weight:
+                best = entry
+        return None if best is None else best.move
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List the book moves of a position.")
+    parser.add_argument("book", help="Polyglot book file")
+    parser.add_argument("fen", nargs="?", default=None,
+                        help="position in FEN (default: starting position)")
+    args = parser.parse_args(argv)
+
+    board = Board() if args.fen is None else Board.fromFEN(args.fen)
+    with OpeningBook(args.book) as book:
+        entries = list(book.entries(board))
+        total = sum(entry.weight for entry in entries)
+        for entry in entries:
+            print("{:<6} weight {:>6} ({:>5.1f}%) learn {}".format(
+                toCoordinates(entry.move), entry.weight,
+                100 * entry.weight / total if total else 0, entry.learn))
+        if not entries:
+            print("Position not in book")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
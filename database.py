@@ -0,0 +1,369 @@
+#! /usr/bin/env python3
+
+"""
+Position database
+
+Indexes the positions reached in a collection of games in an SQLite
+database, so games can be found by the positions they reach without
+replaying them. Each game is replayed once when it is added, and three
+indexes are built from it:
+
+    positions: the Zobrist hash of every position, with the game and ply
+    materials: the material signature, like KRPvKR, with the plies of
+        the game played with that material
+    pawns: the squares of the white and black pawns, with the plies of
+        the game played with that pawn structure
+
+The material and the pawn structure can only change with a capture or a
+pawn move, so they are stored once per stretch of the game instead of
+once per position. All three tables are clustered on their key, so a
+query is a single range scan of the table.
+
+Zobrist hashes may collide, so a position query can in principle find
+games that reach a different position with the same hash. With 64-bit
+hashes this is rare enough to ignore for most purposes.
+
+Run as a module to index the games of a PGN file, or query a database:
+
+    python -m chess.database index games.pgn games.db
+    python -m chess.database query games.db --fen "<fen>"
+    python -m chess.database query games.db --material KRPvKR
+    python -m chess.database query games.db --pawns "<fen>"
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+from collections import namedtuple
+
+from .Board import Board, LIVING
+from .pieces import *
+from .interpreter import interpretMove
+from .pgn import readGames
+from .utilities import ChessError, MoveError
+
+__all__ = ["PositionHit", "Span", "GameRecord", "materialSignature", "normalizeSignature",
+           "pawnStructure", "PositionDatabase"]
+
+
+# Piece letters of the material signatures, in order
+LETTERORDER = "KQRBNP"
+LETTERS = {King: "K", Queen: "Q", Rook: "R", Bishop: "B", Knight: "N", Pawn: "P"}
+
+# Number of games added between commits by addGames
+BATCHSIZE = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    white TEXT,
+    black TEXT,
+    event TEXT,
+    date TEXT,
+    result TEXT,
+    fen TEXT,
+    moves TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS positions (
+    zobrist INTEGER NOT NULL,
+    game INTEGER NOT NULL,
+    ply INTEGER NOT NULL,
+    PRIMARY KEY (zobrist, game, ply)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS materials (
+    signature TEXT NOT NULL,
+    game INTEGER NOT NULL,
+    first INTEGER NOT NULL,
+    last INTEGER NOT NULL,
+    PRIMARY KEY (signature, game, first)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS pawns (
+    white INTEGER NOT NULL,
+    black INTEGER NOT NULL,
+    game INTEGER NOT NULL,
+    first INTEGER NOT NULL,
+    last INTEGER NOT NULL,
+    PRIMARY KEY (white, black, game, first)
+) WITHOUT ROWID;
+"""
+
+# Occurrence of a position in a game
+# game: id of the game
+# ply: number of plies played in the game before the position
+PositionHit = namedtuple("PositionHit", ("game", "ply"))
+
+# Stretch of a game played with the same material or pawn structure
+# game: id of the game
+# first, last: the first and last ply of the stretch, inclusive
+Span = namedtuple("Span", ("game", "first", "last"))
+
+# Game stored in the database
+# id: id of the game
+# white, black, event, date: the tags of the game, or None
+# result: the result of the game, or None
+# fen: the starting position in FEN, or None for the standard one
+# moves: list of the moves in algebraic notation
+GameRecord = namedtuple("GameRecord", ("id", "white", "black", "event", "date", "result",
+                                       "fen", "moves"))
+
+
+def _signed(key):
+    """Return a 64-bit hash as the signed integer SQLite stores"""
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+def materialSignature(board):
+    """Return the material on the board as a signature, like KRPvKR, white first"""
+    sides = []
+    for color in (WHITE, BLACK):
+        counts = dict.fromkeys(LETTERORDER, 0)
+        for piece in board.pieces[color][LIVING]:
+            counts[LETTERS[type(piece)]] += 1
+        sides.append("".join(letter * count for letter, count in counts.items()))
+    return "v".join(sides)
+
+
+def normalizeSignature(signature):
+    """
+    Return the signature with the pieces of each side in order, like
+    KRPvKR for RKPvRK. Raises ValueError if it is not a material
+    signature, with one king a side.
+    """
+    sides = signature.upper().split("V")
+    if len(sides) != 2 or any(side.count("K") != 1 or set(side) - set(LETTERORDER)
+                              for side in sides):
+        raise ValueError("{!r} is not a material signature like KRPvKR".format(signature))
+    return "v".join("".join(sorted(side, key=LETTERORDER.index)) for side in sides)
+
+
+def pawnStructure(board):
+    """
+    Return the squares of the white and black pawns as a pair of
+    bitboards, shifted down a rank as no pawns stand on the first.
+    """
+    return board.bitboards[WHITE][Pawn] >> 8, board.bitboards[BLACK][Pawn] >> 8
+
+
+class PositionDatabase():
+    """
+    Properties:
+
+    path: path of the database file, or ":memory:"
+
+    connection: the sqlite3 connection to the database
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def close(self):
+        """Commit any games added and close the database"""
+        self.connection.commit()
+        self.connection.close()
+
+    def __len__(self):
+        """Return the number of games in the database"""
+        return self.connection.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+    def addGame(self, game):
+        """
+        Replay a pgn.Game, add it with its positions to the database and
+        return its id. The game is not committed until commit is called
+        or the database is closed.
+
+        Raises MoveError, NotationError or StateError if the game can't
+        be replayed, in which case nothing is added.
+        """
+        if game.error is not None:
+            raise game.error
+        board = game.startingBoard()
+        positions = [board.zobrist]
+        materials = []
+        pawns = []
+        material = materialSignature(board)
+        structure = pawnStructure(board)
+        materialStart = structureStart = 0
+
+        for ply, mvStr in enumerate(game.moves, 1):
+            try:
+                board.push(interpretMove(board, mvStr))
+            except MoveError as e:
+                e.ply = ply - 1
+                raise
+            positions.append(board.zobrist)
+            if board.halfmoveClock:
+                # Neither a capture nor a pawn move
+                continue
+
+            signature = materialSignature(board)
+            if signature != material:
+                materials.append((material, materialStart, ply - 1))
+                material, materialStart = signature, ply
+            pawnsNow = pawnStructure(board)
+            if pawnsNow != structure:
+                pawns.append((structure, structureStart, ply - 1))
+                structure, structureStart = pawnsNow, ply
+        last = len(game.moves)
+        materials.append((material, materialStart, last))
+        pawns.append((structure, structureStart, last))
+
+        headers = game.headers
+        cursor = self.connection.execute(
+            "INSERT INTO games (white, black, event, date, result, fen, moves) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (headers.get("White"), headers.get("Black"), headers.get("Event"), headers.get("Date"),
+             game.result, headers.get("FEN"), " ".join(game.moves)))
+        gameId = cursor.lastrowid
+        self.connection.executemany(
+            "INSERT INTO positions VALUES (?, ?, ?)",
+            [(_signed(key), gameId, ply) for ply, key in enumerate(positions)])
+        self.connection.executemany(
+            "INSERT INTO materials VALUES (?, ?, ?, ?)",
+            [(signature, gameId, first, last) for signature, first, last in materials])
+        self.connection.executemany(
+            "INSERT INTO pawns VALUES (?, ?, ?, ?, ?)",
+            [(white, black, gameId, first, last) for (white, black), first, last in pawns])
+        return gameId
+
+    def addGames(self, source, batchSize=BATCHSIZE):
+        """
+        Add the games of a PGN path or iterable of lines, committing
+        every batchSize games. Games that can't be replayed are skipped.
+
+        Returns the number of games added and a list of the skipped
+        games, with their error attribute set.
+        """
+        added = 0
+        skipped = []
+        for game in readGames(source):
+            try:
+                self.addGame(game)
+            except ChessError as e:
+                game.error = e
+                skipped.append(game)
+                continue
+            added += 1
+            if not added % batchSize:
+                self.commit()
+        self.commit()
+        return added, skipped
+
+    def commit(self):
+        """Commit the games added"""
+        self.connection.commit()
+
+    def findPosition(self, board):
+        """Return a list of PositionHit for the games reaching the position on the board"""
+        rows = self.connection.execute(
+            "SELECT game, ply FROM positions WHERE zobrist = ? ORDER BY game, ply",
+            (_signed(board.zobrist),))
+        return [PositionHit(*row) for row in rows]
+
+    def findMaterial(self, signature, bothSides=True):
+        """
+        Return a list of Span for the stretches of games played with
+        the given material signature, like KRPvKR. When bothSides is
+        True, the stretches with the colors reversed, like KRvKRP, are
+        included too.
+
+        Raises ValueError if the signature is malformed.
+        """
+        signature = normalizeSignature(signature)
+        white, black = signature.split("v")
+        signatures = {signature, black + "v" + white} if bothSides else {signature}
+        rows = self.connection.execute(
+            "SELECT game, first, last FROM materials WHERE signature IN ({}) "
+            "ORDER BY game, first".format(", ".join("?" * len(signatures))),
+            tuple(signatures))
+        return [Span(*row) for row in rows]
+
+    def findPawns(self, board):
+        """Return a list of Span for the stretches of games with the pawns of the board"""
+        rows = self.connection.execute(
+            "SELECT game, first, last FROM pawns WHERE white = ? AND black = ? ORDER BY game, first",
+            pawnStructure(board))
+        return [Span(*row) for row in rows]
+
+    def game(self, gameId):
+        """Return the GameRecord with the given id, or None"""
+        row = self.connection.execute(
+            "SELECT id, white, black, event, date, result, fen, moves FROM games WHERE id = ?",
+            (gameId,)).fetchone()
+        if row is None:
+            return None
+        return GameRecord(*row[:-1], row[-1].split())
+
+    def board(self, gameId, ply):
+        """
+        Return a new board with the position of the game with the given
+        id after ply plies, for example from a PositionHit or Span.
+
+        Raises KeyError if there is no such game.
+        """
+        record = self.game(gameId)
+        if record is None:
+            raise KeyError(gameId)
+        board = Board() if record.fen is None else Board.fromFEN(record.fen)
+        board.executeMoves(record.moves[:ply])
+        return board
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index the positions of games, or query them.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    index = commands.add_parser("index", help="add the games of a PGN file to a database")
+    index.add_argument("pgn", help="path to the PGN file")
+    index.add_argument("database", help="path to the database")
+    query = commands.add_parser("query", help="find games in a database")
+    query.add_argument("database", help="path to the database")
+    kinds = query.add_mutually_exclusive_group(required=True)
+    kinds.add_argument("--fen", help="find games reaching this position")
+    kinds.add_argument("--material", help="find games with this material, like KRPvKR")
+    kinds.add_argument("--pawns", metavar="FEN", help="find games with the pawns of this position")
+    query.add_argument("--limit", type=int, default=20, help="number of games listed (default: 20)")
+    args = parser.parse_args(argv)
+
+    with PositionDatabase(args.database) as database:
+        start = time.perf_counter()
+        if args.command == "index":
+            added, skipped = database.addGames(args.pgn)
+            for game in skipped:
+                print("Skipped game: {}".format(game.error))
+            print("{} games indexed, {} skipped, {:.1f}s".format(
+                added, len(skipped), time.perf_counter() - start))
+            return 0 if not skipped else 1
+
+        if args.fen is not None:
+            hits = database.findPosition(Board.fromFEN(args.fen))
+        elif args.material is not None:
+            try:
+                hits = database.findMaterial(args.material)
+            except ValueError as e:
+                print(e)
+                return 1
+        else:
+            hits = database.findPawns(Board.fromFEN(args.pawns))
+        elapsed = time.perf_counter() - start
+
+        games = sorted({hit.game for hit in hits})
+        print("{} games, {} hits, {:.1f} ms".format(len(games), len(hits), elapsed * 1000))
+        for gameId in games[:args.limit]:
+            record = database.game(gameId)
+            plies = [hit[1] for hit in hits if hit.game == gameId]
+            print("{:>8} {} - {} {} ({}) from ply {}".format(
+                gameId, record.white or "?", record.black or "?", record.result or "*",
+                len(record.moves), min(plies)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,304 @@
+#! /usr/bin/env python3
+
+"""
+Static evaluation of positions
+
+Positions are scored in centipawns by material, piece-square tables,
+pawn structure, king safety and mobility.
+
+Material and the piece-square tables are scored separately for the
+middlegame and the endgame, and blended by the game phase, which is
+counted down from the starting position as pieces leave the board.
+The board keeps these scores up to date incrementally as pieces are
+placed and removed, so they cost nothing to look up. Pawn structure is
+cached by the pawn positions, as these rarely change between the
+positions of a search. King safety and mobility are computed from the
+bitboards on every call.
+"""
+
+from .pieces import *
+from .bitboards import *
+
+__all__ = [
+    "PIECEVALUES", "MIDDLEGAME", "ENDGAME", "PHASES", "MAXPHASE",
+    "evaluate", "evaluationTerms"
+]
+
+
+PIECEVALUES = {King: 0, Queen: 900, Rook: 500, Bishop: 330, Knight: 320, Pawn: 100}
+
+# Weight of each piece type in the game phase
+PHASES = {King: 0, Queen: 4, Rook: 2, Bishop: 1, Knight: 1, Pawn: 0}
+MAXPHASE = 24
+
+
+# Piece-square tables for white, as seen from white's side with A8 in
+# the top left corner. Black uses the same tables mirrored vertically.
+PAWN_TABLE = [
+      0,   0,   0,   0,   0,   0,   0,   0,
+     50,  50,  50,  50,  50,  50,  50,  50,
+     10,  10,  20,  30,  30,  20,  10,  10,
+      5,   5,  10,  25,  25,  10,   5,   5,
+      0,   0,   0,  20,  20,   0,   0,   0,
+      5,  -5, -10,   0,   0, -10,  -5,   5,
+      5,  10,  10, -20, -20,  10,  10,   5,
+      0,   0,   0,   0,   0,   0,   0,   0
+]
+PAWN_ENDGAME_TABLE = [
+      0,   0,   0,   0,   0,   0,   0,   0,
+     80,  80,  80,  80,  80,  80,  80,  80,
+     50,  50,  50,  50,  50,  50,  50,  50,
+     30,  30,  30,  30,  30,  30,  30,  30,
+     15,  15,  15,  15,  15,  15,  15,  15,
+      5,   5,   5,   5,   5,   5,   5,   5,
+      0,   0,   0,   0,   0,   0,   0,   0,
+      0,   0,   0,   0,   0,   0,   0,   0
+]
+KNIGHT_TABLE = [
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20,   0,   0,   0,   0, -20, -40,
+    -30,   0,  10,  15,  15,  10,   0, -30,
+    -30,   5,  15,  20,  20,  15,   5, -30,
+    -30,   0,  15,  20,  20,  15,   0, -30,
+    -30,   5,  10,  15,  15,  10,   5, -30,
+    -40, -20,   0,   5,   5,   0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50
+]
+BISHOP_TABLE = [
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10,   0,   0,   0,   0,   0,   0, -10,
+    -10,   0,   5,  10,  10,   5,   0, -10,
+    -10,   5,   5,  10,  10,   5,   5, -10,
+    -10,   0,  10,  10,  10,  10,   0, -10,
+    -10,  10,  10,  10,  10,  10,  10, -10,
+    -10,   5,   0,   0,   0,   0,   5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20
+]
+ROOK_TABLE = [
+      0,   0,   0,   0,   0,   0,   0,   0,
+      5,  10,  10,  10,  10,  10,  10,   5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+      0,   0,   0,   5,   5,   0,   0,   0
+]
+QUEEN_TABLE = [
+    -20, -10, -10,  -5,  -5, -10, -10, -20,
+    -10,   0,   0,   0,   0,   0,   0, -10,
+    -10,   0,   5,   5,   5,   5,   0, -10,
+     -5,   0,   5,   5,   5,   5,   0,  -5,
+      0,   0,   5,   5,   5,   5,   0,  -5,
+    -10,   5,   5,   5,   5,   5,   0, -10,
+    -10,   0,   5,   0,   0,   0,   0, -10,
+    -20, -10, -10,  -5,  -5, -10, -10, -20
+]
+KING_TABLE = [
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+     20,  20,   0,   0,   0,   0,  20,  20,
+     20,  30,  10,   0,   0,  10,  30,  20
+]
+KING_ENDGAME_TABLE = [
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10,   0,   0, -10, -20, -30,
+    -30, -10,  20,  30,  30,  20, -10, -30,
+    -30, -10,  30,  40,  40,  30, -10, -30,
+    -30, -10,  30,  40,  40,  30, -10, -30,
+    -30, -10,  20,  30,  30,  20, -10, -30,
+    -30, -30,   0,   0,   0,   0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50
+]
+
+
+def _scoreTable(tables):
+    """
+    Return a table indexed by color, piece type and square index of
+    the material and piece-square score of a piece, positive for
+    white and negative for black.
+    """
+    scores = {WHITE: {}, BLACK: {}}
+    for pieceType, table in tables.items():
+        value = PIECEVALUES[pieceType]
+        # Row 0 of the printed table is rank 8
+        white = [value + table[(7 - (square >> 3)) * 8 + (square & 7)] for square in range(64)]
+        scores[WHITE][pieceType] = white
+        # Mirror ranks for black
+        scores[BLACK][pieceType] = [-white[square ^ 56] for square in range(64)]
+    return scores
+
+
+# Material and piece-square scores of every piece on every square
+MIDDLEGAME = _scoreTable({
+    Pawn: PAWN_TABLE, Knight: KNIGHT_TABLE, Bishop: BISHOP_TABLE,
+    Rook: ROOK_TABLE, Queen: QUEEN_TABLE, King: KING_TABLE
+})
+ENDGAME = _scoreTable({
+    Pawn: PAWN_ENDGAME_TABLE, Knight: KNIGHT_TABLE, Bishop: BISHOP_TABLE,
+    Rook: ROOK_TABLE, Queen: QUEEN_TABLE, King: KING_ENDGAME_TABLE
+})
+
+
+# Pawn structure
+DOUBLED_PAWN = -10
+ISOLATED_PAWN = -15
+# Bonus for a passed pawn by the number of ranks it has advanced
+PASSED_PAWN = [0, 5, 10, 20, 35, 60, 100, 0]
+
+# King safety, scaled down as the game approaches the endgame
+PAWN_SHIELD = 10
+KING_ZONE_ATTACK = {Knight: 8, Bishop: 8, Rook: 12, Queen: 20}
+
+# Mobility bonus per reachable square
+MOBILITY = {Knight: 4, Bishop: 5, Rook: 2, Queen: 1}
+
+BB_FILES = [0x0101010101010101 << _file for _file in range(8)]
+# Files next to each file
+BB_ADJACENT_FILES = [(BB_FILES[_file - 1] if _file > 0 else 0) |
+                     (BB_FILES[_file + 1] if _file < 7 else 0) for _file in range(8)]
+
+
+def _frontSpans():
+    """
+    Return tables indexed by color and square index of the squares in
+    front of a pawn on its own and the adjacent files.
+    """
+    spans = {WHITE: [], BLACK: []}
+    for square in range(64):
+        rank, _file = toPosition(square)
+        files = BB_FILES[_file] | BB_ADJACENT_FILES[_file]
+        above = BB_EMPTY
+        for r in range(rank + 1, 8):
+            above |= 0xFF << (8 * r)
+        below = BB_EMPTY
+        for r in range(rank):
+            below |= 0xFF << (8 * r)
+        spans[WHITE].append(files & above)
+        spans[BLACK].append(files & below)
+    return spans
+
+
+FRONT_SPANS = _frontSpans()
+
+# Pawn structure scores by the bitboards of the white and black pawns
+_pawnCache = {}
+PAWNCACHESIZE = 1 << 16
+
+
+def _pawnStructure(whitePawns, blackPawns):
+    """Return the pawn structure score for white, caching it by the pawns"""
+    key = (whitePawns, blackPawns)
+    score = _pawnCache.get(key)
+    if score is not None:
+        return score
+
+    score = 0
+    for color, ours, theirs in ((WHITE, whitePawns, blackPawns),
+                                (BLACK, blackPawns, whitePawns)):
+        colorScore = 0
+        for _file in range(8):
+            count = popCount(ours & BB_FILES[_file])
+            if count > 1:
+                colorScore += DOUBLED_PAWN * (count - 1)
+            if count and not ours & BB_ADJACENT_FILES[_file]:
+                colorScore += ISOLATED_PAWN * count
+        for square in iterBits(ours):
+            if not FRONT_SPANS[color][square] & theirs:
+                rank = square >> 3
+                colorScore += PASSED_PAWN[rank if color is WHITE else 7 - rank]
+        score += colorScore * color
+
+    if len(_pawnCache) >= PAWNCACHESIZE:
+        _pawnCache.clear()
+    _pawnCache[key] = score
+    return score
+
+
+def _kingSafety(board, color, occupied):
+    """Return the middlegame king safety score of the given player"""
+    bitboards = board.bitboards[color]
+    kingSquare = bitboards[King].bit_length() - 1
+    zone = KING_ATTACKS[kingSquare]
+
+    # Own pawns on the two ranks in front of the king
+    shield = zone | (zone << 8 if color is WHITE else zone >> 8)
+    shield &= FRONT_SPANS[color][kingSquare]
+    score = PAWN_SHIELD * popCount(shield & bitboards[Pawn])
+
+    enemy = board.bitboards[-color]
+    for square in iterBits(enemy[Knight]):
+        score -= KING_ZONE_ATTACK[Knight] * popCount(KNIGHT_ATTACKS[square] & zone)
+    for square in iterBits(enemy[Bishop]):
+        score -= KING_ZONE_ATTACK[Bishop] * popCount(bishopAttacks(square, occupied) & zone)
+    for square in iterBits(enemy[Rook]):
+        score -= KING_ZONE_ATTACK[Rook] * popCount(rookAttacks(square, occupied) & zone)
+    for square in iterBits(enemy[Queen]):
+        score -= KING_ZONE_ATTACK[Queen] * popCount(queenAttacks(square, occupied) & zone)
+    return score
+
+
+def _mobility(board, color, occupied):
+    """
+    Return the mobility score of the given player, counting the squares
+    reached by their pieces that are neither own pieces nor attacked
+    by enemy pawns.
+    """
+    bitboards = board.bitboards[color]
+    enemyPawns = board.bitboards[-color][Pawn]
+    # Squares attacked by enemy pawns, shifting all pawns at once
+    if color is WHITE:
+        pawnAttacks = ((enemyPawns & ~BB_FILES[0]) >> 9) | ((enemyPawns & ~BB_FILES[7]) >> 7)
+    else:
+        pawnAttacks = ((enemyPawns & ~BB_FILES[0]) << 7) | ((enemyPawns & ~BB_FILES[7]) << 9)
+    available = ~(board.occupancy[color] | pawnAttacks)
+
+    score = 0
+    for square in iterBits(bitboards[Knight]):
+        score += MOBILITY[Knight] * popCount(KNIGHT_ATTACKS[square] & available)
+    for square in iterBits(bitboards[Bishop]):
+        score += MOBILITY[Bishop] * popCount(bishopAttacks(square, occupied) & available)
+    for square in iterBits(bitboards[Rook]):
+        score += MOBILITY[Rook] * popCount(rookAttacks(square, occupied) & available)
+    for square in iterBits(bitboards[Queen]):
+        score += MOBILITY[Queen] * popCount(queenAttacks(square, occupied) & available)
+    return score
+
+
+def evaluationTerms(board):
+    """
+    Return a dict of the terms of the evaluation of the position, each
+    in centipawns for white. The terms sum to the evaluation for white.
+
+    material: material and piece-square scores, blended by the phase
+    pawns: pawn structure
+    king: king safety, fading out towards the endgame
+    mobility: squares available to the pieces
+    """
+    phase = min(board.phase, MAXPHASE)
+    occupied = board.occupancy[WHITE] | board.occupancy[BLACK]
+    kingSafety = _kingSafety(board, WHITE, occupied) - _kingSafety(board, BLACK, occupied)
+    return {
+        "material": (board.middlegameScore * phase +
+                     board.endgameScore * (MAXPHASE - phase)) // MAXPHASE,
+        "pawns": _pawnStructure(board.bitboards[WHITE][Pawn], board.bitboards[BLACK][Pawn]),
+        "king": kingSafety * phase // MAXPHASE,
+        "mobility": _mobility(board, WHITE, occupied) - _mobility(board, BLACK, occupied)
+    }
+
+
+def evaluate(board):
+    """Return the evaluation of the position in centipawns for the player to move"""
+    # Same as the sum of evaluationTerms, without building the dict
+    phase = min(board.phase, MAXPHASE)
+    occupied = board.occupancy[WHITE] | board.occupancy[BLACK]
+    kingSafety = _kingSafety(board, WHITE, occupied) - _kingSafety(board, BLACK, occupied)
+    score = ((board.middlegameScore * phase + board.endgameScore * (MAXPHASE - phase)) // MAXPHASE +
+             _pawnStructure(board.bitboards[WHITE][Pawn], board.bitboards[BLACK][Pawn]) +
+             kingSafety * phase // MAXPHASE +
+             _mobility(board, WHITE, occupied) - _mobility(board, BLACK, occupied))
+    return score if board.toMove is WHITE else -score
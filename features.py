@@ -0,0 +1,244 @@
+#! /usr/bin/env python3
+
+"""
+Batch features of many positions with NumPy
+
+Positions are packed into an array of 12 bitboards per position, one
+for each color and piece type in the order of PLANES. From this array
+the material, piece-square and mobility scores of all positions are
+computed at once with array operations. The same scores are computed
+for a single board by the evaluation module.
+
+Sliding attacks are found for all positions at once by occluded fills
+along each direction. Rays of pieces of one type can only meet on a
+square holding a piece of that type, so counting the squares reached
+in a direction by all pieces of a type at once gives the same count as
+summing over the pieces.
+
+The packed positions can be unpacked to an (N, 12, 64) array of
+planes for training, and exported in chunks to a .npy file, which can
+be memory mapped with numpy.load(path, mmap_mode="r").
+
+Requires NumPy.
+"""
+
+import numpy as np
+
+from .pieces import *
+from .bitboards import *
+from .evaluation import PIECEVALUES, MIDDLEGAME, ENDGAME, PHASES, MAXPHASE, MOBILITY
+
+__all__ = [
+    "PLANES", "packPositions", "toPlanes", "batchFeatures", "batchEvaluate", "exportPlanes"
+]
+
+
+# Color and piece type of each plane
+PLANES = [(color, pieceType) for color in (WHITE, BLACK)
+          for pieceType in (Pawn, Knight, Bishop, Rook, Queen, King)]
+
+FENPLANES = {letter: index for index, letter in enumerate("PNBRQKpnbrqk")}
+
+# Weights of each plane, white positive and black negative
+_MATERIAL = np.array([PIECEVALUES[pieceType] * color for color, pieceType in PLANES],
+                     dtype=np.int64)
+_PHASES = np.array([PHASES[pieceType] for color, pieceType in PLANES], dtype=np.int64)
+# Middlegame and endgame scores of each plane and square as a (768, 2)
+# matrix. Floats are used for the fast matrix product, and are exact
+# for these integers.
+_PIECESQUARE = np.array([[MIDDLEGAME[color][pieceType][square], ENDGAME[color][pieceType][square]]
+                         for color, pieceType in PLANES for square in range(64)],
+                        dtype=np.float64)
+
+_FULL = np.uint64(0xFFFFFFFFFFFFFFFF)
+_NOT_A = np.uint64(0xFEFEFEFEFEFEFEFE)
+_NOT_AB = np.uint64(0xFCFCFCFCFCFCFCFC)
+_NOT_H = np.uint64(0x7F7F7F7F7F7F7F7F)
+_NOT_GH = np.uint64(0x3F3F3F3F3F3F3F3F)
+
+# Shift of the square index for each knight move, and mask removing
+# squares that wrapped around the board. Knights moving by the same
+# shift never land on the same square.
+_KNIGHT_SHIFTS = [(17, _NOT_A), (15, _NOT_H), (10, _NOT_AB), (6, _NOT_GH),
+                  (-6, _NOT_AB), (-10, _NOT_GH), (-15, _NOT_A), (-17, _NOT_H)]
+
+# Shift of the square index and mask removing squares that wrapped
+# around the board, for each direction
+_DIRECTIONS = {
+    (1, 0): (8, _FULL), (-1, 0): (-8, _FULL),
+    (0, 1): (1, _NOT_A), (0, -1): (-1, _NOT_H),
+    (1, 1): (9, _NOT_A), (1, -1): (7, _NOT_H),
+    (-1, 1): (-7, _NOT_A), (-1, -1): (-9, _NOT_H)
+}
+
+
+def _shift(bb, amount):
+    if amount > 0:
+        return bb << np.uint64(amount)
+    return bb >> np.uint64(-amount)
+
+
+def _rayAttacks(pieces, empty, direction):
+    """
+    Return the squares attacked in the given direction by the given
+    pieces, with rays stopped by the first non-empty square.
+    """
+    amount, mask = _DIRECTIONS[direction]
+    propagate = empty & mask
+    pieces = pieces | (propagate & _shift(pieces, amount))
+    propagate = propagate & _shift(propagate, amount)
+    pieces = pieces | (propagate & _shift(pieces, 2 * amount))
+    propagate = propagate & _shift(propagate, 2 * amount)
+    pieces = pieces | (propagate & _shift(pieces, 4 * amount))
+    return _shift(pieces, amount) & mask
+
+
+if hasattr(np, "bitwise_count"):
+    def _popCount(bb):
+        return np.bitwise_count(bb).astype(np.int64)
+else:
+    def _popCount(bb):
+        bits = np.unpackbits(bb.astype("<u8").view(np.uint8).reshape(bb.shape + (8,)), axis=-1)
+        return bits.sum(axis=-1, dtype=np.int64)
+
+
+def _fenBitboards(fen):
+    """Return the 12 bitboards and the player to move of a position in FEN"""
+    fields = fen.split()
+    bitboards = [0] * 12
+    rank, _file = 7, 0
+    for char in fields[0]:
+        if char == "/":
+            rank -= 1
+            _file = 0
+        elif char.isdigit():
+            _file += int(char)
+        else:
+            bitboards[FENPLANES[char]] |= 1 << (rank * 8 + _file)
+            _file += 1
+    toMove = BLACK if len(fields) > 1 and fields[1] == "b" else WHITE
+    return bitboards, toMove
+
+
+def packPositions(positions):
+    """
+    Pack the given positions, each a Board or a string in FEN, into
+    an (N, 12) uint64 array of bitboards in the order of PLANES.
+
+    Returns the array and an (N,) int8 array of the player to move.
+    FEN strings are only read for the piece placement and the player
+    to move, and are not validated.
+    """
+    bitboards = []
+    toMove = []
+    for position in positions:
+        if isinstance(position, str):
+            boards, player = _fenBitboards(position)
+        else:
+            boards = [position.bitboards[color][pieceType] for color, pieceType in PLANES]
+            player = position.toMove
+        bitboards.append(boards)
+        toMove.append(player)
+    return (np.array(bitboards, dtype=np.uint64).reshape(-1, 12),
+            np.array(toMove, dtype=np.int8))
+
+
+def toPlanes(bitboards):
+    """
+    Unpack an (N, 12) array of bitboards into an (N, 12, 64) uint8
+    array of planes, where plane[n, p, square] is 1 if position n has
+    a piece of plane p on the square.
+    """
+    octets = bitboards.astype("<u8").view(np.uint8)
+    return np.unpackbits(octets, axis=1, bitorder="little").reshape(-1, 12, 64)
+
+
+def _mobility(bitboards, color):
+    """Return the mobility scores of the given player for each position"""
+    base = 0 if color is WHITE else 6
+    enemyBase = 6 - base
+    own = np.bitwise_or.reduce(bitboards[:, base:base + 6], axis=1)
+    enemy = np.bitwise_or.reduce(bitboards[:, enemyBase:enemyBase + 6], axis=1)
+    empty = ~(own | enemy)
+
+    enemyPawns = bitboards[:, enemyBase]
+    if color is WHITE:
+        pawnAttacks = _shift(enemyPawns & _NOT_A, -9) | _shift(enemyPawns & _NOT_H, -7)
+    else:
+        pawnAttacks = _shift(enemyPawns & _NOT_A, 7) | _shift(enemyPawns & _NOT_H, 9)
+    available = ~(own | pawnAttacks)
+
+    knights = bitboards[:, base + 1]
+    score = 0
+    for amount, mask in _KNIGHT_SHIFTS:
+        score = score + MOBILITY[Knight] * _popCount(_shift(knights, amount) & mask & available)
+
+    for pieceType, index, directions in ((Bishop, base + 2, BISHOP_DIRECTIONS),
+                                         (Rook, base + 3, ROOK_DIRECTIONS),
+                                         (Queen, base + 4, BISHOP_DIRECTIONS + ROOK_DIRECTIONS)):
+        pieces = bitboards[:, index]
+        for direction in directions:
+            score = score + MOBILITY[pieceType] * _popCount(
+                _rayAttacks(pieces, empty, direction) & available)
+    return score
+
+
+def batchFeatures(bitboards):
+    """
+    Return a dict of features of each position in an (N, 12) array of
+    bitboards, each an (N,) int64 array in centipawns for white unless
+    noted otherwise.
+
+    counts: (N, 12) array of the number of pieces of each plane
+    material: material balance
+    middlegame, endgame: material and piece-square scores
+    phase: game phase, from 0 in bare endgames to MAXPHASE
+    pieceSquare: material and piece-square scores blended by the phase
+    mobility: mobility score, as in the evaluation module
+    """
+    counts = _popCount(bitboards)
+    planes = toPlanes(bitboards).reshape(-1, 768)
+    scores = np.rint(planes @ _PIECESQUARE).astype(np.int64)
+    middlegame = scores[:, 0]
+    endgame = scores[:, 1]
+    phase = counts @ _PHASES
+    blend = np.minimum(phase, MAXPHASE)
+    return {
+        "counts": counts,
+        "material": counts @ _MATERIAL,
+        "middlegame": middlegame,
+        "endgame": endgame,
+        "phase": phase,
+        "pieceSquare": (middlegame * blend + endgame * (MAXPHASE - blend)) // MAXPHASE,
+        "mobility": _mobility(bitboards, WHITE) - _mobility(bitboards, BLACK)
+    }
+
+
+def batchEvaluate(positions):
+    """
+    Return an (N,) int64 array of the piece-square and mobility scores
+    of the given positions, each a Board or a string in FEN, for the
+    player to move.
+    """
+    bitboards, toMove = packPositions(positions)
+    features = batchFeatures(bitboards)
+    return (features["pieceSquare"] + features["mobility"]) * toMove
+
+
+def exportPlanes(path, positions, chunksize=65536):
+    """
+    Write the planes of the given sequence of positions, each a Board
+    or a string in FEN, to an (N, 12, 64) uint8 .npy file at path.
+
+    The positions are packed a chunk at a time, so memory use does not
+    grow with the number of positions. Returns the number of positions
+    written.
+    """
+    total = len(positions)
+    out = np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=(total, 12, 64))
+    for start in range(0, total, chunksize):
+        bitboards, toMove = packPositions(positions[start:start + chunksize])
+        out[start:start + len(bitboards)] = toPlanes(bitboards)
+    out.flush()
+    del out
+    return total
@@ -2,7 +2,7 @@
 
 import re
 
-from .Board import KING, LIVING
+from .Board import KING
 from .utilities import *
 from .pieces import *
 
@@ -25,6 +25,10 @@ mvExp = f"^(?:(?P<piece>[{pieces}]?)" \
 
 mvReg = re.compile(mvExp)
 
+# Coordinate notation, as used by UCI
+coordReg = re.compile(f"^(?P<current>[{files}][{ranks}])(?P<target>[{files}][{ranks}])"
+                      f"(?P<promotion>[qrbn])?$")
+
 NAMES = {
         "K": King,
         "Q": Queen,
@@ -34,6 +38,8 @@ NAMES = {
         "": Pawn
 }
 
+LETTERS = {pieceType: letter for letter, pieceType in NAMES.items()}
+
 
 def toInternal(huRank=None, huFile=None):
     if huRank is None:
@@ -57,10 +63,43 @@ def toHuman(inRank=None, inFile=None):
         return str(inRank + 1), chr(inFile + 97)
 
 
+def toCoordinates(move):
+    """Return a (current, target, promotion) move in coordinate notation, like e7e8q"""
+    current, target, promotion = move
+    return "{}{}{}{}{}".format(chr(current[1] + 97), current[0] + 1,
+                               chr(target[1] + 97), target[0] + 1,
+                               "" if promotion is None else promotion.lower())
+
+
+def interpretCoordinates(board, mvStr):
+    """
+    Interpret move given in coordinate notation, like e7e8q, to
+    internal (current, target, promotion) representation.
+
+    Like interpretMove, the move is matched against the legal moves
+    of the board, so the returned move is known to be legal.
+    """
+    match = coordReg.match(mvStr)
+    if match is None:
+        raise MoveError(mvStr, "Invalid syntax!")
+    current = match.group("current")
+    target = match.group("target")
+    promotion = match.group("promotion")
+    move = (toInternal(current[1], current[0]), toInternal(target[1], target[0]),
+            None if promotion is None else promotion.upper())
+    for legal in board.legalMoves():
+        if legal == move:
+            return legal
+    raise MoveError(mvStr, "Illegal move!")
+
+
 def interpretMove(board, mvStr):
     """
     Interpret move given in algebraic notation
     to internal (current, target) representation.
+
+    The move is matched against the legal moves of the board, so the
+    returned move is known to be legal.
     """
     match = re.match(mvReg, mvStr)
     if match is None:
@@ -73,9 +112,12 @@ def interpretMove(board, mvStr):
         kingPos = board.pieces[board.toMove][KING].position
         if castle == "O-O-O":
             # Long castle, negative files
-            return kingPos, (kingPos[0], kingPos[1] - 2), None
+            move = kingPos, (kingPos[0], kingPos[1] - 2), None
         else:
-            return kingPos, (kingPos[0], kingPos[1] + 2), None
+            move = kingPos, (kingPos[0], kingPos[1] + 2), None
+        if move not in board.legalMoves():
+            raise MoveError(mvStr, "Can't castle!")
+        return move
 
     depFile = match.group("depFile")
     depRank = match.group("depRank")
@@ -92,25 +134,23 @@ def interpretMove(board, mvStr):
     currRank, currFile = toInternal(depRank, depFile)
     target = toInternal(arrRank, arrFile)
 
-
-    candidates = board.pieces[board.toMove][LIVING]
     result = []
-
-    # Copy of list to avoid interference
-    for candidate in candidates[:]:
-        if type(candidate) is not pieceType:
+    for move in board.legalMoves():
+        current = move[0]
+        if move[1] != target or move[2] != promotion:
+            continue
+        if type(board[current]) is not pieceType:
             continue
         if currRank is not None:
             # Current rank of piece specified
-            if candidate.position[0] != currRank:
+            if current[0] != currRank:
                 continue
         if currFile is not None:
-            # Current rank of piece specified
-            if candidate.position[1] != currFile:
+            # Current file of piece specified
+            if current[1] != currFile:
                 continue
 
-        if board.move(candidate.position, target, promotion=promotion, validate=True):
-            result.append(candidate)
+        result.append(move)
 
     if len(result) == 0:
         raise MoveError(mvStr, "No piece can make that move!")
@@ -118,6 +158,103 @@ def interpretMove(board, mvStr):
         raise MoveError(mvStr, "Ambigous move! Disambiguate by giving a departing rank or file.")
 
 
-    return result[0].position, target, promotion
+    return result[0]
+
+
+def _sanBody(board, move, moves):
+    """
+    Return the move in algebraic notation without the check or mate
+    suffix, disambiguated against the given list of legal moves.
+    """
+    current, target, promotion = move
+    piece = board[current]
+    pieceType = type(piece)
+
+    if pieceType is King and abs(target[1] - current[1]) == 2:
+        return "O-O" if target[1] > current[1] else "O-O-O"
+
+    square = chr(target[1] + 97) + str(target[0] + 1)
+    if pieceType is Pawn:
+        if target[1] != current[1]:
+            # Captures, including en passant, give the departing file
+            square = chr(current[1] + 97) + "x" + square
+        if promotion is not None:
+            square += "=" + promotion
+        return square
+
+    # Other pieces of the same type that can move to the target
+    others = [other[0] for other in moves
+              if other[1] == target and other[0] != current and type(board[other[0]]) is pieceType]
+    prefix = LETTERS[pieceType]
+    if others:
+        if all(other[1] != current[1] for other in others):
+            prefix += chr(current[1] + 97)
+        elif all(other[0] != current[0] for other in others):
+            prefix += str(current[0] + 1)
+        else:
+            prefix += chr(current[1] + 97) + str(current[0] + 1)
+
+    if board[target] is not None:
+        prefix += "x"
+    return prefix + square
+
+
+def moveToSAN(board, move):
+    """
+    Return a legal (current, target, promotion) move in standard
+    algebraic notation, like Nbxd7+ or e8=Q#.
 
+    The legal moves are generated once for the disambiguation, and the
+    move is then made and taken back to find the check or mate suffix.
+    A frozen board is left untouched by working on a copy.
 
+    Raises MoveError if the move is not legal.
+    """
+    if board.frozen:
+        board = board.copy(stack=False)
+    moves = list(board.legalMoves())
+    if move not in moves:
+        raise MoveError(toCoordinates(move), "Illegal move!")
+    san = _sanBody(board, move, moves)
+
+    undo = board._make(*move)
+    if board.inCheck(board.toMove):
+        san += "+" if board.hasLegalMoves() else "#"
+    board._unmake(undo)
+    return san
+
+
+def movesToSAN(board, moves):
+    """
+    Return a list of the given moves, played in order from the current
+    position, in standard algebraic notation. The board is left in the
+    current position.
+
+    The legal moves of each position are generated only once, and used
+    both for the disambiguation of the move played from it and for the
+    mate test of the move leading to it.
+
+    Raises MoveError if a move is not legal, with the index of the move
+    in its ply attribute.
+    """
+    if board.frozen:
+        board = board.copy(stack=False)
+    result = []
+    undos = []
+    try:
+        legal = list(board.legalMoves())
+        for ply, move in enumerate(moves):
+            if move not in legal:
+                error = MoveError(toCoordinates(move), "Ply {}: Illegal move!".format(ply + 1))
+                error.ply = ply
+                raise error
+            san = _sanBody(board, move, legal)
+            undos.append(board._make(*move))
+            legal = list(board.legalMoves())
+            if board.inCheck(board.toMove):
+                san += "+" if legal else "#"
+            result.append(san)
+    finally:
+        for undo in reversed(undos):
+            board._unmake(undo)
+    return result
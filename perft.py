@@ -0,0 +1,98 @@
+#! /usr/bin/env python3
+
+"""
+Perft benchmark
+
+Counts the leaf nodes of the legal move tree for a set of standard
+positions, and compares them with published results. Any difference
+points to a bug in move generation, in Board.move or in the
+consequences of a move. The speed of each run is reported in nodes
+per second.
+
+Run as a module from the directory containing the package:
+
+    python -m chess.perft --depth 4 kiwipete
+"""
+
+import argparse
+import sys
+import time
+
+from .Board import Board
+from .interpreter import toCoordinates
+from .states import STATES
+
+__all__ = ["PERFTS", "run", "divide"]
+
+
+# Published node counts for depth 1, 2, ... of each position
+PERFTS = {
+    "default": [20, 400, 8902, 197281, 4865609, 119060324],
+    "kiwipete": [48, 2039, 97862, 4085603, 193690690],
+    "perft3": [14, 191, 2812, 43238, 674624, 11030083],
+    "perft4": [6, 264, 9467, 422333, 15833292],
+    "perft5": [44, 1486, 62379, 2103487, 89941194],
+    "perft6": [46, 2079, 89890, 3894594, 164075551]
+}
+
+
+def run(name, depth, out=sys.stdout):
+    """
+    Run perft for the named position up to the given depth, writing
+    a line per depth to out.
+
+    Return True if all counts match the published results.
+    """
+    expected = PERFTS[name]
+    board = Board(STATES[name])
+    passed = True
+    for d in range(1, min(depth, len(expected)) + 1):
+        start = time.perf_counter()
+        nodes = board.perft(d)
+        elapsed = time.perf_counter() - start
+
+        correct = nodes == expected[d - 1]
+        passed = passed and correct
+        out.write("{:<10} {:>2} {:>12} {:>12} {:>10.0f} nps  {}\n".format(
+            name, d, nodes, expected[d - 1], nodes / max(elapsed, 1e-9),
+            "ok" if correct else "FAIL"))
+    return passed
+
+
+def divide(name, depth, out=sys.stdout):
+    """Write the perft of each move from the named position to out"""
+    board = Board(STATES[name])
+    result = board.divide(depth)
+    for move, nodes in result.items():
+        out.write("{:<8} {}\n".format(toCoordinates(move), nodes))
+    out.write("\n{} moves, {} nodes\n".format(len(result), sum(result.values())))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run perft on the standard positions.")
+    parser.add_argument("positions", nargs="*",
+                        help="positions to run, among {} (default: all)".format(", ".join(PERFTS)))
+    parser.add_argument("-d", "--depth", type=int, default=3,
+                        help="maximum depth (default: 3)")
+    parser.add_argument("--divide", action="store_true",
+                        help="show the node count below each move at the given depth")
+    args = parser.parse_args(argv)
+
+    positions = args.positions or list(PERFTS)
+    for name in positions:
+        if name not in PERFTS:
+            parser.error("unknown position '{}'".format(name))
+
+    if args.divide:
+        for name in positions:
+            divide(name, args.depth)
+        return 0
+
+    passed = True
+    for name in positions:
+        passed = run(name, args.depth) and passed
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+#! /usr/bin/env python3
+
+"""
+Streaming reader for Portable Game Notation
+
+Games are read one at a time from a file or any iterable of lines, so
+memory use does not grow with the size of the archive. Only the main
+line of each game is kept: comments, NAGs, move numbers and
+variations are skipped.
+
+Malformed games are reported through the error attribute of the game,
+and reading continues with the next game.
+"""
+
+import re
+
+from .Board import Board
+from .interpreter import interpretMove
+from .utilities import ChessError, MoveError, NotationError
+
+__all__ = ["Game", "readGames", "replayGames"]
+
+
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+
+# Quotes in the value should be escaped, but often are not
+headerReg = re.compile(r'^\[\s*(?P<tag>\w+)\s+"(?P<value>.*)"\s*\]$')
+
+# Results must come before move numbers and moves, as they look alike
+tokenReg = re.compile(
+        r"[{}();]"
+        r"|\$\d+"
+        r"|1-0|0-1|1/2-1/2|\*"
+        r"|\d*\.+"
+        r"|[^\s{}();$]+")
+
+# Annotation symbols trailing a move, like "Nf3!?"
+annotationReg = re.compile(r"[!?]+$")
+
+
+class Game():
+    """
+    Properties:
+
+    headers: dict of the tag pairs of the game, in the order given
+
+    moves: list of the moves of the main line, in algebraic notation
+
+    result: the game termination marker ("1-0", "0-1", "1/2-1/2" or "*"),
+        or None if the movetext ended without one
+
+    error: None, or the exception raised while reading or replaying
+        the game
+
+    errorPly: index in moves of the move that could not be replayed,
+        or None
+
+    board: after replaying, the final position, or the position before
+        the move that could not be replayed
+    """
+
+    def __init__(self):
+        self.headers = {}
+        self.moves = []
+        self.result = None
+        self.error = None
+        self.errorPly = None
+        self.board = None
+
+    def __repr__(self):
+        return (self.__class__.__qualname__ +
+                f"(headers={self.headers!r}, moves={len(self.moves)}, result={self.result!r})")
+
+    def startingBoard(self):
+        """Return a board with the starting position given by the FEN tag, if any"""
+        fen = self.headers.get("FEN")
+        if fen is None:
+            return Board()
+        return Board.fromFEN(fen)
+
+    def positions(self):
+        """
+        Replay the game, yielding (mvStr, board) after each move, where
+        mvStr is the move as written in the game, in algebraic notation.
+
+        The same board instance is yielded every time, and is updated
+        in place. Raises MoveError, NotationError or StateError if
+        the game can not be replayed. A MoveError has the index of the
+        move in its ply attribute, like from replay.
+        """
+        board = self.startingBoard()
+        for ply, mvStr in enumerate(self.moves):
+            try:
+                move = interpretMove(board, mvStr)
+            except MoveError as e:
+                error = MoveError(mvStr, "Ply {}: {}".format(ply + 1, e.reason))
+                error.ply = ply
+                raise error from e
+            board.push(move)
+            yield mvStr, board
+
+    def replay(self):
+        """
+        Replay the game, storing the final position in the board
+        attribute. On failure, the error and errorPly attributes are
+        set, and False is returned.
+        """
+        try:
+            self.board = self.startingBoard()
+        except ChessError as e:
+            self.error = e
+            return False
+
+        try:
+            self.board.executeMoves(self.moves)
+        except MoveError as e:
+            self.error = e
+            self.errorPly = e.ply
+            return False
+        return True
+
+
+def _lines(source):
+    """Yield the lines of a path or an iterable of lines"""
+    if isinstance(source, str):
+        with open(source, encoding="utf-8", errors="replace") as f:
+            yield from f
+    else:
+        yield from source
+
+
+def readGames(source):
+    """
+    Yield the games in the given source as Game instances, without
+    replaying them.
+
+    The source is a path, or an iterable of lines such as an open file.
+    """
+    game = Game()
+    # Any headers or movetext read for the current game
+    started = False
+    # Any movetext read for the current game
+    movetext = False
+    # Inside a {} comment
+    comment = False
+    # Nesting depth of variations
+    depth = 0
+
+    for line in _lines(source):
+        if comment:
+            end = line.find("}")
+            if end == -1:
+                continue
+            line = line[end + 1:]
+            comment = False
+        elif line.startswith("%"):
+            # Escaped line
+            continue
+
+        stripped = line.strip()
+        if stripped.startswith("["):
+            if depth:
+                if game.error is None:
+                    game.error = NotationError(stripped, "Unterminated variation")
+                depth = 0
+            if movetext:
+                # Movetext ended without a result
+                yield game
+                game = Game()
+                movetext = False
+            started = True
+
+            match = headerReg.match(stripped)
+            if match is None:
+                if game.error is None:
+                    game.error = NotationError(stripped, "Invalid tag pair")
+            else:
+                value = match.group("value").replace('\\"', '"').replace("\\\\", "\\")
+                game.headers[match.group("tag")] = value
+            continue
+
+        pos = 0
+        while True:
+            match = tokenReg.search(line, pos)
+            if match is None:
+                break
+            token = match.group()
+            pos = match.end()
+            movetext = True
+
+            if token == "{":
+                end = line.find("}", pos)
+                if end == -1:
+                    comment = True
+                    break
+                pos = end + 1
+            elif token == ";":
+                # Comment to end of line
+                break
+            elif token == "(":
+                depth += 1
+            elif token == ")":
+                if depth == 0:
+                    if game.error is None:
+                        game.error = NotationError(token, "Unmatched end of variation")
+                else:
+                    depth -= 1
+            elif depth or token[0] == "$" or token.endswith("."):
+                # Variation, NAG or move number
+                continue
+            elif token in RESULTS:
+                game.result = token
+                yield game
+                game = Game()
+                started = movetext = False
+            else:
+                token = annotationReg.sub("", token)
+                if token in ("0-0", "0-0-0"):
+                    token = token.replace("0", "O")
+                game.moves.append(token)
+                started = True
+
+    if started:
+        yield game
+
+
+def replayGames(source):
+    """
+    Yield the games in the given source, after replaying them.
+
+    Each game has its board attribute set to the final position. Games
+    that can not be replayed have their error and errorPly attributes
+    set, and are yielded like the others.
+    """
+    for game in readGames(source):
+        if game.error is None:
+            game.replay()
+        yield game
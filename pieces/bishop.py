@@ -5,7 +5,10 @@ from .flags import CAPTURE
 from .piece import Piece
 
 class Bishop(Piece):
+    __slots__ = ()
+
     LEGALMOVES = moves.bishopMoves()
+    TARGETS = moves.BISHOP_TARGETS
 
     def __str__(self):
         if self.color is WHITE:
@@ -19,22 +22,8 @@ class Bishop(Piece):
         if target not in self.getMoves():
             return False, None
 
-        relative = (target[0] - self.position[0], target[1] - self.position[1])
-        scanRank, scanFile = self.position
-
-        dirRank = self.sign(relative[0])
-        dirFile = self.sign(relative[1])
-
-        # Start scanning one square over
-        scanPos = (scanRank + dirRank, scanFile + dirFile)
-        while scanPos != target:
-            square = board[scanPos]
-            if square is not None:
-                # Piece blocking path to target
-                return False, {}
-            scanRank += dirRank
-            scanFile += dirFile
-            scanPos = (scanRank, scanFile)
+        if not self.isPathClear(board, target):
+            return False, {}
 
         # All squares free up until target
         square = board[target]
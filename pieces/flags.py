@@ -58,6 +58,10 @@ def exeDouble(board, data):
     board[beforePos].passant = True
     board.passantPos[board.toMove] = afterPos
 
+    # Hash in the en passant file
+    board.passantKey = board.passantHashKey(afterPos, board.toMove)
+    board.zobrist ^= board.passantKey
+
     return beforePos
 
 
@@ -69,6 +73,10 @@ def revDouble(board, revData):
     board[pos].passant = False
     board.passantPos[board.toMove] = None
 
+    # Hash out the en passant file
+    board.zobrist ^= board.passantKey
+    board.passantKey = 0
+
 
 DOUBLE = Flag(exeDouble, revDouble)
 
@@ -154,8 +162,9 @@ def exeRelocate(board, data):
     return data
 
 
-# Swapping pieces is a symmetric operation
-revRelocate = exeRelocate
+def revRelocate(board, revData):
+    # Swapping pieces is a symmetric operation
+    exeRelocate(board, revData)
 
 RELOCATE = Flag(exeRelocate, revRelocate)
 
@@ -1,14 +1,15 @@
 #! /usr/bin/env python3
 
-from collections import OrderedDict
-
 from . import moves, WHITE, BLACK
 from .flags import CAPTURE, MOVE, RELOCATE
 from .piece import Piece
 from .rook import Rook
 
 class King(Piece):
+    __slots__ = ("hasMoved",)
+
     LEGALMOVES = moves.kingMoves()
+    TARGETS = moves.KING_TARGETS
 
     def __init__(self, *args, hasMoved=False, **kwargs):
         self.hasMoved = hasMoved
@@ -19,6 +20,11 @@ class King(Piece):
         return (base +
                 f", hasMoved={self.hasMoved!r})")
 
+    def copy(self):
+        piece = super().copy()
+        piece.hasMoved = self.hasMoved
+        return piece
+
     def __str__(self):
         if self.color is WHITE:
             return "\N{WHITE CHESS KING}"
@@ -37,6 +43,9 @@ class King(Piece):
                 return True, {}
             elif piece.color is not self.color:
                 return True, {CAPTURE: target}
+            else:
+                # Can't capture own piece
+                return False, {}
         else:
             # Castling move
             if self.position[0] != (0 if self.color is WHITE else 7):
@@ -46,7 +55,8 @@ class King(Piece):
                 return False, {}
 
             # Cannot castle from check
-            # b.checkTest(self.position)
+            if board.isContested(-self.color, self.position):
+                return False, {}
 
             # Searching for rook to castle with using a
             # hard coded position, only works in default game
@@ -62,9 +72,6 @@ class King(Piece):
             castleCheck = False
             rookFile = None
             while _file + offset >= 0 and _file + offset < 8:
-                # Cannot castle through check
-                # b.checkTest((self.position[0], scanFile))
-
                 # Scan for rook or empty space
                 square = board[(self.position[0], _file + offset)]
                 if square is None:
@@ -86,9 +93,14 @@ class King(Piece):
                 # Found no rook
                 return False, {}
 
+            # Cannot castle through check. The target square
+            # is covered by the check test in Board.move
+            if board.isContested(-self.color, (self.position[0], _file + dirFile)):
+                return False, {}
+
             # Found rook and clear path
-            return True, OrderedDict([
-                (MOVE, (self.position[0], rookFile)),
-                (RELOCATE, ((self.position[0], rookFile), (self.position[0], target[1] - dirFile)))
-            ])
+            return True, {
+                MOVE: (self.position[0], rookFile),
+                RELOCATE: ((self.position[0], rookFile), (self.position[0], target[1] - dirFile))
+            }
 
@@ -5,7 +5,10 @@ from .flags import CAPTURE
 from .piece import Piece
 
 class Knight(Piece):
+    __slots__ = ()
+
     LEGALMOVES = moves.knightMoves()
+    TARGETS = moves.KNIGHT_TARGETS
 
     def __str__(self):
         if self.color is WHITE:
@@ -1,6 +1,10 @@
 #! /usr/bin/env python
 
-__all__ = ["AnyMove", "kingMoves", "queenMoves", "bishopMoves", "knightMoves", "rookMoves", "pawnMoves"]
+__all__ = [
+    "AnyMove", "kingMoves", "queenMoves", "bishopMoves", "knightMoves", "rookMoves", "pawnMoves",
+    "targetTable", "KING_TARGETS", "QUEEN_TARGETS", "BISHOP_TARGETS", "KNIGHT_TARGETS",
+    "ROOK_TARGETS", "PAWN_TARGETS", "DIRECTIONS", "RAYS"
+]
 
 
 class AnyMove():
@@ -91,3 +95,58 @@ def rookMoves():
 def pawnMoves(_dir):
     return [(_dir * 1, 0), (_dir * 2, 0), (_dir * 1, 1), (_dir * 1, -1)]
 
+
+
+# Precomputed tables, indexed by [rank][file] of the square a piece
+# stands on. These are built once, so looking up the squares a piece
+# can reach does not allocate.
+
+def targetTable(relativeMoves):
+    """
+    Return a table holding for every square a frozenset of the
+    positions reached by the given relative moves, within the board.
+    """
+    table = []
+    for rank in range(8):
+        row = []
+        for _file in range(8):
+            row.append(frozenset(
+                (rank + dRank, _file + dFile) for dRank, dFile in relativeMoves
+                if 0 <= rank + dRank < 8 and 0 <= _file + dFile < 8))
+        table.append(row)
+    return table
+
+
+KING_TARGETS = targetTable(kingMoves())
+QUEEN_TARGETS = targetTable(queenMoves())
+BISHOP_TARGETS = targetTable(bishopMoves())
+KNIGHT_TARGETS = targetTable(knightMoves())
+ROOK_TARGETS = targetTable(rookMoves())
+# Indexed by the direction of the pawn, 1 for white and -1 for black
+PAWN_TARGETS = {_dir: targetTable(pawnMoves(_dir)) for _dir in (1, -1)}
+
+
+# The eight directions as (rank, file) steps
+DIRECTIONS = [(1, 0), (0, 1), (-1, 0), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+
+def _rays(direction):
+    """Return a table of the positions from every square out to the edge in a direction"""
+    dRank, dFile = direction
+    table = []
+    for rank in range(8):
+        row = []
+        for _file in range(8):
+            ray = []
+            r, f = rank + dRank, _file + dFile
+            while 0 <= r < 8 and 0 <= f < 8:
+                ray.append((r, f))
+                r += dRank
+                f += dFile
+            row.append(tuple(ray))
+        table.append(row)
+    return table
+
+
+# Rays by direction, each a tuple of positions ordered outwards
+RAYS = {direction: _rays(direction) for direction in DIRECTIONS}
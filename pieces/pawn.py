@@ -13,13 +13,17 @@ SYMBOLS = {
 
 
 class Pawn(Piece):
+    __slots__ = ("hasMoved", "passant", "direction")
+
+    # Indexed by the direction of the pawn
+    TARGETS = moves.PAWN_TARGETS
+
     def __init__(self, *args, hasMoved=False, passant=False, **kwargs):
         self.hasMoved = hasMoved
         self.passant = passant
         super().__init__(*args, **kwargs)
         # White pawns can only move upwards in rank
         self.direction = self.color
-        self.LEGALMOVES = moves.pawnMoves(self.direction)
 
     def __repr__(self):
         base = super().__repr__()[:-1]
@@ -27,12 +31,24 @@ class Pawn(Piece):
                 f", hasMoved={self.hasMoved!r}"
                 f", passant={self.passant!r})")
 
+    def copy(self):
+        piece = super().copy()
+        piece.hasMoved = self.hasMoved
+        piece.passant = self.passant
+        piece.direction = self.direction
+        return piece
+
     def __str__(self):
         if self.color is WHITE:
             return "\N{WHITE CHESS PAWN}"
         else:
             return "\N{BLACK CHESS PAWN}"
 
+    def getMoves(self):
+        """Return set of valid moves using absolute coordinates"""
+        rank, _file = self.position
+        return self.TARGETS[self.direction][rank][_file]
+
     def validateMove(self, board, target, promotion=None):
         """Return True if move is valid in an isolated sense"""
         if target not in self.getMoves():
@@ -3,6 +3,13 @@
 from . import moves, WHITE, BLACK
 
 class Piece():
+    __slots__ = ("color", "position")
+
+    # Table of the targets of the piece from each square, looked up by
+    # getMoves. Pieces without a table have their targets computed
+    # from LEGALMOVES.
+    TARGETS = None
+
     def __init_subclass__(cls):
         if not callable(getattr(cls, "validateMove", None)):
             raise NotImplementedError("Piece class '{}' has no method 'validateMove'".format(cls.__name__))
@@ -19,6 +26,16 @@ class Piece():
         return (self.__class__.__qualname__ +
                 f"(color={self.color!r}, position={self.position!r})")
 
+    def copy(self):
+        """
+        Return a copy of the piece. The attributes are copied directly,
+        skipping the validation done by the constructor.
+        """
+        piece = object.__new__(type(self))
+        piece.color = self.color
+        piece.position = self.position
+        return piece
+
     @staticmethod
     def sign(n):
         if n > 0:
@@ -35,6 +52,8 @@ class Piece():
     def getMoves(self):
         """Return set of valid moves using absolute coordinates"""
         rank, _file = self.position
+        if self.TARGETS is not None:
+            return self.TARGETS[rank][_file]
         if self.LEGALMOVES is None:
             return moves.AnyMove()
         absoluteMoves = set()
@@ -49,12 +68,28 @@ class Piece():
 
         return absoluteMoves
 
+    def isPathClear(self, board, target):
+        """
+        Return True if all squares between the piece and the target
+        are empty. The target must be on the same rank, file or
+        diagonal as the piece.
+        """
+        rank, _file = self.position
+        direction = (self.sign(target[0] - rank), self.sign(target[1] - _file))
+        boardstate = board.boardstate
+        for scanPos in moves.RAYS[direction][rank][_file]:
+            if scanPos == target:
+                return True
+            if boardstate[scanPos[0]][scanPos[1]] is not None:
+                # Piece blocking path to target
+                return False
+        return False
+
     def validateMove(self, board, target):
         """
         Returns a tuple (valid, consequences) where the first element
         is a boolean, and the second a dict of consequences.
-        In cases where order of consequences matters, an OrderedDict
-        is used instead.
+        Consequences are executed in the order of the dict.
 
         The keys in the consequences dict are flags defined in
         the pieces module. The semantic meanings of the values
@@ -5,7 +5,10 @@ from .flags import CAPTURE
 from .piece import Piece
 
 class Rook(Piece):
+    __slots__ = ("hasMoved",)
+
     LEGALMOVES = moves.rookMoves()
+    TARGETS = moves.ROOK_TARGETS
 
     def __init__(self, *args, hasMoved=False, **kwargs):
         self.hasMoved = hasMoved
@@ -16,6 +19,11 @@ class Rook(Piece):
         return (base +
                 f", hasMoved={self.hasMoved!r})")
 
+    def copy(self):
+        piece = super().copy()
+        piece.hasMoved = self.hasMoved
+        return piece
+
     def __str__(self):
         if self.color is WHITE:
             return "\N{WHITE CHESS ROOK}"
@@ -27,22 +35,8 @@ class Rook(Piece):
         if target not in self.getMoves():
             return False, {}
 
-        relative = (target[0] - self.position[0], target[1] - self.position[1])
-        scanRank, scanFile = self.position
-
-        dirRank = self.sign(relative[0])
-        dirFile = self.sign(relative[1])
-
-        # Start scanning one square over
-        scanPos = (scanRank + dirRank, scanFile + dirFile)
-        while scanPos != target:
-            square = board[scanPos]
-            if square is not None:
-                # Piece blocking path to target
-                return False, {}
-            scanRank += dirRank
-            scanFile += dirFile
-            scanPos = (scanRank, scanFile)
+        if not self.isPathClear(board, target):
+            return False, {}
 
         # All squares free up until target
         square = board[target]
@@ -0,0 +1,456 @@
+#! /usr/bin/env python3
+
+"""
+Alpha-beta search
+
+Finds the best move for the player to move by a negamax search with
+alpha-beta pruning. The search deepens iteratively, so a result is
+always available from the last completed depth when the time or node
+budget runs out. Captures are resolved by a quiescence search at the
+leaves, to avoid misjudging positions in the middle of an exchange.
+
+Moves are made and unmade in place on the searched board, using the
+undo data of the flags, so no boards are copied during the search.
+
+Scores are given in centipawns from the perspective of the player to
+move. Mate scores are MATE minus the number of plies to the mate.
+
+Given a Tablebase, positions reached by a capture or pawn move with few
+enough pieces for the tables are scored by probing them instead of
+searching. Tablebase wins are TBWIN minus the number of plies to the
+probed position, below any mate score, and wins or losses drawn by the
+fifty move rule score as draws.
+
+Run as a module to search a position given in FEN:
+
+    python -m chess.search --movetime 5 "<fen>"
+"""
+
+import argparse
+import sys
+import time
+from collections import namedtuple
+
+from .Board import Board
+from .pieces import *
+from .interpreter import toCoordinates
+from .transposition import *
+from .evaluation import PIECEVALUES, evaluate
+from .syzygy import Tablebase
+
+__all__ = ["MATE", "TBWIN", "SearchResult", "Search"]
+
+
+MATE = 100000
+INFINITY = MATE + 1
+MAXPLY = 128
+# Score of a tablebase win, as a mate score too far away to be found
+TBWIN = MATE - 2 * MAXPLY
+
+PROMOTIONVALUES = {"Q": 900, "R": 500, "B": 330, "N": 320}
+
+# Move ordering scores, captures and promotions first, then killers,
+# then the remaining moves by their history score
+CAPTURESCORE = 1 << 24
+KILLERSCORE = 1 << 23
+HISTORYLIMIT = 1 << 22
+
+# The clock is only read every this many nodes, plus one
+CHECKINTERVAL = 255
+
+# Result of a search
+# move: the best move found, or None if there are no legal moves
+# score: score of the move in centipawns for the player to move
+# depth: the last completed depth
+# nodes: number of nodes searched
+# pv: list of moves of the expected line of play, starting with move
+# time: seconds spent searching
+SearchResult = namedtuple("SearchResult", ("move", "score", "depth", "nodes", "pv", "time"))
+
+
+def _toTable(score, ply):
+    """Convert a mate or tablebase score to be counted from the current position, for storing"""
+    if score >= TBWIN - MAXPLY:
+        return score + ply
+    if score <= -TBWIN + MAXPLY:
+        return score - ply
+    return score
+
+
+def _fromTable(score, ply):
+    """Convert a stored mate or tablebase score back to be counted from the root"""
+    if score >= TBWIN - MAXPLY:
+        return score - ply
+    if score <= -TBWIN + MAXPLY:
+        return score + ply
+    return score
+
+
+class Search():
+    """
+    Properties:
+
+    board: the board that is searched. It is changed during the search,
+        but always restored before search returns. A frozen board is
+        copied, so searches can share one frozen board.
+
+    nodes: number of nodes visited by the current or last search
+
+    stopped: True once the search has been stopped, either by running
+        out of its budget or by a call to stop
+
+    killers: list indexed by ply of the two last quiet moves that caused
+        a beta cutoff at that ply
+
+    history: dict indexed by WHITE/BLACK containing a list indexed by
+        the current square * 64 + the target square, scoring quiet
+        moves by how often they caused beta cutoffs. Kept between
+        searches, but aged at the start of each.
+
+    table: the TranspositionTable caching the results of the search.
+        Kept between searches, and may be shared with other searches.
+
+    tablebase: the Tablebase probed for positions with few pieces, or
+        None
+
+    tbHits: number of successful tablebase probes of the current or last
+        search
+    """
+
+    def __init__(self, board, table=None, tablebase=None):
+        self.board = board.copy(stack=False) if board.frozen else board
+        self.table = TranspositionTable() if table is None else table
+        self.tablebase = tablebase
+        self.nodes = 0
+        self.tbHits = 0
+        self.stopped = False
+        self.killers = [[None, None] for ply in range(MAXPLY + 1)]
+        self.history = {WHITE: [0] * 4096, BLACK: [0] * 4096}
+
+        self._deadline = None
+        self._maxNodes = None
+        # Score of the best root move of the current depth
+        self._rootScore = None
+        # Principal variation found below each ply
+        self._pv = [[] for ply in range(MAXPLY + 2)]
+        # Hashes of the positions from the root to the current node
+        self._path = []
+
+    def stop(self):
+        """Stop the search as soon as possible, for example from another thread"""
+        self.stopped = True
+
+    def search(self, depth=MAXPLY, movetime=None, nodes=None, info=None):
+        """
+        Search the current position, and return a SearchResult.
+
+        The search is deepened one ply at a time up to the given depth,
+        until movetime seconds have passed or the given number of nodes
+        have been searched. A depth that is not completed within the
+        budget is discarded, except for a better move found among the
+        root moves searched before the budget ran out. If not even one
+        root move is searched, an arbitrary legal move is returned.
+
+        If given, info is called with the SearchResult of every
+        completed depth.
+        """
+        board = self.board
+        start = time.perf_counter()
+        self.nodes = 0
+        self.tbHits = 0
+        self.stopped = False
+        self._deadline = None if movetime is None else start + movetime
+        self._maxNodes = nodes
+        self._path = [board.zobrist]
+        self.table.newSearch()
+        for killers in self.killers:
+            killers[0] = killers[1] = None
+        for table in self.history.values():
+            for index, score in enumerate(table):
+                if score:
+                    table[index] = score >> 2
+
+        moves = list(board.legalMoves())
+        if not moves:
+            score = -MATE if board.inCheck(board.toMove) else 0
+            return SearchResult(None, score, 0, 0, [], 0.0)
+        result = SearchResult(moves[0], 0, 0, 0, [moves[0]], 0.0)
+
+        for d in range(1, min(depth, MAXPLY) + 1):
+            first = result.move if result.depth else None
+            score = self._negamax(d, 0, -INFINITY, INFINITY, first)
+            pv = self._pv[0]
+            if self.stopped:
+                if pv:
+                    # The root moves searched before stopping were searched
+                    # deeper, starting with the previous best move
+                    result = result._replace(move=pv[0], score=self._rootScore, pv=pv)
+                break
+            result = SearchResult(pv[0], score, d, self.nodes, pv,
+                                  time.perf_counter() - start)
+            if info is not None:
+                info(result)
+            if abs(score) >= MATE - MAXPLY and MATE - abs(score) <= d:
+                # Mate within the full-width depth, so every shorter line
+                # has been searched. A longer mate may have been found by
+                # the quiescence search, with quiet shorter ones unseen.
+                break
+
+        return result._replace(nodes=self.nodes, time=time.perf_counter() - start)
+
+    def _checkBudget(self):
+        """Set stopped if the node or time budget has run out"""
+        if self._maxNodes is not None and self.nodes >= self._maxNodes:
+            self.stopped = True
+        elif (self._deadline is not None and not self.nodes & CHECKINTERVAL and
+                time.perf_counter() >= self._deadline):
+            self.stopped = True
+        return self.stopped
+
+    def _isRepetition(self):
+        """
+        Return True if the current position occurred earlier in the
+        search or in the game before the search.
+        """
+        path = self._path
+        key = path[-1]
+        # Positions before the last capture or pawn move can't repeat
+        first = max(0, len(path) - 1 - self.board.halfmoveClock)
+        for index in range(len(path) - 5, first - 1, -2):
+            if path[index] == key:
+                return True
+        return key in self.board.repetitions
+
+    def _negamax(self, depth, ply, alpha, beta, first=None):
+        """
+        Return the score of the current position searched to the given
+        depth, within the window alpha to beta. The move first, if
+        given, is searched before the others.
+        """
+        if depth <= 0:
+            return self._quiesce(ply, alpha, beta)
+
+        board = self.board
+        self._pv[ply] = []
+        self.nodes += 1
+        if self._checkBudget():
+            return 0
+        if ply and (board.halfmoveClock >= 100 or self._isRepetition()):
+            return 0
+
+        key = board.zobrist
+        entry = self.table.probe(key)
+        if entry is not None:
+            if first is None:
+                first = entry.move
+            if ply and entry.depth >= depth:
+                score = _fromTable(entry.score, ply)
+                if (entry.bound == EXACT or
+                        entry.bound == LOWER and score >= beta or
+                        entry.bound == UPPER and score <= alpha):
+                    if entry.move is not None:
+                        self._pv[ply] = [entry.move]
+                    return score
+
+        tablebase = self.tablebase
+        if (ply and tablebase is not None and not board.halfmoveClock and
+                tablebase.canProbe(board)):
+            # Only just after a capture or pawn move, as the tables
+            # assume the halfmove clock is 0
+            wdl = tablebase.getWDL(board)
+            if wdl is not None:
+                self.tbHits += 1
+                score = TBWIN - ply if wdl > 1 else -TBWIN + ply if wdl < -1 else 0
+                self.table.store(key, None, _toTable(score, ply), MAXPLY, EXACT)
+                return score
+
+        moves = list(board.legalMoves())
+        if not moves:
+            return -MATE + ply if board.inCheck(board.toMove) else 0
+        if ply >= MAXPLY:
+            return evaluate(board)
+
+        player = board.toMove
+        best = -INFINITY
+        bestMove = None
+        bound = UPPER
+        for move in self._order(moves, ply, first):
+            undo = board._make(*move)
+            self._path.append(board.zobrist)
+            score = -self._negamax(depth - 1, ply + 1, -beta, -alpha)
+            self._path.pop()
+            board._unmake(undo)
+            if self.stopped:
+                return 0
+
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    bestMove = move
+                    bound = EXACT
+                    self._pv[ply] = [move] + self._pv[ply + 1]
+                    if not ply:
+                        self._rootScore = score
+                    if score >= beta:
+                        bound = LOWER
+                        if not self._isCapture(move):
+                            self._storeQuiet(player, move, depth, ply)
+                        break
+
+        self.table.store(key, bestMove, _toTable(best, ply), depth, bound)
+        return best
+
+    def _quiesce(self, ply, alpha, beta):
+        """
+        Return the score of the current position, searching only
+        captures and promotions until the position is quiet. When in
+        check, all moves are searched, as standing pat is not an option.
+        """
+        board = self.board
+        self._pv[ply] = []
+        self.nodes += 1
+        if self._checkBudget():
+            return 0
+        if ply >= MAXPLY:
+            # Bound the checks too, the tables only have MAXPLY plies
+            return evaluate(board)
+
+        inCheck = board.inCheck(board.toMove)
+        if inCheck:
+            best = -INFINITY
+        else:
+            # Stand pat, the player is not forced to capture
+            best = evaluate(board)
+            if best >= beta:
+                return best
+            if best > alpha:
+                alpha = best
+
+        moves = list(board.legalMoves())
+        if not moves:
+            return -MATE + ply if inCheck else 0
+        if not inCheck:
+            moves = [move for move in moves if self._isCapture(move)]
+            if not moves:
+                return best
+
+        for move in self._order(moves, ply):
+            undo = board._make(*move)
+            score = -self._quiesce(ply + 1, -beta, -alpha)
+            board._unmake(undo)
+            if self.stopped:
+                return 0
+
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    if score >= beta:
+                        break
+        return best
+
+    def _isCapture(self, move):
+        """Return True if the move is a capture or a promotion"""
+        current, target, promotion = move
+        if promotion is not None:
+            return True
+        if self.board.boardstate[target[0]][target[1]] is not None:
+            return True
+        # En passant, a pawn moving diagonally to an empty square
+        return current[1] != target[1] and type(self.board.boardstate[current[0]][current[1]]) is Pawn
+
+    def _storeQuiet(self, player, move, depth, ply):
+        """Update the killers and history with a quiet move causing a beta cutoff"""
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+
+        current, target, promotion = move
+        table = self.history[player]
+        index = (current[0] * 8 + current[1]) * 64 + target[0] * 8 + target[1]
+        table[index] += depth * depth
+        if table[index] >= HISTORYLIMIT:
+            for i, score in enumerate(table):
+                table[i] = score >> 1
+
+    def _order(self, moves, ply, first=None):
+        """
+        Return the moves sorted by the order they should be searched in.
+
+        The move first is searched first. Captures are ordered by most
+        valuable victim and then least valuable attacker (MVV-LVA),
+        and promotions by the value of the new piece. These are
+        followed by the killer moves of the ply, and then the rest of
+        the moves by their history score.
+        """
+        boardstate = self.board.boardstate
+        killers = self.killers[ply]
+        history = self.history[self.board.toMove]
+        scores = {}
+        for move in moves:
+            current, target, promotion = move
+            if move == first:
+                score = CAPTURESCORE << 2
+            else:
+                piece = boardstate[current[0]][current[1]]
+                victim = boardstate[target[0]][target[1]]
+                if victim is None and type(piece) is Pawn and current[1] != target[1]:
+                    # En passant
+                    victim = piece
+                if victim is not None:
+                    score = CAPTURESCORE + PIECEVALUES[type(victim)] * 16 - PIECEVALUES[type(piece)] // 16
+                    if promotion is not None:
+                        score += PROMOTIONVALUES[promotion]
+                elif promotion is not None:
+                    score = CAPTURESCORE + PROMOTIONVALUES[promotion]
+                elif move == killers[0]:
+                    score = KILLERSCORE + 1
+                elif move == killers[1]:
+                    score = KILLERSCORE
+                else:
+                    score = history[(current[0] * 8 + current[1]) * 64 + target[0] * 8 + target[1]]
+            scores[move] = score
+        return sorted(moves, key=scores.__getitem__, reverse=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search a position for the best move.")
+    parser.add_argument("fen", nargs="?", default=None,
+                        help="position to search in FEN (default: starting position)")
+    parser.add_argument("-d", "--depth", type=int, default=MAXPLY,
+                        help="maximum depth in plies")
+    parser.add_argument("-t", "--movetime", type=float, default=None,
+                        help="time budget in seconds")
+    parser.add_argument("-n", "--nodes", type=int, default=None,
+                        help="node budget")
+    parser.add_argument("--hash", type=float, default=16,
+                        help="size of the transposition table in MB (default: 16)")
+    parser.add_argument("--syzygy", default=None,
+                        help="directory of Syzygy tablebase files to probe")
+    args = parser.parse_args(argv)
+    if args.depth == MAXPLY and args.movetime is None and args.nodes is None:
+        args.movetime = 5.0
+
+    board = Board() if args.fen is None else Board.fromFEN(args.fen)
+
+    def info(result):
+        print("depth {:>2} score {:>6} nodes {:>9} nps {:>7.0f} pv {}".format(
+            result.depth, result.score, result.nodes, result.nodes / max(result.time, 1e-9),
+            " ".join(toCoordinates(move) for move in result.pv)))
+
+    tablebase = None if args.syzygy is None else Tablebase(args.syzygy)
+    search = Search(board, TranspositionTable(args.hash), tablebase)
+    result = search.search(args.depth, args.movetime, args.nodes, info)
+    if tablebase is not None:
+        print("tbhits", search.tbHits)
+        tablebase.close()
+    print("bestmove", "(none)" if result.move is None else toCoordinates(result.move))
+    print("table", " ".join("{} {}".format(*stat) for stat in search.table.stats().items()),
+          "hashfull", search.table.hashfull())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
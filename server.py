@@ -0,0 +1,829 @@
+#! /usr/bin/env python3
+
+"""
+Asynchronous game server
+
+Hosts many live games in one process with asyncio. Clients connect over
+TCP or a Unix socket and send commands one per line. Every game is a
+GameSession with its position, clocks, two seats and any number of
+spectators, who are sent each move as it is made.
+
+Moves are parsed, validated and made in worker processes, each keeping
+the boards of a share of the games, so that validating a move doesn't
+take the interpreter lock from the event loop. Only the move and its
+result cross the pipe to the worker. A lock per game makes sure it has
+only one move in flight at a time. Reading, dispatching and writing the
+lines of all clients is still done by the one event loop, which bounds
+the moves per second a server process can acknowledge quickly. The
+workers are spawned, so a script starting a GameServer needs the usual
+if __name__ == "__main__" guard.
+
+Every client has a bounded queue of lines to send, written by a task of
+its own. A client that reads too slowly fills its queue and is
+disconnected, so a slow spectator can neither hold up a game nor make
+the server buffer without limit. Commands are paced too, as the next
+command of a client is only read once the last one is handled.
+
+The latency of the move acknowledgements is tracked and reported by
+the stats command, and a load test is built in, playing the games from
+a separate client process:
+
+    python -m chess.server --bench 2000
+
+Commands, with the lines sent back:
+
+    new white|black [<minutes>[+<increment>]]   created <id> <color>
+    join <id> white|black                       joined <id> <color> <fen>
+    watch <id>                                  watching <id> <fen>
+    move <id> <move>                            ok <id> <ply> <san> <clocks>
+    resign <id>
+    leave <id>                                  left <id>
+    stats                                       stats <name> <value> ...
+    quit
+
+A move is given in algebraic or coordinate notation. The other clients
+of the game are sent moved <id> <ply> <san> <clocks>, where the clocks
+are the remaining milliseconds of white and black, or - in untimed
+games. Once a game ends its clients are sent end <id> <result>
+<termination>. Errors are answered with error <message>.
+
+Run as a module to serve on a port or a Unix socket:
+
+    python -m chess.server --port 5555
+    python -m chess.server --unix /tmp/chess.sock
+"""
+
+import argparse
+import asyncio
+import itertools
+import multiprocessing
+import os
+import random
+import signal
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .Board import *
+from .pieces import *
+from .interpreter import coordReg, interpretCoordinates, interpretMove, moveToSAN, toCoordinates
+from .utilities import ChessError, CommandError, MoveError
+
+__all__ = ["RESIGNATION", "TIMEOUT", "GameSession", "GameServer"]
+
+
+# Terminations of games ended by the players rather than the position
+RESIGNATION = "resignation"
+TIMEOUT = "timeout"
+
+# Number of lines a client may have waiting to be sent
+QUEUESIZE = 256
+
+# Longest command line read, in bytes
+LINELIMIT = 1024
+
+# Number of move acknowledgement latencies kept for the stats
+LATENCIES = 10000
+
+# Number of connections waiting to be accepted
+BACKLOG = 1024
+
+# Position the games start from
+STARTFEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+COLORS = {"white": WHITE, "black": BLACK}
+COLORNAMES = {WHITE: "white", BLACK: "black"}
+
+
+def _play(board, mvStr):
+    """
+    Make the move given in algebraic or coordinate notation, and return
+    it in standard algebraic notation with the Outcome of the game, or
+    None. Run in a worker process.
+
+    Raises MoveError if the move is invalid.
+    """
+    if coordReg.match(mvStr):
+        move = interpretCoordinates(board, mvStr)
+    else:
+        move = interpretMove(board, mvStr)
+    san = moveToSAN(board, move)
+    board.push(move)
+    return san, board.outcome()
+
+
+def _work(connection):
+    """
+    Serve the requests of a _Worker until it sends None. A request is a
+    game id with a move to make, answered with the SAN, Outcome and FEN
+    after the move or the error raised, or with None to forget the game.
+    """
+    # Interrupts are handled by the server process, which stops the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    boards = {}
+    # Greet the server once started
+    connection.send((None, None))
+    while True:
+        request = connection.recv()
+        if request is None:
+            break
+        gameId, mvStr = request
+        if mvStr is None:
+            boards.pop(gameId, None)
+            continue
+        board = boards.get(gameId)
+        if board is None:
+            board = boards[gameId] = Board()
+        try:
+            san, outcome = _play(board, mvStr)
+        except Exception as e:
+            connection.send((None, e))
+        else:
+            connection.send(((san, outcome, board.toFEN()), None))
+    connection.close()
+
+
+def _percentile(values, fraction):
+    """Return the given fraction percentile of a sorted list, or 0 if empty"""
+    if not values:
+        return 0.0
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class _Client():
+    """
+    Properties:
+
+    name: address of the client, for messages
+
+    games: set of the GameSessions the client plays or watches
+    """
+
+    def __init__(self, writer, queueSize):
+        self.name = writer.get_extra_info("peername") or "local"
+        self.games = set()
+        self.closed = False
+        self._writer = writer
+        self._queue = asyncio.Queue(queueSize)
+        self._task = asyncio.get_running_loop().create_task(self._write())
+
+    def send(self, line):
+        """Queue a line to be sent, disconnecting the client if the queue is full"""
+        if self.closed:
+            return
+        try:
+            self._queue.put_nowait(line)
+        except asyncio.QueueFull:
+            self.close()
+
+    async def _write(self):
+        """Send the queued lines, waiting for the socket to drain between batches"""
+        writer = self._writer
+        try:
+            while True:
+                line = await self._queue.get()
+                writer.write(line.encode() + b"\n")
+                while not self._queue.empty():
+                    writer.write(self._queue.get_nowait().encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        """Disconnect the client, dropping any lines not yet sent"""
+        if self.closed:
+            return
+        self.closed = True
+        self._task.cancel()
+        self._writer.close()
+
+
+class _Worker():
+    """
+    Process making the moves of a share of the games. It keeps their
+    boards, and answers the requests sent over its pipe in order.
+    """
+
+    def __init__(self, context):
+        self._connection, child = context.Pipe()
+        self._process = context.Process(target=_work, args=(child,), daemon=True)
+        self._process.start()
+        child.close()
+        # Futures of the requests not yet answered, in order
+        self._pending = deque()
+        self._loop = None
+        self._started = None
+
+    def _attach(self):
+        """Start reading the answers of the worker on the running loop"""
+        if self._loop is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(self._connection.fileno(), self._receive)
+        # The greeting of the worker is the first answer
+        self._started = self._loop.create_future()
+        self._pending.append(self._started)
+
+    async def started(self):
+        """Wait until the worker process has started"""
+        self._attach()
+        await self._started
+
+    def play(self, gameId, mvStr):
+        """
+        Return a future of the move in standard algebraic notation, the
+        Outcome of the game or None, and the FEN after the move.
+        """
+        self._attach()
+        future = self._loop.create_future()
+        self._pending.append(future)
+        self._connection.send((gameId, mvStr))
+        return future
+
+    def drop(self, gameId):
+        """Let the worker forget the board of a game"""
+        self._connection.send((gameId, None))
+
+    def _receive(self):
+        """Resolve the futures of the answers received"""
+        try:
+            while self._connection.poll():
+                result, error = self._connection.recv()
+                future = self._pending.popleft()
+                if future.cancelled():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+        except (EOFError, OSError):
+            # The worker is gone, fail the moves waiting for it
+            self._loop.remove_reader(self._connection.fileno())
+            while self._pending:
+                future = self._pending.popleft()
+                if not future.cancelled():
+                    future.set_exception(EOFError("Move worker stopped"))
+
+    def close(self):
+        """Stop the worker process"""
+        if self._loop is not None and not self._connection.closed:
+            self._loop.remove_reader(self._connection.fileno())
+        try:
+            self._connection.send(None)
+        except OSError:
+            pass
+        self._process.join(1)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._connection.close()
+
+
+class GameSession():
+    """
+    Properties:
+
+    gameId: identifier of the game in the commands
+
+    fen: FEN of the current position. The board itself is kept by the
+        worker process of the game.
+
+    toMove: WHITE or BLACK, the player to move
+
+    players: dict indexed by WHITE/BLACK containing the client seated
+        as that player, or None
+
+    spectators: set of the clients watching the game
+
+    clocks: dict indexed by WHITE/BLACK containing the remaining time in
+        seconds, or None for an untimed game. The clock of the player to
+        move runs from turnStart.
+
+    increment: seconds added to the clock of a player after each move
+
+    turnStart: time.monotonic of the start of the current turn, or None
+        until both players are seated
+
+    outcome: Outcome of the game once it has ended, where the
+        termination may also be RESIGNATION or TIMEOUT, or None
+
+    lock: asyncio.Lock held while a move is made
+    """
+
+    def __init__(self, gameId, base=None, increment=0.0):
+        self.gameId = gameId
+        self.fen = STARTFEN
+        self.toMove = WHITE
+        self.players = {WHITE: None, BLACK: None}
+        self.spectators = set()
+        self.clocks = None if base is None else {WHITE: base, BLACK: base}
+        self.increment = increment
+        self.turnStart = None
+        self.outcome = None
+        self.lock = asyncio.Lock()
+        self.ply = 0
+        self._flagTimer = None
+        self._worker = None
+
+    def clients(self):
+        """Return a list of the connected players and spectators"""
+        return [client for client in self.players.values() if client is not None] + \
+            list(self.spectators)
+
+    def broadcast(self, line, exclude=None):
+        """Send a line to all players and spectators but exclude"""
+        for client in self.clients():
+            if client is not exclude:
+                client.send(line)
+
+    def remaining(self, color, now=None):
+        """Return the seconds left on the clock of the player, or None if untimed"""
+        if self.clocks is None:
+            return None
+        left = self.clocks[color]
+        if self.turnStart is not None and color is self.toMove and self.outcome is None:
+            left -= (time.monotonic() if now is None else now) - self.turnStart
+        return left
+
+    def formatClocks(self, now=None):
+        """Return the remaining milliseconds of white and black, as sent to clients"""
+        if self.clocks is None:
+            return "- -"
+        return "{} {}".format(*(max(int(self.remaining(color, now) * 1000), 0)
+                                for color in (WHITE, BLACK)))
+
+    def result(self):
+        """Return the result of the ended game, like 1-0"""
+        winner = self.outcome.winner
+        return "1/2-1/2" if winner is None else "1-0" if winner is WHITE else "0-1"
+
+
+class GameServer():
+    """
+    Properties:
+
+    games: dict mapping the id of each game in progress to its
+        GameSession
+
+    clients: set of the connected clients
+
+    moves: number of moves made since the server started
+
+    latencies: deque of the seconds from reading the latest move
+        commands to queueing their acknowledgements
+    """
+
+    def __init__(self, workers=4, queueSize=QUEUESIZE):
+        self.games = {}
+        self.clients = set()
+        self.moves = 0
+        self.latencies = deque(maxlen=LATENCIES)
+        self.queueSize = queueSize
+        # Spawned, so the workers don't inherit the sockets of the server
+        context = multiprocessing.get_context("spawn")
+        self._workers = [_Worker(context) for index in range(workers)]
+        self._ids = itertools.count(1)
+        self._servers = []
+        # Tasks reading the commands of the clients
+        self._tasks = set()
+
+    async def start(self, host="127.0.0.1", port=5555):
+        """Listen for clients on a TCP port, and return the asyncio server"""
+        await self._startWorkers()
+        server = await asyncio.start_server(self._serve, host, port, limit=LINELIMIT,
+                                            backlog=BACKLOG)
+        self._servers.append(server)
+        return server
+
+    async def startUnix(self, path):
+        """Listen for clients on a Unix socket, and return the asyncio server"""
+        await self._startWorkers()
+        server = await asyncio.start_unix_server(self._serve, path, limit=LINELIMIT,
+                                                 backlog=BACKLOG)
+        self._servers.append(server)
+        return server
+
+    async def _startWorkers(self):
+        """Wait until the worker processes have started"""
+        await asyncio.gather(*(worker.started() for worker in self._workers))
+
+    async def close(self):
+        """Stop listening, disconnect all clients and stop the workers"""
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers.clear()
+        for client in list(self.clients):
+            client.close()
+        # Closing the clients ends their commands, wait for the tasks to see it
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for session in self.games.values():
+            if session._flagTimer is not None:
+                session._flagTimer.cancel()
+        self.games.clear()
+        for worker in self._workers:
+            worker.close()
+
+    async def _serve(self, reader, writer):
+        """Read and handle the commands of a client until it disconnects"""
+        client = _Client(writer, self.queueSize)
+        self.clients.add(client)
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        try:
+            while not client.closed:
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, ValueError):
+                    # Line too long, or connection reset
+                    break
+                if not line:
+                    break
+                received = time.perf_counter()
+                try:
+                    if not await self.handle(client, line.decode(errors="replace").split(), received):
+                        break
+                except ChessError as e:
+                    client.send("error {}".format(str(e).replace("\n", " ")))
+        finally:
+            self._tasks.discard(task)
+            self.clients.discard(client)
+            for session in list(client.games):
+                self._leave(client, session)
+            client.close()
+
+    async def handle(self, client, tokens, received=None):
+        """
+        Handle a command split into tokens. Returns False once the
+        client quits, otherwise True.
+
+        Raises a ChessError if the command is invalid.
+        """
+        if not tokens:
+            return True
+        try:
+            return await self._dispatch(client, tokens, received)
+        except CommandError as e:
+            # Refer to the whole command in the message
+            raise CommandError(" ".join(tokens), e.reason) from None
+
+    async def _dispatch(self, client, tokens, received):
+        command, args = tokens[0].lower(), tokens[1:]
+
+        if command == "move" and len(args) == 2:
+            await self.move(client, self._session(args[0]), args[1], received)
+        elif command == "new" and 1 <= len(args) <= 2:
+            self.new(client, args[0], args[1] if len(args) == 2 else None)
+        elif command == "join" and len(args) == 2:
+            await self.join(client, self._session(args[0]), args[1])
+        elif command == "watch" and len(args) == 1:
+            await self.watch(client, self._session(args[0]))
+        elif command == "resign" and len(args) == 1:
+            await self.resign(client, self._session(args[0]))
+        elif command == "leave" and len(args) == 1:
+            session = self._session(args[0])
+            self._leave(client, session)
+            client.send("left {}".format(session.gameId))
+        elif command == "stats" and not args:
+            client.send("stats " + " ".join("{} {}".format(*stat) for stat in self.stats().items()))
+        elif command == "quit" and not args:
+            return False
+        else:
+            raise CommandError(" ".join(tokens), "Unknown command")
+        return True
+
+    def _session(self, gameId):
+        """Return the GameSession with the given id"""
+        session = self.games.get(gameId)
+        if session is None:
+            raise CommandError(gameId, "No such game")
+        return session
+
+    @staticmethod
+    def _color(name):
+        color = COLORS.get(name.lower())
+        if color is None:
+            raise CommandError(name, "Expected white or black")
+        return color
+
+    def new(self, client, colorName, timeControl=None):
+        """Start a game with the client seated as the given color, and return its GameSession"""
+        color = self._color(colorName)
+        base = None
+        increment = 0.0
+        if timeControl is not None:
+            minutes, _, seconds = timeControl.partition("+")
+            try:
+                base = float(minutes) * 60
+                increment = float(seconds or 0)
+            except ValueError:
+                raise CommandError(timeControl, "Expected a time control like 5+3")
+            if base <= 0 or increment < 0:
+                raise CommandError(timeControl, "Invalid time control")
+
+        number = next(self._ids)
+        session = GameSession(str(number), base, increment)
+        session._worker = self._workers[number % len(self._workers)]
+        self.games[session.gameId] = session
+        session.players[color] = client
+        client.games.add(session)
+        client.send("created {} {}".format(session.gameId, COLORNAMES[color]))
+        return session
+
+    async def join(self, client, session, colorName):
+        """Seat the client as the given color, taking over the seat if it was left"""
+        color = self._color(colorName)
+        async with session.lock:
+            if session.outcome is not None:
+                raise CommandError(session.gameId, "Game is over")
+            if session.players[color] is not None:
+                raise CommandError(session.gameId, "Seat is taken")
+            session.spectators.discard(client)
+            session.players[color] = client
+            client.games.add(session)
+            client.send("joined {} {} {}".format(session.gameId, COLORNAMES[color],
+                                                 session.fen))
+            if session.turnStart is None and None not in session.players.values():
+                # The clock of white starts once both players are seated
+                session.turnStart = time.monotonic()
+                self._setFlag(session)
+
+    async def watch(self, client, session):
+        """Add the client to the spectators of the game"""
+        if client in session.players.values():
+            raise CommandError(session.gameId, "Players can't watch their own game")
+        async with session.lock:
+            if session.outcome is not None:
+                raise CommandError(session.gameId, "Game is over")
+            session.spectators.add(client)
+            client.games.add(session)
+            client.send("watching {} {}".format(session.gameId, session.fen))
+
+    async def move(self, client, session, mvStr, received=None):
+        """
+        Make a move of the client in the game, and acknowledge it to the
+        client and send it to the others.
+
+        The clock of the player is stopped when the move is received,
+        not when it has been validated.
+        """
+        now = time.monotonic()
+        if received is None:
+            received = time.perf_counter()
+        async with session.lock:
+            if session.outcome is not None:
+                raise CommandError(session.gameId, "Game is over")
+            color = session.toMove
+            if session.players[color] is not client:
+                raise CommandError(session.gameId, "Not your turn")
+            if session.turnStart is None:
+                raise CommandError(session.gameId, "Waiting for an opponent")
+
+            if session.clocks is not None and session.remaining(color, now) <= 0:
+                # Too late, the flag is about to fall
+                self._end(session, Outcome(TIMEOUT, -color))
+                return
+
+            san, outcome, session.fen = await session._worker.play(session.gameId, mvStr)
+
+            session.ply += 1
+            session.toMove = -color
+            self.moves += 1
+            if session.clocks is not None:
+                session.clocks[color] -= now - session.turnStart - session.increment
+            session.turnStart = now
+
+            line = "{} {} {} {}".format(session.gameId, session.ply, san, session.formatClocks(now))
+            client.send("ok " + line)
+            self.latencies.append(time.perf_counter() - received)
+            session.broadcast("moved " + line, exclude=client)
+            if outcome is not None:
+                self._end(session, outcome)
+            else:
+                self._setFlag(session)
+
+    async def resign(self, client, session):
+        """End the game as lost by the player"""
+        async with session.lock:
+            if session.outcome is not None:
+                raise CommandError(session.gameId, "Game is over")
+            for color, player in session.players.items():
+                if player is client:
+                    self._end(session, Outcome(RESIGNATION, -color))
+                    return
+            raise CommandError(session.gameId, "Only players can resign")
+
+    def _setFlag(self, session):
+        """Schedule the loss on time of the player to move"""
+        if session._flagTimer is not None:
+            session._flagTimer.cancel()
+            session._flagTimer = None
+        if session.clocks is None:
+            return
+        loop = asyncio.get_running_loop()
+        delay = max(session.remaining(session.toMove), 0)
+        session._flagTimer = loop.call_later(delay, lambda: loop.create_task(
+            self._flag(session, session.ply)))
+
+    async def _flag(self, session, ply):
+        """End the game on time, unless a move was made since the flag was set"""
+        async with session.lock:
+            if session.outcome is None and session.ply == ply:
+                session.clocks[session.toMove] = session.remaining(session.toMove)
+                self._end(session, Outcome(TIMEOUT, -session.toMove))
+
+    def _end(self, session, outcome):
+        """End the game, and let its clients know"""
+        session.clocks = None if session.clocks is None else {
+            color: session.remaining(color) for color in (WHITE, BLACK)}
+        session.outcome = outcome
+        if session._flagTimer is not None:
+            session._flagTimer.cancel()
+            session._flagTimer = None
+        session.broadcast("end {} {} {}".format(session.gameId, session.result(), outcome.termination))
+        for client in session.clients():
+            client.games.discard(session)
+        self.games.pop(session.gameId, None)
+        session._worker.drop(session.gameId)
+
+    def _leave(self, client, session):
+        """
+        Remove the client from the game. The seat of a player is kept
+        open to join again and the clock keeps running, but a game
+        without any clients is abandoned.
+        """
+        client.games.discard(session)
+        session.spectators.discard(client)
+        for color, player in session.players.items():
+            if player is client:
+                session.players[color] = None
+        if not session.clients() and session.outcome is None:
+            if session._flagTimer is not None:
+                session._flagTimer.cancel()
+            self.games.pop(session.gameId, None)
+            session._worker.drop(session.gameId)
+
+    def stats(self):
+        """Return a dict of the server counters, with latencies in milliseconds"""
+        latencies = sorted(self.latencies)
+        return {
+            "games": len(self.games),
+            "clients": len(self.clients),
+            "moves": self.moves,
+            "p50": round(_percentile(latencies, 0.50) * 1000, 3),
+            "p99": round(_percentile(latencies, 0.99) * 1000, 3),
+        }
+
+
+def _benchGames(count, plies, seed):
+    """Return count lists of random legal moves in coordinate notation"""
+    rng = random.Random(seed)
+    games = []
+    for index in range(count):
+        board = Board()
+        moves = []
+        for ply in range(plies):
+            legal = list(board.legalMoves())
+            if not legal or board.outcome() is not None:
+                break
+            move = rng.choice(legal)
+            moves.append(toCoordinates(move))
+            board.push(move)
+        games.append(moves)
+    return games
+
+
+async def _benchPlayer(path, color, moves, think, latencies, created, connecting):
+    """
+    Play one side of a benchmark game, measuring the time to each
+    acknowledgement. White creates the game and sets the created
+    future to its id, and black joins it.
+    """
+    rng = random.Random()
+    async with connecting:
+        reader, writer = await asyncio.open_unix_connection(path)
+        if color is WHITE:
+            writer.write(b"new white\n")
+            gameId = (await reader.readline()).split()[1].decode()
+            created.set_result(gameId)
+        else:
+            gameId = await created
+            writer.write("join {} black\n".format(gameId).encode())
+            await reader.readline()
+
+    ply = 0
+    while ply < len(moves):
+        if (ply % 2 == 0) == (color is WHITE):
+            await asyncio.sleep(rng.uniform(0, 2 * think))
+            sent = time.perf_counter()
+            writer.write("move {} {}\n".format(gameId, moves[ply]).encode())
+            line = await reader.readline()
+            if not line.startswith(b"ok"):
+                raise CommandError(line.decode().strip(), "Benchmark move rejected")
+            latencies.append(time.perf_counter() - sent)
+        else:
+            line = await reader.readline()
+            if not line.startswith(b"moved"):
+                raise CommandError(line.decode().strip(), "Benchmark expected a move")
+        ply += 1
+    writer.close()
+
+
+async def _benchClients(path, games, think):
+    """
+    Play the games through the server at the Unix socket, and return
+    the sorted latencies of the acknowledgements and the seconds taken.
+    """
+    loop = asyncio.get_running_loop()
+    latencies = []
+    # Connect a few clients at a time, not to overrun the backlog
+    connecting = asyncio.Semaphore(BACKLOG // 4)
+    tasks = []
+    began = time.perf_counter()
+    for moves in games:
+        created = loop.create_future()
+        for color in (WHITE, BLACK):
+            tasks.append(loop.create_task(_benchPlayer(path, color, moves, think, latencies, created,
+                                                       connecting)))
+    await asyncio.gather(*tasks)
+    latencies.sort()
+    return latencies, time.perf_counter() - began
+
+
+def _runBenchClients(path, games, think):
+    """Run _benchClients in a process of its own"""
+    return asyncio.run(_benchClients(path, games, think))
+
+
+async def _bench(count, plies, think, workers):
+    """
+    Play count games at once through a Unix socket, with players taking
+    think seconds per move on average, and print the latencies. The
+    players are run in a separate process, so the event loop of the
+    server is only busy with the server.
+    """
+    print("Generating {} games of {} plies".format(count, plies))
+    games = _benchGames(count, plies, 0)
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "chess.sock")
+    server = GameServer(workers)
+    await server.startUnix(path)
+
+    print("Playing {} games on {} connections".format(count, 2 * count))
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        latencies, elapsed = await loop.run_in_executor(executor, _runBenchClients, path, games,
+                                                        think)
+    stats = server.stats()
+    await server.close()
+    os.remove(path)
+    os.rmdir(directory)
+
+    print("{} moves in {:.2f}s, {:.0f} moves/s".format(server.moves, elapsed, server.moves / elapsed))
+    print("client ack ms p50 {:.3f} p99 {:.3f}".format(_percentile(latencies, 0.50) * 1000,
+                                                      _percentile(latencies, 0.99) * 1000))
+    print("server ack ms p50 {} p99 {}".format(stats["p50"], stats["p99"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve live games to many clients.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=5555, help="TCP port to listen on (default: 5555)")
+    parser.add_argument("--unix", default=None, help="listen on this Unix socket instead of a port")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="processes validating moves (default: 4)")
+    parser.add_argument("--bench", type=int, default=None, metavar="GAMES",
+                        help="play this many games at once against the server and report latencies")
+    parser.add_argument("--plies", type=int, default=40,
+                        help="length of the benchmark games (default: 40)")
+    parser.add_argument("--think", type=float, default=1.0,
+                        help="average seconds per benchmark move (default: 1.0)")
+    args = parser.parse_args(argv)
+
+    if args.bench is not None:
+        asyncio.run(_bench(args.bench, args.plies, args.think, args.workers))
+        return 0
+
+    async def serve():
+        server = GameServer(args.workers)
+        if args.unix is not None:
+            listener = await server.startUnix(args.unix)
+        else:
+            listener = await server.start(args.host, args.port)
+        try:
+            await listener.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
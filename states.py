@@ -2,7 +2,7 @@
 
 from .pieces import *
 
-__all__ = ["STATES"]
+__all__ = ["STATES", "fromDiagram"]
 
 
 def assignPos(boardstate):
@@ -13,6 +13,49 @@ def assignPos(boardstate):
                 square.position = (r, f)
 
 
+def fromDiagram(diagram, castling=""):
+    """
+    Return a boardstate from a diagram of the board.
+
+    The diagram is a list of eight strings, one per rank starting
+    from rank 8, with one character per file. Pieces are given by
+    their letter (KQRBNP), in uppercase for white and lowercase for
+    black. Any other character is an empty square.
+
+    Pawns off their starting rank, and kings and rooks without a
+    castling right in castling (a subset of "KQkq"), are marked as
+    having moved.
+    """
+    letters = {"K": King, "Q": Queen, "R": Rook, "B": Bishop, "N": Knight, "P": Pawn}
+    boardstate = []
+    for r, row in enumerate(reversed(diagram)):
+        rank = []
+        for f, letter in enumerate(row):
+            pieceType = letters.get(letter.upper())
+            if pieceType is None:
+                rank.append(None)
+                continue
+
+            color = WHITE if letter.isupper() else BLACK
+            if pieceType is Pawn:
+                piece = Pawn(color, hasMoved=r != (1 if color is WHITE else 6))
+            elif pieceType is King or pieceType is Rook:
+                piece = pieceType(color, hasMoved=True)
+            else:
+                piece = pieceType(color)
+            rank.append(piece)
+        boardstate.append(rank)
+
+    # Restore the pieces involved in each castling right
+    for right, (r, f) in (("K", (0, 7)), ("Q", (0, 0)), ("k", (7, 7)), ("q", (7, 0))):
+        if right in castling:
+            boardstate[r][4].hasMoved = False
+            boardstate[r][f].hasMoved = False
+
+    assignPos(boardstate)
+    return boardstate
+
+
 emptyRank = [None] * 8
 
 STATES = {}
@@ -44,3 +87,60 @@ assignPos(empty)
 STATES["default"] = (default, WHITE)
 STATES["empty"] = (empty, WHITE)
 
+# Positions with published perft results, used by the perft module
+STATES["kiwipete"] = (fromDiagram([
+        "r...k..r",
+        "p.ppqpb.",
+        "bn..pnp.",
+        "...PN...",
+        ".p..P...",
+        "..N..Q.p",
+        "PPPBBPPP",
+        "R...K..R"
+], "KQkq"), WHITE)
+
+# En passant captures exposing the king along a rank
+STATES["perft3"] = (fromDiagram([
+        "........",
+        "..p.....",
+        "...p....",
+        "KP.....r",
+        ".R...p.k",
+        "........",
+        "....P.P.",
+        "........"
+]), WHITE)
+
+# Promotions, with and without capture
+STATES["perft4"] = (fromDiagram([
+        "r...k..r",
+        "Pppp.ppp",
+        ".b...nbN",
+        "nP......",
+        "BBP.P...",
+        "q....N..",
+        "Pp.P..PP",
+        "R..Q.RK."
+], "kq"), WHITE)
+
+STATES["perft5"] = (fromDiagram([
+        "rnbq.k.r",
+        "pp.Pbppp",
+        "..p.....",
+        "........",
+        "..B.....",
+        "........",
+        "PPP.NnPP",
+        "RNBQK..R"
+], "KQ"), WHITE)
+
+STATES["perft6"] = (fromDiagram([
+        "r....rk.",
+        ".pp.qppp",
+        "p.np.n..",
+        "..b.p.B.",
+        "..B.P.b.",
+        "P.NP.N..",
+        ".PP.QPPP",
+        "R....RK."
+]), WHITE)
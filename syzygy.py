@@ -0,0 +1,1450 @@
+#! /usr/bin/env python3
+
+"""
+Syzygy endgame tablebases
+
+Probes Syzygy tablebase files for the exact result of positions with
+few pieces left. WDL tables (.rtbw) give whether the player to move
+wins, draws or loses, taking the fifty move rule into account, and DTZ
+tables (.rtbz) give the number of plies to the next capture or pawn
+move on the way to the result.
+
+The table files are memory mapped when first probed, so opening a
+directory of tables costs nothing and processes probing the same tables
+share them in the page cache. Values are stored compressed in small
+blocks. A probe finds the block holding the position and decompresses
+it whole into a cache of recently used blocks, so later probes of
+positions in the same block are a lookup.
+
+Positions with castling rights are not in the tables. En passant
+captures and other captures are resolved by probing the positions after
+them, as the tables leave them out.
+
+Ported from the probing code of python-chess, which follows the
+original probing code by Ronald de Man.
+
+Run as a module to probe a position given in FEN:
+
+    python -m chess.syzygy /path/to/syzygy "<fen>"
+"""
+
+import argparse
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+from collections import OrderedDict
+
+from .Board import Board, LIVING
+from .pieces import *
+from .bitboards import *
+from .utilities import *
+
+__all__ = ["TBPIECES", "Tablebase"]
+
+
+UINT64_BE = struct.Struct(">Q")
+UINT32 = struct.Struct("<I")
+UINT32_BE = struct.Struct(">I")
+UINT16 = struct.Struct("<H")
+
+WDL_MAGIC = b"\x71\xe8\x23\x5d"
+DTZ_MAGIC = b"\xd7\x66\x0c\xa5"
+WDL_SUFFIX = ".rtbw"
+DTZ_SUFFIX = ".rtbz"
+
+# Largest number of pieces in a table
+TBPIECES = 7
+
+# Default number of decompressed blocks kept, and of table files kept
+# open at the same time
+BLOCKCACHE = 4096
+MAXOPEN = 128
+
+# Piece types by the piece codes of the table files, where the code of
+# a black piece has the bit 8 set
+PIECECODES = (None, Pawn, Knight, Bishop, Rook, Queen, King)
+
+# Piece letters of table names, in order
+PCHR = "KQRBNP"
+PIECELIST = (King, Queen, Rook, Bishop, Knight, Pawn)
+
+# Tables for the index of a position in a table. Positions are mirrored
+# so the first pieces stand in the lower left triangle of the board, or
+# so the leading pawn stands on the files a to d
+TRIANGLE = [
+    6, 0, 1, 2, 2, 1, 0, 6,
+    0, 7, 3, 4, 4, 3, 7, 0,
+    1, 3, 8, 5, 5, 8, 3, 1,
+    2, 4, 5, 9, 9, 5, 4, 2,
+    2, 4, 5, 9, 9, 5, 4, 2,
+    1, 3, 8, 5, 5, 8, 3, 1,
+    0, 7, 3, 4, 4, 3, 7, 0,
+    6, 0, 1, 2, 2, 1, 0, 6,
+]
+
+LOWER = [
+    28,  0,  1,  2,  3,  4,  5,  6,
+     0, 29,  7,  8,  9, 10, 11, 12,
+     1,  7, 30, 13, 14, 15, 16, 17,
+     2,  8, 13, 31, 18, 19, 20, 21,
+     3,  9, 14, 18, 32, 22, 23, 24,
+     4, 10, 15, 19, 22, 33, 25, 26,
+     5, 11, 16, 20, 23, 25, 34, 27,
+     6, 12, 17, 21, 24, 26, 27, 35,
+]
+
+DIAG = [
+     0,  0,  0,  0,  0,  0,  0,  8,
+     0,  1,  0,  0,  0,  0,  9,  0,
+     0,  0,  2,  0,  0, 10,  0,  0,
+     0,  0,  0,  3, 11,  0,  0,  0,
+     0,  0,  0, 12,  4,  0,  0,  0,
+     0,  0, 13,  0,  0,  5,  0,  0,
+     0, 14,  0,  0,  0,  0,  6,  0,
+    15,  0,  0,  0,  0,  0,  0,  7,
+]
+
+FLAP = [
+    0,  0,  0,  0,  0,  0,  0, 0,
+    0,  6, 12, 18, 18, 12,  6, 0,
+    1,  7, 13, 19, 19, 13,  7, 1,
+    2,  8, 14, 20, 20, 14,  8, 2,
+    3,  9, 15, 21, 21, 15,  9, 3,
+    4, 10, 16, 22, 22, 16, 10, 4,
+    5, 11, 17, 23, 23, 17, 11, 5,
+    0,  0,  0,  0,  0,  0,  0, 0,
+]
+
+PTWIST = [
+     0,  0,  0,  0,  0,  0,  0,  0,
+    47, 35, 23, 11, 10, 22, 34, 46,
+    45, 33, 21,  9,  8, 20, 32, 44,
+    43, 31, 19,  7,  6, 18, 30, 42,
+    41, 29, 17,  5,  4, 16, 28, 40,
+    39, 27, 15,  3,  2, 14, 26, 38,
+    37, 25, 13,  1,  0, 12, 24, 36,
+     0,  0,  0,  0,  0,  0,  0,  0,
+]
+
+INVFLAP = [
+     8, 16, 24, 32, 40, 48,
+     9, 17, 25, 33, 41, 49,
+    10, 18, 26, 34, 42, 50,
+    11, 19, 27, 35, 43, 51,
+]
+
+FILE_TO_FILE = [0, 1, 2, 3, 3, 2, 1, 0]
+
+KK_IDX = [[
+     -1,  -1,  -1,   0,   1,   2,   3,   4,
+     -1,  -1,  -1,   5,   6,   7,   8,   9,
+     10,  11,  12,  13,  14,  15,  16,  17,
+     18,  19,  20,  21,  22,  23,  24,  25,
+     26,  27,  28,  29,  30,  31,  32,  33,
+     34,  35,  36,  37,  38,  39,  40,  41,
+     42,  43,  44,  45,  46,  47,  48,  49,
+     50,  51,  52,  53,  54,  55,  56,  57,
+], [
+     58,  -1,  -1,  -1,  59,  60,  61,  62,
+     63,  -1,  -1,  -1,  64,  65,  66,  67,
+     68,  69,  70,  71,  72,  73,  74,  75,
+     76,  77,  78,  79,  80,  81,  82,  83,
+     84,  85,  86,  87,  88,  89,  90,  91,
+     92,  93,  94,  95,  96,  97,  98,  99,
+    100, 101, 102, 103, 104, 105, 106, 107,
+    108, 109, 110, 111, 112, 113, 114, 115,
+], [
+    116, 117,  -1,  -1,  -1, 118, 119, 120,
+    121, 122,  -1,  -1,  -1, 123, 124, 125,
+    126, 127, 128, 129, 130, 131, 132, 133,
+    134, 135, 136, 137, 138, 139, 140, 141,
+    142, 143, 144, 145, 146, 147, 148, 149,
+    150, 151, 152, 153, 154, 155, 156, 157,
+    158, 159, 160, 161, 162, 163, 164, 165,
+    166, 167, 168, 169, 170, 171, 172, 173,
+], [
+    174,  -1,  -1,  -1, 175, 176, 177, 178,
+    179,  -1,  -1,  -1, 180, 181, 182, 183,
+    184,  -1,  -1,  -1, 185, 186, 187, 188,
+    189, 190, 191, 192, 193, 194, 195, 196,
+    197, 198, 199, 200, 201, 202, 203, 204,
+    205, 206, 207, 208, 209, 210, 211, 212,
+    213, 214, 215, 216, 217, 218, 219, 220,
+    221, 222, 223, 224, 225, 226, 227, 228,
+], [
+    229, 230,  -1,  -1,  -1, 231, 232, 233,
+    234, 235,  -1,  -1,  -1, 236, 237, 238,
+    239, 240,  -1,  -1,  -1, 241, 242, 243,
+    244, 245, 246, 247, 248, 249, 250, 251,
+    252, 253, 254, 255, 256, 257, 258, 259,
+    260, 261, 262, 263, 264, 265, 266, 267,
+    268, 269, 270, 271, 272, 273, 274, 275,
+    276, 277, 278, 279, 280, 281, 282, 283,
+], [
+    284, 285, 286, 287, 288, 289, 290, 291,
+    292, 293,  -1,  -1,  -1, 294, 295, 296,
+    297, 298,  -1,  -1,  -1, 299, 300, 301,
+    302, 303,  -1,  -1,  -1, 304, 305, 306,
+    307, 308, 309, 310, 311, 312, 313, 314,
+    315, 316, 317, 318, 319, 320, 321, 322,
+    323, 324, 325, 326, 327, 328, 329, 330,
+    331, 332, 333, 334, 335, 336, 337, 338,
+], [
+     -1,  -1, 339, 340, 341, 342, 343, 344,
+     -1,  -1, 345, 346, 347, 348, 349, 350,
+     -1,  -1, 441, 351, 352, 353, 354, 355,
+     -1,  -1,  -1, 442, 356, 357, 358, 359,
+     -1,  -1,  -1,  -1, 443, 360, 361, 362,
+     -1,  -1,  -1,  -1,  -1, 444, 363, 364,
+     -1,  -1,  -1,  -1,  -1,  -1, 445, 365,
+     -1,  -1,  -1,  -1,  -1,  -1,  -1, 446,
+], [
+     -1,  -1,  -1, 366, 367, 368, 369, 370,
+     -1,  -1,  -1, 371, 372, 373, 374, 375,
+     -1,  -1,  -1, 376, 377, 378, 379, 380,
+     -1,  -1,  -1, 447, 381, 382, 383, 384,
+     -1,  -1,  -1,  -1, 448, 385, 386, 387,
+     -1,  -1,  -1,  -1,  -1, 449, 388, 389,
+     -1,  -1,  -1,  -1,  -1,  -1, 450, 390,
+     -1,  -1,  -1,  -1,  -1,  -1,  -1, 451,
+], [
+    452, 391, 392, 393, 394, 395, 396, 397,
+     -1,  -1,  -1,  -1, 398, 399, 400, 401,
+     -1,  -1,  -1,  -1, 402, 403, 404, 405,
+     -1,  -1,  -1,  -1, 406, 407, 408, 409,
+     -1,  -1,  -1,  -1, 453, 410, 411, 412,
+     -1,  -1,  -1,  -1,  -1, 454, 413, 414,
+     -1,  -1,  -1,  -1,  -1,  -1, 455, 415,
+     -1,  -1,  -1,  -1,  -1,  -1,  -1, 456,
+], [
+    457, 416, 417, 418, 419, 420, 421, 422,
+     -1, 458, 423, 424, 425, 426, 427, 428,
+     -1,  -1,  -1,  -1,  -1, 429, 430, 431,
+     -1,  -1,  -1,  -1,  -1, 432, 433, 434,
+     -1,  -1,  -1,  -1,  -1, 435, 436, 437,
+     -1,  -1,  -1,  -1,  -1, 459, 438, 439,
+     -1,  -1,  -1,  -1,  -1,  -1, 460, 440,
+     -1,  -1,  -1,  -1,  -1,  -1,  -1, 461,
+]]
+
+
+def offdiag(square):
+    return (square >> 3) - (square & 7)
+
+
+def flipdiag(square):
+    return ((square >> 3) | (square << 3)) & 63
+
+
+def binom(x, y):
+    if y < 0 or y > x:
+        return 0
+    return math.comb(x, y)
+
+
+PAWNIDX = [[0] * 24 for i in range(5)]
+PFACTOR = [[0] * 4 for i in range(5)]
+
+for i in range(5):
+    for f in range(4):
+        s = 0
+        for j in range(6 * f, 6 * f + 6):
+            PAWNIDX[i][j] = s
+            s += 1 if i == 0 else binom(PTWIST[INVFLAP[j]], i)
+        PFACTOR[i][f] = s
+
+del i, j, f, s
+
+WDL_TO_MAP = [1, 3, 0, 2, 0]
+PA_FLAGS = [8, 0, 0, 0, 4]
+WDL_TO_DTZ = [-1, -101, 0, 101, 1]
+
+TABLENAME = re.compile(r"^K[KQRBNP]*vK[KQRBNP]*$")
+
+
+def normalizeTablename(name, mirror=False):
+    """
+    Return the name of the table holding the given material, with the
+    stronger side first, or the weaker side first if mirror is True.
+    """
+    white, black = name.split("v", 1)
+    white = "".join(sorted(white, key=PCHR.index))
+    black = "".join(sorted(black, key=PCHR.index))
+    if mirror ^ ((len(white), [PCHR.index(c) for c in black]) <
+                 (len(black), [PCHR.index(c) for c in white])):
+        return black + "v" + white
+    return white + "v" + black
+
+
+def isTablename(name):
+    """Return True if name is the name of a table, like KRPvKR"""
+    return (len(name) <= TBPIECES + 1 and name != "KvK" and TABLENAME.match(name) is not None
+            and normalizeTablename(name) == name)
+
+
+def materialKey(board, mirror=False):
+    """Return the material of the board as a table name, like KRPvKR"""
+    first, second = (BLACK, WHITE) if mirror else (WHITE, BLACK)
+    return "v".join("".join(letter * popCount(board.bitboards[color][pieceType])
+                            for letter, pieceType in zip(PCHR, PIECELIST))
+                    for color in (first, second))
+
+
+def pieceKey(pieces, mirror=False):
+    """Return the table name of a list of piece codes"""
+    first, second = (8, 0) if mirror else (0, 8)
+    return "v".join("".join(letter * pieces.count(code ^ color)
+                            for letter, code in zip(PCHR, (6, 5, 4, 3, 2, 1)))
+                    for color in (first, second))
+
+
+def subfactor(k, n):
+    f = n
+    l = 1
+    for i in range(1, k):
+        f *= n - i
+        l *= i + 1
+    return f // l
+
+
+def dtzBeforeZeroing(wdl):
+    return ((wdl > 0) - (wdl < 0)) * (1 if abs(wdl) == 2 else 101)
+
+
+def _squares(board, code, cmirror):
+    """Return the squares of the pieces of the given code, lowest first"""
+    color = WHITE if not (code ^ cmirror) & 8 else BLACK
+    return iterBits(board.bitboards[color][PIECECODES[code & 7]])
+
+
+class PairsData():
+    """Layout of a compressed table of values"""
+    __slots__ = ("indextable", "sizetable", "data", "offset", "symlen", "sympat",
+                 "blocksize", "idxbits", "minLen", "base")
+
+
+class _PawnFile():
+    """Pieces, encoding and compressed values of the positions with the leading pawn on a file"""
+    __slots__ = ("precomp", "factor", "pieces", "norm")
+
+    def __init__(self):
+        self.precomp = {}
+        self.factor = {}
+        self.pieces = {}
+        self.norm = {}
+
+
+class _BlockCache():
+    """
+    Least recently used cache of decompressed blocks, shared by the
+    tables of a Tablebase.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            values = self._blocks.get(key)
+            if values is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._blocks.move_to_end(key)
+            return values
+
+    def put(self, key, values):
+        with self._lock:
+            self._blocks[key] = values
+            while len(self._blocks) > self.size:
+                self._blocks.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+
+
+class Table():
+    """
+    Properties:
+
+    path: path of the table file
+
+    key, mirroredKey: names of the material of the table, with the
+        stronger or the weaker side first
+
+    symmetric: True if both sides have the same material
+
+    num: number of pieces
+
+    hasPawns: True if there are pawns in the table
+    """
+
+    MAGIC = None
+
+    def __init__(self, path, cache):
+        self.path = path
+        self._cache = cache
+        self._data = None
+        self._initialized = False
+        self._lock = threading.RLock()
+
+        tablename = os.path.splitext(os.path.basename(path))[0]
+        self.key = normalizeTablename(tablename)
+        self.mirroredKey = normalizeTablename(tablename, mirror=True)
+        self.symmetric = self.key == self.mirroredKey
+        # Leave out the v to count the pieces
+        self.num = len(tablename) - 1
+        self.hasPawns = "P" in tablename
+
+        blackPart, whitePart = tablename.split("v")
+        if self.hasPawns:
+            self.pawns = [whitePart.count("P"), blackPart.count("P")]
+            if self.pawns[1] > 0 and (self.pawns[0] == 0 or self.pawns[1] < self.pawns[0]):
+                self.pawns[0], self.pawns[1] = self.pawns[1], self.pawns[0]
+        else:
+            unique = 0
+            for letter in PCHR:
+                if blackPart.count(letter) == 1:
+                    unique += 1
+                if whitePart.count(letter) == 1:
+                    unique += 1
+            self.encType = 0 if unique >= 3 else 2
+
+    def isOpen(self):
+        """Return True if the table file is mapped"""
+        return self._data is not None
+
+    def open(self):
+        """Map the table file, if not mapped already"""
+        with self._lock:
+            if self._data is not None:
+                return
+            with open(self.path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(data) % 64 != 16 or data[:4] != self.MAGIC:
+                data.close()
+                raise TablebaseError(self.path, "Not a valid Syzygy table file")
+            if hasattr(mmap, "MADV_RANDOM"):
+                data.madvise(mmap.MADV_RANDOM)
+            self._data = data
+            if not self._initialized:
+                self._initialize()
+                self._initialized = True
+
+    def close(self):
+        """Unmap the table file"""
+        with self._lock:
+            if self._data is not None:
+                self._data.close()
+                self._data = None
+
+    def _initialize(self):
+        """Read the layout of the table"""
+        raise NotImplementedError
+
+    def _readUint64BE(self, pointer):
+        return UINT64_BE.unpack_from(self._data, pointer)[0]
+
+    def _readUint32(self, pointer):
+        return UINT32.unpack_from(self._data, pointer)[0]
+
+    def _readUint32BE(self, pointer):
+        data = self._data
+        if pointer + 4 > len(data):
+            # Past the end of the file, which decoding may read ahead into
+            return int.from_bytes(data[pointer:pointer + 4].ljust(4, b"\0"), "big")
+        return UINT32_BE.unpack_from(data, pointer)[0]
+
+    def _readUint16(self, pointer):
+        return UINT16.unpack_from(self._data, pointer)[0]
+
+    def _setupPairs(self, pointer, tbSize, sizeIndex, wdl):
+        """
+        Read the compression data of a table of values at pointer.
+
+        Sets _flags to the flags of the table and _next to the pointer
+        after the compression data.
+        """
+        data = self._data
+        d = PairsData()
+
+        self._flags = data[pointer]
+        if data[pointer] & 0x80:
+            # Every position has the same value
+            d.idxbits = 0
+            d.minLen = data[pointer + 1] if wdl else 0
+            self._next = pointer + 2
+            self.size[sizeIndex + 0] = 0
+            self.size[sizeIndex + 1] = 0
+            self.size[sizeIndex + 2] = 0
+            return d
+
+        d.blocksize = data[pointer + 1]
+        d.idxbits = data[pointer + 2]
+
+        realNumBlocks = self._readUint32(pointer + 4)
+        numBlocks = realNumBlocks + data[pointer + 3]
+        maxLen = data[pointer + 8]
+        minLen = data[pointer + 9]
+        h = maxLen - minLen + 1
+        numSyms = self._readUint16(pointer + 10 + 2 * h)
+
+        d.offset = pointer + 10
+        d.symlen = [0] * (h * 8 + numSyms)
+        d.sympat = pointer + 12 + 2 * h
+        d.minLen = minLen
+
+        self._next = pointer + 12 + 2 * h + 3 * numSyms + (numSyms & 1)
+
+        numIndices = (tbSize + (1 << d.idxbits) - 1) >> d.idxbits
+        self.size[sizeIndex + 0] = 6 * numIndices
+        self.size[sizeIndex + 1] = 2 * numBlocks
+        self.size[sizeIndex + 2] = (1 << d.blocksize) * realNumBlocks
+
+        done = [False] * numSyms
+        for sym in range(numSyms):
+            if not done[sym]:
+                self._calcSymlen(d, sym, done)
+
+        d.base = [0] * h
+        for i in range(h - 2, -1, -1):
+            d.base[i] = (d.base[i + 1] + self._readUint16(d.offset + i * 2) -
+                         self._readUint16(d.offset + i * 2 + 2)) // 2
+        for i in range(h):
+            d.base[i] <<= 64 - (minLen + i)
+
+        d.offset -= 2 * d.minLen
+        return d
+
+    def _calcSymlen(self, d, sym, done):
+        """Set the number of values less one that the symbol expands to"""
+        data = self._data
+        w = d.sympat + 3 * sym
+        s2 = (data[w + 2] << 4) | (data[w + 1] >> 4)
+        if s2 == 0x0fff:
+            d.symlen[sym] = 0
+        else:
+            s1 = ((data[w + 1] & 0xf) << 8) | data[w]
+            if not done[s1]:
+                self._calcSymlen(d, s1, done)
+            if not done[s2]:
+                self._calcSymlen(d, s2, done)
+            d.symlen[sym] = d.symlen[s1] + d.symlen[s2] + 1
+        done[sym] = True
+
+    def _setNormPiece(self, norm, pieces):
+        norm[0] = 3 if self.encType == 0 else 2
+        i = norm[0]
+        while i < self.num:
+            j = i
+            while j < self.num and pieces[j] == pieces[i]:
+                norm[i] += 1
+                j += 1
+            i += norm[i]
+
+    def _setNormPawn(self, norm, pieces):
+        norm[0] = self.pawns[0]
+        if self.pawns[1]:
+            norm[self.pawns[0]] = self.pawns[1]
+        i = self.pawns[0] + self.pawns[1]
+        while i < self.num:
+            j = i
+            while j < self.num and pieces[j] == pieces[i]:
+                norm[i] += 1
+                j += 1
+            i += norm[i]
+
+    def _calcFactorsPiece(self, factor, order, norm):
+        pivots = (31332, 28056, 462)
+        n = 64 - norm[0]
+        f = 1
+        i = norm[0]
+        k = 0
+        while i < self.num or k == order:
+            if k == order:
+                factor[0] = f
+                f *= pivots[self.encType]
+            else:
+                factor[i] = f
+                f *= subfactor(norm[i], n)
+                n -= norm[i]
+                i += norm[i]
+            k += 1
+        return f
+
+    def _calcFactorsPawn(self, factor, order, order2, norm, f):
+        i = norm[0]
+        if order2 < 0x0f:
+            i += norm[i]
+        n = 64 - i
+
+        fac = 1
+        k = 0
+        while i < self.num or k == order or k == order2:
+            if k == order:
+                factor[0] = fac
+                fac *= PFACTOR[norm[0] - 1][f]
+            elif k == order2:
+                factor[norm[0]] = fac
+                fac *= subfactor(norm[norm[0]], 48 - norm[0])
+            else:
+                factor[i] = fac
+                fac *= subfactor(norm[i], n)
+                n -= norm[i]
+                i += norm[i]
+            k += 1
+        return fac
+
+    def _pawnFile(self, pos):
+        """Move the leading pawn to the front, and return its file folded to 0-3"""
+        for i in range(1, self.pawns[0]):
+            if FLAP[pos[0]] > FLAP[pos[i]]:
+                pos[0], pos[i] = pos[i], pos[0]
+        return FILE_TO_FILE[pos[0] & 0x07]
+
+    def _encodePiece(self, norm, pos, factor):
+        """Return the index of a position without pawns, given the squares of the pieces"""
+        n = self.num
+
+        if pos[0] & 0x04:
+            for i in range(n):
+                pos[i] ^= 0x07
+        if pos[0] & 0x20:
+            for i in range(n):
+                pos[i] ^= 0x38
+
+        for i in range(n):
+            if offdiag(pos[i]):
+                break
+        if i < (3 if self.encType == 0 else 2) and offdiag(pos[i]) > 0:
+            for i in range(n):
+                pos[i] = flipdiag(pos[i])
+
+        if self.encType == 0:
+            # Three unique pieces
+            i = int(pos[1] > pos[0])
+            j = int(pos[2] > pos[0]) + int(pos[2] > pos[1])
+
+            if offdiag(pos[0]):
+                idx = TRIANGLE[pos[0]] * 63 * 62 + (pos[1] - i) * 62 + (pos[2] - j)
+            elif offdiag(pos[1]):
+                idx = 6 * 63 * 62 + DIAG[pos[0]] * 28 * 62 + LOWER[pos[1]] * 62 + pos[2] - j
+            elif offdiag(pos[2]):
+                idx = (6 * 63 * 62 + 4 * 28 * 62 + DIAG[pos[0]] * 7 * 28 +
+                       (DIAG[pos[1]] - i) * 28 + LOWER[pos[2]])
+            else:
+                idx = (6 * 63 * 62 + 4 * 28 * 62 + 4 * 7 * 28 + DIAG[pos[0]] * 7 * 6 +
+                       (DIAG[pos[1]] - i) * 6 + (DIAG[pos[2]] - j))
+            i = 3
+        else:
+            # Only the two kings are unique
+            idx = KK_IDX[TRIANGLE[pos[0]]][pos[1]]
+            i = 2
+
+        idx *= factor[0]
+        return idx + self._encodeGroups(norm, pos, factor, i, n)
+
+    def _encodePawn(self, norm, pos, factor):
+        """Return the index of a position with pawns, given the squares of the pieces"""
+        n = self.num
+
+        if pos[0] & 0x04:
+            for i in range(n):
+                pos[i] ^= 0x07
+
+        for i in range(1, self.pawns[0]):
+            for j in range(i + 1, self.pawns[0]):
+                if PTWIST[pos[i]] < PTWIST[pos[j]]:
+                    pos[i], pos[j] = pos[j], pos[i]
+
+        t = self.pawns[0] - 1
+        idx = PAWNIDX[t][FLAP[pos[0]]]
+        for i in range(t, 0, -1):
+            idx += binom(PTWIST[pos[i]], t - i + 1)
+        idx *= factor[0]
+
+        # Pawns of the other side
+        i = self.pawns[0]
+        t = i + self.pawns[1]
+        if t > i:
+            for j in range(i, t):
+                for k in range(j + 1, t):
+                    if pos[j] > pos[k]:
+                        pos[j], pos[k] = pos[k], pos[j]
+            s = 0
+            for m in range(i, t):
+                p = pos[m]
+                j = 0
+                for k in range(i):
+                    j += int(p > pos[k])
+                s += binom(p - j - 8, m - i + 1)
+            idx += s * factor[i]
+            i = t
+
+        return idx + self._encodeGroups(norm, pos, factor, i, n)
+
+    @staticmethod
+    def _encodeGroups(norm, pos, factor, i, n):
+        """Return the index of the groups of like pieces from pos[i] on"""
+        idx = 0
+        while i < n:
+            t = norm[i]
+            for j in range(i, i + t):
+                for k in range(j + 1, i + t):
+                    if pos[j] > pos[k]:
+                        pos[j], pos[k] = pos[k], pos[j]
+
+            s = 0
+            for m in range(i, i + t):
+                p = pos[m]
+                j = 0
+                for l in range(i):
+                    j += int(p > pos[l])
+                s += binom(p - j, m - i + 1)
+
+            idx += s * factor[i]
+            i += t
+        return idx
+
+    def _sides(self, board):
+        """
+        Return the color mirror, the square mirror and the side of the
+        table to probe for the board.
+        """
+        if not self.symmetric:
+            if materialKey(board) != self.key:
+                return 8, 0x38, int(board.toMove is WHITE)
+            return 0, 0, int(board.toMove is not WHITE)
+        if board.toMove is WHITE:
+            return 0, 0, 0
+        return 8, 0x38, 0
+
+    def _decompressPairs(self, d, idx):
+        """Return the value at the given index of a compressed table of values"""
+        if not d.idxbits:
+            return d.minLen
+
+        mainidx = idx >> d.idxbits
+        litidx = (idx & (1 << d.idxbits) - 1) - (1 << (d.idxbits - 1))
+        block = self._readUint32(d.indextable + 6 * mainidx)
+        litidx += self._readUint16(d.indextable + 6 * mainidx + 4)
+
+        if litidx < 0:
+            while litidx < 0:
+                block -= 1
+                litidx += self._readUint16(d.sizetable + 2 * block) + 1
+        else:
+            while litidx > self._readUint16(d.sizetable + 2 * block):
+                litidx -= self._readUint16(d.sizetable + 2 * block) + 1
+                block += 1
+
+        key = (d, block)
+        values = self._cache.get(key)
+        if values is None:
+            values = self._decompressBlock(d, block)
+            self._cache.put(key, values)
+        return values[litidx]
+
+    def _decompressBlock(self, d, block):
+        """Return a list of all values in a block of a compressed table of values"""
+        data = self._data
+        count = self._readUint16(d.sizetable + 2 * block) + 1
+        pointer = d.data + (block << d.blocksize)
+        symlen = d.symlen
+        base = d.base
+        minLen = d.minLen
+        sympat = d.sympat
+        wdl = isinstance(self, WDLTable)
+
+        values = []
+        code = self._readUint64BE(pointer)
+        pointer += 8
+        # Number of bits of code already used
+        bitcnt = 0
+        while len(values) < count:
+            l = minLen
+            while code < base[l - minLen]:
+                l += 1
+            sym = self._readUint16(d.offset + l * 2) + ((code - base[l - minLen]) >> (64 - l))
+
+            # Expand the symbol into its values, left to right
+            stack = [sym]
+            while stack:
+                sym = stack.pop()
+                w = sympat + 3 * sym
+                if symlen[sym]:
+                    stack.append((data[w + 2] << 4) | (data[w + 1] >> 4))
+                    stack.append(((data[w + 1] & 0xf) << 8) | data[w])
+                elif wdl:
+                    values.append(data[w])
+                else:
+                    values.append(((data[w + 1] & 0x0f) << 8) | data[w])
+
+            code = (code << l) & 0xffffffffffffffff
+            bitcnt += l
+            if bitcnt >= 32:
+                bitcnt -= 32
+                code |= self._readUint32BE(pointer) << bitcnt
+                pointer += 4
+        return values
+
+
+class WDLTable(Table):
+    """Table of win, draw and loss values"""
+
+    MAGIC = WDL_MAGIC
+
+    def _initialize(self):
+        data = self._data
+        self.tbSize = [0] * 8
+        self.size = [0] * (8 * 3)
+
+        # Used if there are only pieces
+        self.precomp = {}
+        self.pieces = {}
+        self.factor = [[0] * TBPIECES for i in range(2)]
+        self.norm = [[0] * self.num for i in range(2)]
+
+        # Used if there are pawns
+        self.files = [_PawnFile() for f in range(4)]
+
+        split = data[4] & 0x01
+        files = 4 if data[4] & 0x02 else 1
+
+        pointer = 5
+
+        if not self.hasPawns:
+            self._setupPiecesPiece(pointer)
+            pointer += self.num + 1
+            pointer += pointer & 0x01
+
+            self.precomp[0] = self._setupPairs(pointer, self.tbSize[0], 0, True)
+            pointer = self._next
+            if split:
+                self.precomp[1] = self._setupPairs(pointer, self.tbSize[1], 3, True)
+                pointer = self._next
+
+            self.precomp[0].indextable = pointer
+            pointer += self.size[0]
+            if split:
+                self.precomp[1].indextable = pointer
+                pointer += self.size[3]
+
+            self.precomp[0].sizetable = pointer
+            pointer += self.size[1]
+            if split:
+                self.precomp[1].sizetable = pointer
+                pointer += self.size[4]
+
+            pointer = (pointer + 0x3f) & ~0x3f
+            self.precomp[0].data = pointer
+            pointer += self.size[2]
+            if split:
+                pointer = (pointer + 0x3f) & ~0x3f
+                self.precomp[1].data = pointer
+
+            self.key = pieceKey(self.pieces[0])
+            self.mirroredKey = pieceKey(self.pieces[0], mirror=True)
+        else:
+            s = 1 + int(self.pawns[1] > 0)
+            for f in range(4):
+                self._setupPiecesPawn(pointer, 2 * f, f)
+                pointer += self.num + s
+            pointer += pointer & 0x01
+
+            for f in range(files):
+                self.files[f].precomp[0] = self._setupPairs(pointer, self.tbSize[2 * f], 6 * f, True)
+                pointer = self._next
+                if split:
+                    self.files[f].precomp[1] = self._setupPairs(pointer, self.tbSize[2 * f + 1],
+                                                                6 * f + 3, True)
+                    pointer = self._next
+
+            for f in range(files):
+                self.files[f].precomp[0].indextable = pointer
+                pointer += self.size[6 * f]
+                if split:
+                    self.files[f].precomp[1].indextable = pointer
+                    pointer += self.size[6 * f + 3]
+
+            for f in range(files):
+                self.files[f].precomp[0].sizetable = pointer
+                pointer += self.size[6 * f + 1]
+                if split:
+                    self.files[f].precomp[1].sizetable = pointer
+                    pointer += self.size[6 * f + 4]
+
+            for f in range(files):
+                pointer = (pointer + 0x3f) & ~0x3f
+                self.files[f].precomp[0].data = pointer
+                pointer += self.size[6 * f + 2]
+                if split:
+                    pointer = (pointer + 0x3f) & ~0x3f
+                    self.files[f].precomp[1].data = pointer
+                    pointer += self.size[6 * f + 5]
+
+    def _setupPiecesPawn(self, pointer, tbSizeIndex, f):
+        data = self._data
+        j = 1 + int(self.pawns[1] > 0)
+        pawnFile = self.files[f]
+        for side, shift in ((0, 0), (1, 4)):
+            order = data[pointer] >> shift & 0x0f
+            order2 = data[pointer + 1] >> shift & 0x0f if self.pawns[1] else 0x0f
+            pawnFile.pieces[side] = [data[pointer + i + j] >> shift & 0x0f for i in range(self.num)]
+            pawnFile.norm[side] = [0] * self.num
+            self._setNormPawn(pawnFile.norm[side], pawnFile.pieces[side])
+            pawnFile.factor[side] = [0] * TBPIECES
+            self.tbSize[tbSizeIndex + side] = self._calcFactorsPawn(
+                pawnFile.factor[side], order, order2, pawnFile.norm[side], f)
+
+    def _setupPiecesPiece(self, pointer):
+        data = self._data
+        for side, shift in ((0, 0), (1, 4)):
+            self.pieces[side] = [data[pointer + i + 1] >> shift & 0x0f for i in range(self.num)]
+            order = data[pointer] >> shift & 0x0f
+            self._setNormPiece(self.norm[side], self.pieces[side])
+            self.tbSize[side] = self._calcFactorsPiece(self.factor[side], order, self.norm[side])
+
+    def probe(self, board):
+        """
+        Return the value of the position in the table, 2 for a win, 1
+        for a win drawn by the fifty move rule, 0 for a draw, and -1
+        and -2 likewise for losses.
+        """
+        self.open()
+        cmirror, mirror, bside = self._sides(board)
+
+        p = [0] * TBPIECES
+        if not self.hasPawns:
+            pieces = self.pieces[bside]
+            i = 0
+            while i < self.num:
+                for square in _squares(board, pieces[i], cmirror):
+                    p[i] = square
+                    i += 1
+
+            idx = self._encodePiece(self.norm[bside], p, self.factor[bside])
+            value = self._decompressPairs(self.precomp[bside], idx)
+        else:
+            i = 0
+            for square in _squares(board, self.files[0].pieces[0][0], cmirror):
+                p[i] = square ^ mirror
+                i += 1
+
+            f = self._pawnFile(p)
+            pieces = self.files[f].pieces[bside]
+            while i < self.num:
+                for square in _squares(board, pieces[i], cmirror):
+                    p[i] = square ^ mirror
+                    i += 1
+
+            idx = self._encodePawn(self.files[f].norm[bside], p, self.files[f].factor[bside])
+            value = self._decompressPairs(self.files[f].precomp[bside], idx)
+
+        return value - 2
+
+
+class DTZTable(Table):
+    """Table of the distances to the next capture or pawn move"""
+
+    MAGIC = DTZ_MAGIC
+
+    def _initialize(self):
+        data = self._data
+        self.factor = [0] * TBPIECES
+        self.norm = [0] * self.num
+        self.tbSize = [0] * 4
+        self.size = [0] * 12
+        self.files = [_PawnFile() for f in range(4)]
+
+        files = 4 if data[4] & 0x02 else 1
+
+        pointer = 5
+
+        if not self.hasPawns:
+            self.mapIdx = [[0] * 4]
+
+            self._setupPiecesPiece(pointer, 0)
+            pointer += self.num + 1
+            pointer += pointer & 0x01
+
+            self.precomp = self._setupPairs(pointer, self.tbSize[0], 0, False)
+            self.flags = self._flags
+            pointer = self._next
+            self.pMap = pointer
+            if self.flags & 2:
+                if not self.flags & 16:
+                    for i in range(4):
+                        self.mapIdx[0][i] = pointer + 1 - self.pMap
+                        pointer += 1 + data[pointer]
+                else:
+                    for i in range(4):
+                        self.mapIdx[0][i] = (pointer + 2 - self.pMap) // 2
+                        pointer += 2 + 2 * self._readUint16(pointer)
+            pointer += pointer & 0x01
+
+            self.precomp.indextable = pointer
+            pointer += self.size[0]
+
+            self.precomp.sizetable = pointer
+            pointer += self.size[1]
+
+            pointer = (pointer + 0x3f) & ~0x3f
+            self.precomp.data = pointer
+            pointer += self.size[2]
+
+            self.key = pieceKey(self.pieces)
+            self.mirroredKey = pieceKey(self.pieces, mirror=True)
+        else:
+            s = 1 + int(self.pawns[1] > 0)
+            for f in range(4):
+                self._setupPiecesPawn(pointer, f, f)
+                pointer += self.num + s
+            pointer += pointer & 0x01
+
+            self.flags = []
+            for f in range(files):
+                self.files[f].precomp = self._setupPairs(pointer, self.tbSize[f], 3 * f, False)
+                pointer = self._next
+                self.flags.append(self._flags)
+
+            self.mapIdx = []
+            self.pMap = pointer
+            for f in range(files):
+                self.mapIdx.append([])
+                if self.flags[f] & 2:
+                    if not self.flags[f] & 16:
+                        for i in range(4):
+                            self.mapIdx[-1].append(pointer + 1 - self.pMap)
+                            pointer += 1 + data[pointer]
+                    else:
+                        pointer += pointer & 0x01
+                        for i in range(4):
+                            self.mapIdx[-1].append((pointer + 2 - self.pMap) // 2)
+                            pointer += 2 + 2 * self._readUint16(pointer)
+            pointer += pointer & 0x01
+
+            for f in range(files):
+                self.files[f].precomp.indextable = pointer
+                pointer += self.size[3 * f]
+
+            for f in range(files):
+                self.files[f].precomp.sizetable = pointer
+                pointer += self.size[3 * f + 1]
+
+            for f in range(files):
+                pointer = (pointer + 0x3f) & ~0x3f
+                self.files[f].precomp.data = pointer
+                pointer += self.size[3 * f + 2]
+
+    def _setupPiecesPiece(self, pointer, tbSizeIndex):
+        data = self._data
+        self.pieces = [data[pointer + i + 1] & 0x0f for i in range(self.num)]
+        order = data[pointer] & 0x0f
+        self._setNormPiece(self.norm, self.pieces)
+        self.tbSize[tbSizeIndex] = self._calcFactorsPiece(self.factor, order, self.norm)
+
+    def _setupPiecesPawn(self, pointer, tbSizeIndex, f):
+        data = self._data
+        j = 1 + int(self.pawns[1] > 0)
+        order = data[pointer] & 0x0f
+        order2 = data[pointer + 1] & 0x0f if self.pawns[1] else 0x0f
+        pawnFile = self.files[f]
+        pawnFile.pieces = [data[pointer + i + j] & 0x0f for i in range(self.num)]
+        pawnFile.norm = [0] * self.num
+        self._setNormPawn(pawnFile.norm, pawnFile.pieces)
+        pawnFile.factor = [0] * TBPIECES
+        self.tbSize[tbSizeIndex] = self._calcFactorsPawn(pawnFile.factor, order, order2,
+                                                         pawnFile.norm, f)
+
+    def _mapValue(self, flags, mapIdx, value, wdl):
+        """Map a stored value to plies, given the flags of the table"""
+        if flags & 2:
+            if not flags & 16:
+                value = self._data[self.pMap + mapIdx[WDL_TO_MAP[wdl + 2]] + value]
+            else:
+                value = self._readUint16(self.pMap + 2 * (mapIdx[WDL_TO_MAP[wdl + 2]] + value))
+        if not flags & PA_FLAGS[wdl + 2] or wdl & 1:
+            value *= 2
+        return value
+
+    def probe(self, board, wdl):
+        """
+        Return the distance in the table of the position with the given
+        WDL value, or None if the table only holds the positions with
+        the other player to move.
+        """
+        self.open()
+        cmirror, mirror, bside = self._sides(board)
+
+        p = [0] * TBPIECES
+        if not self.hasPawns:
+            if (self.flags & 1) != bside and not self.symmetric:
+                return None
+
+            i = 0
+            while i < self.num:
+                for square in _squares(board, self.pieces[i], cmirror):
+                    p[i] = square
+                    i += 1
+
+            idx = self._encodePiece(self.norm, p, self.factor)
+            value = self._decompressPairs(self.precomp, idx)
+            return self._mapValue(self.flags, self.mapIdx[0], value, wdl)
+
+        i = 0
+        for square in _squares(board, self.files[0].pieces[0], cmirror):
+            p[i] = square ^ mirror
+            i += 1
+        f = self._pawnFile(p)
+        if self.flags[f] & 1 != bside:
+            return None
+
+        pieces = self.files[f].pieces
+        while i < self.num:
+            for square in _squares(board, pieces[i], cmirror):
+                p[i] = square ^ mirror
+                i += 1
+
+        idx = self._encodePawn(self.files[f].norm, p, self.files[f].factor)
+        value = self._decompressPairs(self.files[f].precomp, idx)
+        return self._mapValue(self.flags[f], self.mapIdx[f], value, wdl)
+
+
+class Tablebase():
+    """
+    Properties:
+
+    maxPieces: number of pieces of the largest WDL table added, or 0.
+        Positions with more pieces can't be probed.
+
+    wdl, dtz: dicts mapping the material of a table, like KRvK, to the
+        WDL or DTZ table, with an entry for each side of the table
+
+    cache: the cache of decompressed blocks, with hits and misses
+        counters
+    """
+
+    def __init__(self, directory=None, blockCache=BLOCKCACHE, maxOpen=MAXOPEN):
+        self.maxPieces = 0
+        self.wdl = {}
+        self.dtz = {}
+        self.cache = _BlockCache(blockCache)
+        self.maxOpen = maxOpen
+        # Tables with mapped files, least recently probed first
+        self._open = OrderedDict()
+        self._openLock = threading.Lock()
+        if directory is not None:
+            self.addDirectory(directory)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def addDirectory(self, directory):
+        """
+        Add the tables in the given directory, and return the number of
+        table files found. The files are only opened once probed.
+        """
+        found = 0
+        for filename in os.listdir(directory):
+            tablename, ext = os.path.splitext(filename)
+            path = os.path.join(directory, filename)
+            if not isTablename(tablename) or not os.path.isfile(path):
+                continue
+            if ext == WDL_SUFFIX:
+                tables, table = self.wdl, WDLTable(path, self.cache)
+                self.maxPieces = max(self.maxPieces, table.num)
+            elif ext == DTZ_SUFFIX:
+                tables, table = self.dtz, DTZTable(path, self.cache)
+            else:
+                continue
+            if table.key in tables:
+                tables[table.key].close()
+            tables[table.key] = table
+            tables[table.mirroredKey] = table
+            found += 1
+        return found
+
+    def close(self):
+        """Close all tables and forget them"""
+        for table in set(self.wdl.values()) | set(self.dtz.values()):
+            table.close()
+        self.wdl.clear()
+        self.dtz.clear()
+        self._open.clear()
+        self.cache.clear()
+        self.maxPieces = 0
+
+    def canProbe(self, board):
+        """
+        Return True if the position has few enough pieces for the added
+        tables and no castling rights, so it may be probed. The tables
+        for the material may still be missing.
+        """
+        return (len(board.pieces[WHITE][LIVING]) + len(board.pieces[BLACK][LIVING]) <= self.maxPieces
+                and not board.castlingRights())
+
+    def _table(self, tables, board):
+        """Return the table for the material of the board, keeping it open"""
+        key = materialKey(board)
+        table = tables.get(key)
+        if table is None:
+            raise TablebaseError(key, "Table missing")
+
+        with self._openLock:
+            if table in self._open:
+                self._open.move_to_end(table)
+            else:
+                self._open[table] = True
+                while len(self._open) > self.maxOpen:
+                    self._open.popitem(last=False)[0].close()
+        return table
+
+    def _probeWDLTable(self, board):
+        # Kings only
+        if (board.occupancy[WHITE] | board.occupancy[BLACK] ==
+                board.bitboards[WHITE][King] | board.bitboards[BLACK][King]):
+            return 0
+        return self._table(self.wdl, board).probe(board)
+
+    def _checkProbe(self, board):
+        """Raise TablebaseError if the position can't be in the tables"""
+        if board.castlingRights():
+            raise TablebaseError(board.toFEN(), "Castling rights are not in the tables")
+        pieces = popCount(board.occupancy[WHITE] | board.occupancy[BLACK])
+        if pieces > TBPIECES:
+            raise TablebaseError(board.toFEN(), "Tables hold up to {} pieces, not {}".format(
+                TBPIECES, pieces))
+
+    def _probeAB(self, board, alpha, beta):
+        """
+        Return the WDL value of the position within alpha and beta, and
+        2 if it is reached by a capture, else 1.
+        """
+        enemy = board.occupancy[-board.toMove]
+        for move in list(board.legalMoves()):
+            if not enemy & BB_SQUARES[toSquare(move[1])]:
+                continue
+            undo = board._make(*move)
+            try:
+                value = -self._probeAB(board, -beta, -alpha)[0]
+            finally:
+                board._unmake(undo)
+
+            if value > alpha:
+                if value >= beta:
+                    return value, 2
+                alpha = value
+
+        value = self._probeWDLTable(board)
+        if alpha >= value:
+            return alpha, 1 + int(alpha > 0)
+        return value, 1
+
+    @staticmethod
+    def _passantMoves(board):
+        """Return a list of the legal en passant captures"""
+        if board.passantPawn() is None:
+            return []
+        return [move for move in board.legalMoves()
+                if type(board[move[0]]) is Pawn and move[0][1] != move[1][1] and board[move[1]] is None]
+
+    def _board(self, board):
+        """Return the board to probe, copying it if frozen"""
+        self._checkProbe(board)
+        return board.copy(stack=False) if board.frozen else board
+
+    def probeWDL(self, board):
+        """
+        Return the WDL value of the position for the player to move,
+        assuming the halfmove clock is 0: 2 for a win, 1 for a win that
+        is drawn by the fifty move rule, 0 for a draw, -1 for a loss
+        that is drawn by the fifty move rule and -2 for a loss.
+
+        Raises TablebaseError if the position can't be probed, or if a
+        needed table is missing. The board is restored before returning.
+        """
+        board = self._board(board)
+        value = self._probeAB(board, -2, 2)[0]
+
+        passant = self._passantMoves(board)
+        if not passant:
+            return value
+
+        best = -3
+        for move in passant:
+            undo = board._make(*move)
+            try:
+                best = max(best, -self._probeAB(board, -2, 2)[0])
+            finally:
+                board._unmake(undo)
+
+        if best >= value:
+            value = best
+        elif value == 0:
+            # Forced to make a losing en passant capture if it is the
+            # only legal move
+            if all(move in passant for move in board.legalMoves()):
+                value = best
+        return value
+
+    def getWDL(self, board, default=None):
+        """Return the WDL value of the position like probeWDL, or default if it can't be probed"""
+        try:
+            return self.probeWDL(board)
+        except TablebaseError:
+            return default
+
+    def _probeDTZTable(self, board, wdl):
+        return self._table(self.dtz, board).probe(board, wdl)
+
+    def _probeDTZNoPassant(self, board):
+        wdl, success = self._probeAB(board, -2, 2)
+        if wdl == 0:
+            return 0
+
+        player = board.toMove
+        if success == 2 or not board.occupancy[player] & ~board.bitboards[player][Pawn]:
+            return dtzBeforeZeroing(wdl)
+
+        if wdl > 0:
+            # Pawn moves other than captures
+            for move in list(board.legalMoves()):
+                if type(board[move[0]]) is not Pawn or move[0][1] != move[1][1]:
+                    continue
+                undo = board._make(*move)
+                try:
+                    value = -self.probeWDL(board)
+                finally:
+                    board._unmake(undo)
+                if value == wdl:
+                    return 1 if value == 2 else 101
+
+        dtz = self._probeDTZTable(board, wdl)
+        if dtz is not None:
+            return dtzBeforeZeroing(wdl) + (dtz if wdl > 0 else -dtz)
+
+        # The table only holds the other side, so search one ply
+        if wdl > 0:
+            best = 0xffff
+            occupied = board.occupancy[WHITE] | board.occupancy[BLACK]
+            for move in list(board.legalMoves()):
+                if type(board[move[0]]) is Pawn or occupied & BB_SQUARES[toSquare(move[1])]:
+                    continue
+                undo = board._make(*move)
+                try:
+                    value = -self.probeDTZ(board)
+                    if value == 1 and board.isCheckmate():
+                        best = 1
+                    elif value > 0 and value + 1 < best:
+                        best = value + 1
+                finally:
+                    board._unmake(undo)
+            return best
+
+        best = -1
+        for move in list(board.legalMoves()):
+            undo = board._make(*move)
+            try:
+                if board.halfmoveClock == 0:
+                    if wdl == -2:
+                        value = -1
+                    else:
+                        value = self._probeAB(board, 1, 2)[0]
+                        value = 0 if value == 2 else -101
+                else:
+                    value = -self.probeDTZ(board) - 1
+            finally:
+                board._unmake(undo)
+            if value < best:
+                best = value
+        return best
+
+    def probeDTZ(self, board):
+        """
+        Return the DTZ value of the position for the player to move:
+        the number of plies to the next capture or pawn move when the
+        winning side plays for the quickest and the losing side for the
+        slowest one, positive when winning, negative when losing and 0
+        for a draw.
+
+        Values between 1 and 100 are wins, and values over 100 are wins
+        drawn by the fifty move rule, and likewise for losses. A value
+        may be one ply too high, which never changes the result.
+
+        Raises TablebaseError if the position can't be probed, or if a
+        needed table is missing. The board is restored before returning.
+        """
+        board = self._board(board)
+        value = self._probeDTZNoPassant(board)
+
+        passant = self._passantMoves(board)
+        if not passant:
+            return value
+
+        best = -3
+        for move in passant:
+            undo = board._make(*move)
+            try:
+                best = max(best, -self._probeAB(board, -2, 2)[0])
+            finally:
+                board._unmake(undo)
+
+        best = WDL_TO_DTZ[best + 2]
+        if value < -100:
+            if best >= 0:
+                value = best
+        elif value < 0:
+            if best >= 0 or best < -100:
+                value = best
+        elif value > 100:
+            if best > 0:
+                value = best
+        elif value > 0:
+            if best == 1:
+                value = best
+        elif best >= 0:
+            value = best
+        elif all(move in passant for move in board.legalMoves()):
+            value = best
+        return value
+
+    def getDTZ(self, board, default=None):
+        """Return the DTZ value of the position like probeDTZ, or default if it can't be probed"""
+        try:
+            return self.probeDTZ(board)
+        except TablebaseError:
+            return default
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Probe a position in Syzygy tablebases.")
+    parser.add_argument("directory", help="directory of the table files")
+    parser.add_argument("fen", help="position to probe in FEN")
+    args = parser.parse_args(argv)
+
+    board = Board.fromFEN(args.fen)
+    with Tablebase(args.directory) as tablebase:
+        try:
+            print("wdl", tablebase.probeWDL(board))
+            print("dtz", tablebase.probeDTZ(board))
+        except TablebaseError as e:
+            print(e)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
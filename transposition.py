@@ -0,0 +1,198 @@
+#! /usr/bin/env python3
+
+"""
+Transposition table
+
+Caches search results by the Zobrist hash of the position. The table
+is allocated once with a fixed size in megabytes, so memory use stays
+flat however many positions are stored.
+
+Entries are kept in two flat arrays of 64-bit integers, one holding
+the hash keys and one holding the packed data. Entries are grouped in
+buckets of two. The first entry of a bucket is depth-preferred: it is
+only replaced by a result searched at least as deep, or once it is left
+over from an earlier search. The second entry is always replaced, so
+recent results are kept too.
+"""
+
+from array import array
+from collections import namedtuple
+
+from .bitboards import toSquare, toPosition
+
+__all__ = ["EXACT", "LOWER", "UPPER", "TTEntry", "TranspositionTable"]
+
+
+# Bounds of the stored scores. An entry with no bound is empty
+EXACT = 1
+LOWER = 2
+UPPER = 3
+
+# Bytes used per entry, for the key and the data
+ENTRYSIZE = 16
+BUCKETSIZE = 2
+
+# Layout of the packed data, from the lowest bit:
+# bound (2 bits), generation (6 bits), depth (8 bits), move (16 bits),
+# score (32 bits, offset to be unsigned)
+GENERATIONS = 64
+SCOREOFFSET = 1 << 31
+
+# Promotion symbols by their index in the packed move, 0 for none
+PROMOTIONS = (None, "Q", "R", "B", "N")
+
+# Stored result
+# move: the best move found, or None
+# score: score of the position for the player to move
+# depth: depth the position was searched to
+# bound: EXACT, LOWER or UPPER, telling whether score is the exact
+#     score or a lower or upper bound of it
+TTEntry = namedtuple("TTEntry", ("move", "score", "depth", "bound"))
+
+
+def _packMove(move):
+    if move is None:
+        return 0
+    current, target, promotion = move
+    # Add one so that a move is never packed to 0
+    return ((toSquare(current) << 9 | toSquare(target) << 3 |
+             PROMOTIONS.index(promotion)) + 1)
+
+
+def _unpackMove(packed):
+    if not packed:
+        return None
+    packed -= 1
+    return toPosition(packed >> 9), toPosition(packed >> 3 & 63), PROMOTIONS[packed & 7]
+
+
+class TranspositionTable():
+    """
+    Properties:
+
+    size: size of the table in megabytes
+
+    generation: counter of the searches using the table, increased by
+        newSearch. Entries from earlier searches are replaced first.
+
+    hits: number of probes finding the position
+
+    misses: number of probes not finding the position
+
+    collisions: number of misses where the bucket of the position was
+        filled with other positions
+
+    stores: number of results stored
+
+    overwrites: number of stores replacing another position
+    """
+
+    def __init__(self, size=16):
+        self.resize(size)
+
+    def resize(self, size):
+        """Reallocate the table with the given size in megabytes, clearing it"""
+        # Round down to a power of two buckets, so the index is a mask
+        buckets = max(1, int(size * (1 << 20)) // (ENTRYSIZE * BUCKETSIZE))
+        buckets = 1 << (buckets.bit_length() - 1)
+        self.size = size
+        self._mask = buckets - 1
+        self._keys = array("Q", bytes(8 * BUCKETSIZE * buckets))
+        self._data = array("Q", bytes(8 * BUCKETSIZE * buckets))
+        self.generation = 0
+        self.resetStats()
+
+    def clear(self):
+        """Remove all entries"""
+        self.resize(self.size)
+
+    def resetStats(self):
+        """Set all statistics to 0"""
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def stats(self):
+        """Return a dict of the statistics"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "collisions": self.collisions,
+            "stores": self.stores,
+            "overwrites": self.overwrites
+        }
+
+    def newSearch(self):
+        """Age the entries, letting them be replaced by the coming search"""
+        self.generation = (self.generation + 1) % GENERATIONS
+
+    def __len__(self):
+        """Return the number of entries the table can hold"""
+        return len(self._keys)
+
+    def probe(self, key):
+        """Return the TTEntry stored for the given Zobrist hash, or None"""
+        index = (key & self._mask) * BUCKETSIZE
+        keys = self._keys
+        data = self._data
+        for slot in range(index, index + BUCKETSIZE):
+            if keys[slot] == key and data[slot]:
+                self.hits += 1
+                packed = data[slot]
+                return TTEntry(_unpackMove(packed >> 16 & 0xFFFF),
+                               (packed >> 32) - SCOREOFFSET,
+                               packed >> 8 & 0xFF,
+                               packed & 3)
+
+        self.misses += 1
+        if data[index] or data[index + 1]:
+            self.collisions += 1
+        return None
+
+    def store(self, key, move, score, depth, bound):
+        """
+        Store the result of searching the position with the given
+        Zobrist hash to the given depth.
+
+        If no move is given, the move already stored for the position
+        is kept.
+        """
+        index = (key & self._mask) * BUCKETSIZE
+        keys = self._keys
+        data = self._data
+        packedMove = _packMove(move)
+
+        stored = data[index]
+        if keys[index] == key or not stored:
+            slot = index
+        elif keys[index + 1] == key:
+            slot = index + 1
+        elif (depth >= stored >> 8 & 0xFF or
+                stored >> 2 & (GENERATIONS - 1) != self.generation):
+            slot = index
+        else:
+            slot = index + 1
+
+        old = data[slot]
+        if old:
+            if keys[slot] == key:
+                if not packedMove:
+                    packedMove = old >> 16 & 0xFFFF
+            else:
+                self.overwrites += 1
+
+        keys[slot] = key
+        data[slot] = ((score + SCOREOFFSET) << 32 | packedMove << 16 |
+                      min(depth, 0xFF) << 8 | self.generation << 2 | bound)
+        self.stores += 1
+
+    def hashfull(self):
+        """Return how full the table is with current entries, in permille"""
+        sample = min(len(self._data), 1000)
+        used = 0
+        for packed in self._data[:sample]:
+            if packed and packed >> 2 & (GENERATIONS - 1) == self.generation:
+                used += 1
+        return used * 1000 // sample
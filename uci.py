@@ -0,0 +1,328 @@
+#! /usr/bin/env python3
+
+"""
+Universal Chess Interface
+
+Lets chess GUIs and tournament managers play against the engine over
+standard input and output, using the UCI protocol. The search runs on a
+background thread, so commands like stop and isready are answered while
+it is searching. The best move is written by the search thread once the
+search is done or stopped.
+
+Run as a module from the directory containing the package:
+
+    python -m chess.uci
+"""
+
+import argparse
+import os
+import sys
+import threading
+
+from .Board import Board
+from .pieces import *
+from .book import OpeningBook
+from .interpreter import interpretCoordinates, toCoordinates
+from .search import MATE, MAXPLY, TBWIN, Search
+from .syzygy import Tablebase
+from .transposition import TranspositionTable
+from .utilities import *
+
+__all__ = ["UCIEngine"]
+
+
+NAME = "chess"
+AUTHOR = "the chess authors"
+
+# Limits of the Hash option in megabytes
+HASHDEFAULT = 16
+HASHMAX = 4096
+
+# Time management: the share of the remaining time given to a move when
+# the number of moves to the next time control is unknown, and the time
+# in seconds kept in reserve for overhead
+MOVESTOGO = 30
+RESERVE = 0.05
+
+# Centipawns reported for a tablebase win, less the plies to reach it.
+# Well above any evaluation, like the scores of other engines.
+TBSCORE = 20000
+
+
+def formatScore(score):
+    """
+    Return a search score as a UCI score, in centipawns or moves to
+    mate. Tablebase wins and losses are given as TBSCORE centipawns less
+    the plies to the tablebase position.
+    """
+    if abs(score) >= MATE - MAXPLY:
+        plies = MATE - abs(score)
+        moves = (plies + 1) // 2
+        return "mate {}".format(moves if score > 0 else -moves)
+    if abs(score) >= TBWIN - MAXPLY:
+        plies = TBWIN - abs(score)
+        return "cp {}".format(TBSCORE - plies if score > 0 else plies - TBSCORE)
+    return "cp {}".format(score)
+
+
+class UCIEngine():
+    """
+    Properties:
+
+    board: the position set by the last position command
+
+    table: the TranspositionTable shared by all searches, sized by the
+        Hash option
+
+    search: the Search running or last run, or None
+
+    output: function called with each line written to the GUI
+
+    book: the OpeningBook set by the Book option, or None. Positions in
+        the book are answered with a book move instead of a search.
+
+    tablebase: the Tablebase of the directories set by the SyzygyPath
+        option, or None
+    """
+
+    def __init__(self, output=None, hashSize=HASHDEFAULT):
+        self.board = Board()
+        self.table = TranspositionTable(hashSize)
+        self.search = None
+        self.output = output if output is not None else self._print
+        self.book = None
+        self.tablebase = None
+
+        self._thread = None
+        # Set when an infinite search may write its best move
+        self._release = threading.Event()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _print(line):
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+    def send(self, line):
+        """Write a line to the GUI, from any thread"""
+        with self._lock:
+            self.output(line)
+
+    def handle(self, line):
+        """
+        Handle a command line from the GUI.
+
+        Returns False once the quit command is given, otherwise True.
+        Unknown commands are ignored, as the protocol requires.
+        """
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+
+        if command == "uci":
+            self.send("id name {}".format(NAME))
+            self.send("id author {}".format(AUTHOR))
+            self.send("option name Hash type spin default {} min 1 max {}".format(
+                HASHDEFAULT, HASHMAX))
+            self.send("option name Book type string default <empty>")
+            self.send("option name SyzygyPath type string default <empty>")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "setoption":
+            self.setOption(args)
+        elif command == "ucinewgame":
+            self.stop()
+            self.table.clear()
+            self.board = Board()
+        elif command == "position":
+            self.stop()
+            self.setPosition(args)
+        elif command == "go":
+            self.stop()
+            self.go(args)
+        elif command == "stop":
+            self.stop()
+        elif command == "quit":
+            self.stop()
+            if self.book is not None:
+                self.book.close()
+            if self.tablebase is not None:
+                self.tablebase.close()
+            return False
+        return True
+
+    def setOption(self, args):
+        """Handle the arguments of a setoption command"""
+        if "name" not in args or "value" not in args:
+            return
+        name = " ".join(args[args.index("name") + 1:args.index("value")])
+        value = " ".join(args[args.index("value") + 1:])
+        if name.lower() == "hash":
+            try:
+                size = min(max(int(value), 1), HASHMAX)
+            except ValueError:
+                self.send("info string Invalid Hash value '{}'".format(value))
+                return
+            self.stop()
+            self.table.resize(size)
+        elif name.lower() == "book":
+            if self.book is not None:
+                self.book.close()
+                self.book = None
+            if value and value != "<empty>":
+                try:
+                    self.book = OpeningBook(value)
+                except OSError as e:
+                    self.send("info string Can't open book: {}".format(e))
+        elif name.lower() == "syzygypath":
+            self.stop()
+            if self.tablebase is not None:
+                self.tablebase.close()
+                self.tablebase = None
+            if value and value != "<empty>":
+                # Several directories are separated like in PATH
+                tablebase = Tablebase()
+                try:
+                    for directory in value.split(os.pathsep):
+                        tablebase.addDirectory(directory)
+                except OSError as e:
+                    self.send("info string Can't open tablebases: {}".format(e))
+                    tablebase.close()
+                    return
+                self.tablebase = tablebase
+                self.send("info string Found tablebases with up to {} pieces".format(
+                    tablebase.maxPieces))
+
+    def setPosition(self, args):
+        """
+        Handle the arguments of a position command, either startpos or
+        fen followed by the position, and optionally moves followed by
+        the moves played from it in coordinate notation.
+
+        The moves are played with push, so the positions before the
+        current one are known to the search as repetitions. If the
+        command is invalid the previous position is kept.
+        """
+        if "moves" in args:
+            moves = args[args.index("moves") + 1:]
+            args = args[:args.index("moves")]
+        else:
+            moves = []
+
+        try:
+            if args[:1] == ["startpos"]:
+                board = Board()
+            elif args[:1] == ["fen"]:
+                board = Board.fromFEN(" ".join(args[1:]))
+            else:
+                self.send("info string Expected startpos or fen")
+                return
+            for mvStr in moves:
+                board.push(interpretCoordinates(board, mvStr))
+        except (NotationError, MoveError, StateError) as e:
+            self.send("info string {}".format(str(e).replace("\n", " ")))
+            return
+        self.board = board
+
+    def go(self, args):
+        """
+        Handle the arguments of a go command, and start searching on a
+        background thread.
+
+        Supports depth, nodes, movetime, wtime, btime, winc, binc,
+        movestogo and infinite. Without any limit the search is
+        infinite.
+        """
+        limits = {}
+        infinite = "infinite" in args
+        if self.book is not None and not infinite:
+            move = self.book.choice(self.board)
+            if move is not None:
+                self.send("bestmove {}".format(toCoordinates(move)))
+                return
+
+        for index, name in enumerate(args[:-1]):
+            if name in ("depth", "nodes", "movetime", "wtime", "btime",
+                        "winc", "binc", "movestogo"):
+                try:
+                    limits[name] = int(args[index + 1])
+                except ValueError:
+                    pass
+
+        depth = limits.get("depth", MAXPLY)
+        nodes = limits.get("nodes")
+        movetime = None
+        if "movetime" in limits:
+            movetime = limits["movetime"] / 1000
+        else:
+            remaining = limits.get("wtime" if self.board.toMove is WHITE else "btime")
+            if remaining is not None:
+                increment = limits.get("winc" if self.board.toMove is WHITE else "binc", 0)
+                movetime = self._allocate(remaining / 1000, increment / 1000,
+                                          limits.get("movestogo", MOVESTOGO))
+        if not infinite and "depth" not in limits and nodes is None and movetime is None:
+            infinite = True
+
+        self.search = Search(self.board, self.table, self.tablebase)
+        self._release.clear()
+        if not infinite:
+            self._release.set()
+        self._thread = threading.Thread(target=self._run, args=(self.search, depth, movetime, nodes),
+                                        daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _allocate(remaining, increment, movesToGo):
+        """Return the seconds to spend on a move given the clock"""
+        budget = remaining / max(movesToGo, 1) + increment * 3 / 4
+        return max(min(budget, remaining / 2, remaining - RESERVE), 0.01)
+
+    def _run(self, search, depth, movetime, nodes):
+        """Search and write the best move, on the search thread"""
+        result = search.search(depth, movetime, nodes, self._info)
+        # An infinite search only gives its move once stopped
+        self._release.wait()
+        if result.move is None:
+            self.send("bestmove 0000")
+        else:
+            self.send("bestmove {}".format(toCoordinates(result.move)))
+
+    def _info(self, result):
+        """Write the SearchResult of a completed depth"""
+        milliseconds = int(result.time * 1000)
+        self.send("info depth {} score {} nodes {} nps {} time {} hashfull {} tbhits {} pv {}".format(
+            result.depth, formatScore(result.score), result.nodes,
+            int(result.nodes / max(result.time, 1e-3)), milliseconds, self.table.hashfull(),
+            self.search.tbHits,
+            " ".join(toCoordinates(move) for move in result.pv)))
+
+    def stop(self):
+        """Stop the running search, if any, and wait for its best move to be written"""
+        if self._thread is None:
+            return
+        self.search.stop()
+        self._release.set()
+        self._thread.join()
+        self._thread = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play over the Universal Chess Interface.")
+    parser.add_argument("--hash", type=int, default=HASHDEFAULT,
+                        help="initial size of the transposition table in MB (default: {})".format(
+                            HASHDEFAULT))
+    args = parser.parse_args(argv)
+
+    engine = UCIEngine(hashSize=args.hash)
+    for line in sys.stdin:
+        if not engine.handle(line):
+            break
+    else:
+        engine.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
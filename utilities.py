@@ -1,6 +1,6 @@
 #! /usr/bin/env python
 
-__all__ = ["NotationError", "MoveError", "StateError"]
+__all__ = ["NotationError", "MoveError", "StateError", "TablebaseError", "CommandError"]
 
 
 class ChessError(Exception):
@@ -40,4 +40,15 @@ class StateError(ChessError):
         return response + ("" if self.reason is None else "({})".format(self.reason))
 
 
+class TablebaseError(ChessError):
+    """Exception raised for positions that can't be probed in the tablebases"""
+    def response(self):
+        response = "Can't probe \"{}\" in the tablebases.".format(self.expression)
+        return response + ("" if self.reason is None else " ({})".format(self.reason))
+
 
+class CommandError(ChessError):
+    """Exception raised for commands that can't be carried out"""
+    def response(self):
+        response = "\"{}\" was refused.".format(self.expression)
+        return response + ("" if self.reason is None else " ({})".format(self.reason))